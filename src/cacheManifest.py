@@ -0,0 +1,232 @@
+######################################################################################################
+# NIST-developed software is expressly provided "AS IS." NIST MAKES NO                               #
+# WARRANTY OF ANY KIND, EXPRESS, IMPLIED, IN FACT OR ARISING BY                                      #
+# OPERATION OF LAW, INCLUDING, WITHOUT LIMITATION, THE IMPLIED                                       #
+# WARRANTY OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE,                                     #
+# NON-INFRINGEMENT AND DATA ACCURACY. NIST NEITHER REPRESENTS                                        #
+# NOR WARRANTS THAT THE OPERATION OF THE SOFTWARE WILL BE                                            #
+# UNINTERRUPTED OR ERROR-FREE, OR THAT ANY DEFECTS WILL BE                                           #
+# CORRECTED. NIST DOES NOT WARRANT OR MAKE ANY REPRESENTATIONS                                       #
+# REGARDING THE USE OF THE SOFTWARE OR THE RESULTS THEREOF,                                          #
+# INCLUDING BUT NOT LIMITED TO THE CORRECTNESS, ACCURACY,                                            #
+# RELIABILITY, OR USEFULNESS OF THE SOFTWARE.                                                        #
+#                                                                                                    #
+#                                                                                                    #
+# You are solely responsible for determining the appropriateness of using                            #
+# and distributing the software and you assume all risks associated with its use, including          #
+# but not limited to the risks and costs of program errors, compliance with applicable               #
+# laws, damage to or loss of data, programs or equipment, and the unavailability or                  #
+# interruption of operation. This software is not intended to be used in any situation               #
+# where a failure could cause risk of injury or damage to property. The software                     #
+# developed by NIST is not subject to copyright protection within the United                         #
+# States.                                                                                            #
+######################################################################################################
+
+import hashlib
+import json
+import os
+
+# Every derived artifact (cached Q-D channel, pickled codebooks, preprocessed results) is stored with a manifest
+# recording the signature of the input files and the parameters used to generate it.
+# An artifact is reused only if its manifest matches the current inputs
+manifestVersion = 1
+
+# Size of the blocks read when hashing a file
+hashBlockSize = 1 << 20
+
+
+def hashFile(path):
+    """Compute the hash of a file content
+
+    Parameters
+    ----------
+    path : string
+        Path of the file
+
+    Returns
+    -------
+    digest : string
+        The hexadecimal BLAKE2b digest of the file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(hashBlockSize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fileSignature(path, validation):
+    """Get the signature of an input file
+
+    Parameters
+    ----------
+    path : string
+        Path of the file
+
+    validation : string
+        'mtime' to use the modification time and the size of the file, 'hash' to also use the hash of its content
+
+    Returns
+    -------
+    signature : dict
+        The signature of the file (None if the file does not exist)
+    """
+    if not os.path.isfile(path):
+        return None
+    fileStat = os.stat(path)
+    signature = {'size': fileStat.st_size, 'mtime': fileStat.st_mtime_ns}
+    if validation == 'hash':
+        signature['hash'] = hashFile(path)
+    return signature
+
+
+def getManifestPath(artifactPath):
+    """Get the path of the manifest of an artifact
+
+    Parameters
+    ----------
+    artifactPath : string
+        Path of the artifact (file or folder)
+
+    Returns
+    -------
+    manifestPath : string
+        Path of the manifest (inside the folder for a folder artifact, next to the file otherwise)
+    """
+    if os.path.isdir(artifactPath):
+        return os.path.join(artifactPath, "manifest.json")
+    return artifactPath + ".manifest.json"
+
+
+def inputFileKey(artifactPath, path):
+    """Get the key identifying an input file in the manifest of an artifact
+
+    The path is stored relatively to the artifact so that a scenario can be moved without invalidating its caches.
+    """
+    return os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(artifactPath)))
+
+
+def isArtifactValid(artifactPath, inputFiles, parameters, validation='mtime'):
+    """Check if an artifact has been generated from the current inputs
+
+    When the hash validation is used, a file whose modification time changed but whose content is identical
+    is still considered as valid.
+
+    Parameters
+    ----------
+    artifactPath : string
+        Path of the artifact (file or folder)
+
+    inputFiles : List of string
+        Paths of the files used to generate the artifact
+
+    parameters : dict
+        Parameters used to generate the artifact (must be JSON serializable)
+
+    validation : string
+        'mtime' or 'hash' (see fileSignature)
+
+    Returns
+    -------
+    valid : Bool
+        True if the artifact exists and its manifest matches the inputs and the parameters
+    """
+    if not os.path.exists(artifactPath):
+        return False
+    manifestPath = getManifestPath(artifactPath)
+    if not os.path.isfile(manifestPath):
+        return False
+    try:
+        with open(manifestPath) as f:
+            manifest = json.load(f)
+    except ValueError:
+        return False
+    if manifest.get('version') != manifestVersion:
+        return False
+    # Round-trip the parameters through JSON so that they are compared as they are stored
+    if manifest.get('parameters') != json.loads(json.dumps(parameters)):
+        return False
+    storedFiles = manifest.get('inputFiles', {})
+    if set(storedFiles) != set(inputFileKey(artifactPath, path) for path in inputFiles):
+        return False
+    for path in inputFiles:
+        stored = storedFiles[inputFileKey(artifactPath, path)]
+        current = fileSignature(path, 'mtime')
+        if current is None or stored is None:
+            if current != stored:
+                return False
+            continue
+        if current['size'] != stored['size']:
+            return False
+        if current['mtime'] != stored['mtime']:
+            if validation != 'hash' or 'hash' not in stored or hashFile(path) != stored['hash']:
+                return False
+    return True
+
+
+def writeManifest(artifactPath, inputFiles, parameters, validation='mtime', outputs=None):
+    """Write the manifest of an artifact once it has been generated
+
+    Parameters
+    ----------
+    artifactPath : string
+        Path of the artifact (file or folder)
+
+    inputFiles : List of string
+        Paths of the files used to generate the artifact
+
+    parameters : dict
+        Parameters used to generate the artifact (must be JSON serializable)
+
+    validation : string
+        'mtime' or 'hash' (see fileSignature)
+
+    outputs : dict
+        Values resolved while generating the artifact and needed to use it (must be JSON serializable)
+        They are not compared when the artifact is validated (see readManifestOutputs)
+    """
+    manifest = {'version': manifestVersion,
+                'parameters': parameters,
+                'inputFiles': {inputFileKey(artifactPath, path): fileSignature(path, validation) for path in inputFiles},
+                'outputs': outputs if outputs is not None else {}}
+    manifestPath = getManifestPath(artifactPath)
+    temporaryPath = manifestPath + ".tmp"
+    with open(temporaryPath, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temporaryPath, manifestPath)
+
+
+def readManifestOutputs(artifactPath):
+    """Get the values resolved while generating an artifact (see writeManifest)
+
+    Parameters
+    ----------
+    artifactPath : string
+        Path of the artifact (file or folder)
+
+    Returns
+    -------
+    outputs : dict
+        The values stored in the manifest (empty if the manifest does not exist or does not contain any value)
+    """
+    manifestPath = getManifestPath(artifactPath)
+    if not os.path.isfile(manifestPath):
+        return {}
+    try:
+        with open(manifestPath) as f:
+            return json.load(f).get('outputs', {})
+    except ValueError:
+        return {}
+
+
+def invalidateArtifact(artifactPath):
+    """Remove the manifest of an artifact so that it is regenerated the next time it is needed
+
+    Parameters
+    ----------
+    artifactPath : string
+        Path of the artifact (file or folder)
+    """
+    manifestPath = getManifestPath(artifactPath)
+    if os.path.isfile(manifestPath):
+        os.remove(manifestPath)
@@ -30,6 +30,10 @@ import pandas as pd
 import globals
 import os
 
+# Version of the codebook object format - Must be increased each time the Codebooks class changes so that
+# the pickled codebooks are regenerated
+codebookFormatVersion = 2
+
 
 # TODO Probably Move Somewhere else
 # Vectorize complex management
@@ -287,24 +291,24 @@ class Codebooks:
         return self.QuasiPatternsSta[paaId]
 
     def setApSectorsDirectivity(self, sectorDirectivityAP):
-        """Set all sectors AP directivity for all the sectors
+        """Set all sectors AP directivity for all the sectors (stored as a single sectors x azimuth x elevation array)
         """
-        self.apSectorsDirectivity = sectorDirectivityAP
+        self.apSectorsDirectivity = np.asarray(sectorDirectivityAP)
 
     def setApQuasiOmniDirectivity(self, quasiOmniPatternDirectivityAP):
         """Set quasi-omni AP directivity
         """
-        self.apQuasiOmniDirectivity = quasiOmniPatternDirectivityAP
+        self.apQuasiOmniDirectivity = np.asarray(quasiOmniPatternDirectivityAP)
 
     def setStaSectorsDirectivity(self, sectorDirectivitySTA):
-        """Set all sectors STA directivity for all the sectors
+        """Set all sectors STA directivity for all the sectors (stored as a single sectors x azimuth x elevation array)
         """
-        self.staSectorsDirectivity = sectorDirectivitySTA
+        self.staSectorsDirectivity = np.asarray(sectorDirectivitySTA)
 
     def setStaQuasiOmniDirectivity(self, quasiOmniPatternDirectivitySTA):
         """Set quasi-omni STA directivity
         """
-        self.staQuasiOmniDirectivity = quasiOmniPatternDirectivitySTA
+        self.staQuasiOmniDirectivity = np.asarray(quasiOmniPatternDirectivitySTA)
 
     def getApSectorsDirectivity(self):
         """Get all sectors AP directivity for all the sectors
@@ -23,10 +23,12 @@
 ######################################################################################################
 
 import argparse
+import cacheManifest
 import logging
 import math
 import os
 import pickle
+import shutil
 from enum import Enum
 import nsInput
 from plots import plotPreprocessedData
@@ -35,7 +37,9 @@ import qdRealization
 from qdPropagationLoss import TxParam
 from preprocessData import preprocessData
 from preprocessData import loadPreprocessedData
+from preprocessData import exportSlsTimeSeriesCsv, getSlsTimeSeriesFile
 from codebook import loadCodebook
+from codebook import codebookFormatVersion
 import csv
 from qdRealization import BeamTrackingResults
 from preprocessData import preprocessCompleteSuMimo
@@ -46,7 +50,19 @@ centerFrequency = 60480
 channelWidth = 2160
 bandBandwidth = 5156250
 guardBandwidth = 2160
-nbSubBands = 355
+nbSubBands = 355  # Number of subbands (355 subbands of bandBandwidth Hz by default)
+subbandsAuto = False  # Select the smallest number of subbands meeting subbandErrorBound on a calibration sample
+subbandErrorBound = 0.5  # Maximum error of the power received with the best sector allowed in auto mode (dB)
+subbandCalibrationSamples = 200  # Approximate number of (pair, trace) used to select the number of subbands
+phasorResyncPeriod = 32  # Number of subbands whose delay phasors are obtained by recurrence from an exact one
+slsMethod = 'auto'  # Evaluation of the sectors power: 'auto', 'subband', 'covariance' or 'numba' (see computeRxAllSectors)
+slsFastMath = False  # Allow the numba SLS kernel to reorder the floating-point operations
+slsMode = 'exhaustive'  # 'exhaustive' or 'pruned' (only the best sectors of a screening are fully evaluated)
+slsTopK = 8  # Number of candidate sectors evaluated over all the subbands in pruned mode
+slsScreeningSubbands = 8  # Number of subbands used to screen the sectors in pruned mode
+slsPruningCheckStep = 20  # One trace out of slsPruningCheckStep is compared to the exhaustive sweep in pruned mode
+effectiveChannelCacheSize = 128  # Number of (pair, trace) effective channels kept in memory for the repeated SLS
+slsBatchSize = 256  # Maximum number of padded (trace, MPC) pairs whose gain is computed at once by performSlsTraces
 
 # Power characteristics
 deviceTxPowerDbm = 10  # Power used by the device to transmit (TODO: Different power for STAs and APs)
@@ -58,6 +74,9 @@ noiseFigure = 5.01187
 azimuthCardinality = 361
 elevationCardinality = 181
 
+# Visualizer variables
+mpcCacheSize = 64  # Number of (TX, PAA_TX, RX, PAA_RX, Rorder) MPCs geometries kept decoded in memory
+
 # Files and Folder variables
 scenarioFolder = ""  # The folder containing all the files needed to display a given scenario
 scenarioPath = ""
@@ -76,6 +95,7 @@ slsFolder = "SLS"
 pickleFolder = "pickle"
 preprocessedFolder = "Preprocessed"
 associationFolder = "Association"
+checkpointFolder = "Checkpoint"  # Folder containing the SLS results of the pairs already preprocessed
 slsResultsFile = "slsDMG_MCS1.csv"  # The file containing the SLS phase results # TODO Update FileName
 snrFile = "snrDMG_MCS1.csv"  # The SNR file f(L-ROOM scenario only)
 CodebookFolder = "Codebook"  # Folder containing the different codebook files
@@ -85,6 +105,7 @@ mlFolder = "MachineLearning"
 dataFolder = "Data"
 bestSectorItxssFolder = "BestSectorITXSS"
 rxPowerItxssFolder = "RxPowerITXSS"
+slsTimeSeriesFile = "slsTimeSeries.npz"  # Received power and best sector of every trace of every pair
 capacityFolder = "Capacity"
 snrSinrFolder = "SNR_SINR"
 componentsConfigFile = "componentsVisConfig.conf"
@@ -128,7 +149,11 @@ class QdInterpreterConfig:
             Type of the node (AP or STA)
     """
     def __init__(self, scenarioName, slsEnabled,dataMode, plotData, regenerateCachedQdRealData, forceSlsDataRegeneration, forcePlotsRegeneration, sensing,
-                 mimo,mimoDataMode,codebookMode, patternQuality,filterVelocity,codebookTabEnabled):
+                 mimo,mimoDataMode,codebookMode, patternQuality,filterVelocity,codebookTabEnabled, ingestWorkers=1,
+                 cacheValidation='mtime', traceWindow=None, selectedNodes=None, channelPrecision=None,
+                 channelPrecisionReport=False, mergeAngleBins=False, slsMethod='auto', fastMath=False,
+                 slsMode='exhaustive', slsTopK=8, slsScreeningSubbands=8, reciprocity=False, nbSubBands=None,
+                 subbandErrorBound=0.5, workers=1, resume=False, exportSlsCsv=False, diskBackedResults=False):
         self.scenarioName = scenarioName
         self.slsEnabled = slsEnabled
         self.plotData = plotData
@@ -143,6 +168,27 @@ class QdInterpreterConfig:
         self.patternQuality = patternQuality
         self.filterVelocity = filterVelocity
         self.codebookTabEnabled = codebookTabEnabled
+        self.ingestWorkers = ingestWorkers
+        self.cacheValidation = cacheValidation
+        self.traceWindow = traceWindow
+        self.selectedNodes = selectedNodes
+        if channelPrecision is None:
+            channelPrecision = qdRealization.QdProperties.getPrecisionPolicy(['double'])
+        self.channelPrecision = channelPrecision
+        self.channelPrecisionReport = channelPrecisionReport
+        self.mergeAngleBins = mergeAngleBins
+        self.slsMethod = slsMethod
+        self.fastMath = fastMath
+        self.slsMode = slsMode
+        self.slsTopK = slsTopK
+        self.slsScreeningSubbands = slsScreeningSubbands
+        self.reciprocity = reciprocity
+        self.nbSubBands = nbSubBands
+        self.subbandErrorBound = subbandErrorBound
+        self.workers = workers
+        self.resume = resume
+        self.exportSlsCsv = exportSlsCsv
+        self.diskBackedResults = diskBackedResults
 
 
 class NodeType(Enum):
@@ -207,6 +253,275 @@ def nPr(n, r):
     return f(n) // f(n - r)
 
 
+def parseTraceWindow(traceWindow):
+    """Parse the traces window given in the command line as start:end[:step]
+
+    Parameters
+    ----------
+    traceWindow : string
+        The traces window (start or end can be omitted, e.g., :1000 or 500:)
+
+    Returns
+    -------
+    traceWindow : Tuple
+        The start, end (None for the last trace), and step of the window
+    """
+    try:
+        fields = [int(field) if field != '' else None for field in traceWindow.split(':')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("Traces window must be given as start:end[:step]")
+    if len(fields) not in (2, 3):
+        raise argparse.ArgumentTypeError("Traces window must be given as start:end[:step]")
+    start = fields[0] if fields[0] is not None else 0
+    end = fields[1]
+    step = fields[2] if len(fields) == 3 and fields[2] is not None else 1
+    if start < 0 or (end is not None and end <= start) or step < 1:
+        raise argparse.ArgumentTypeError("Invalid traces window: " + traceWindow)
+    return start, end, step
+
+
+def getChannelSelection(qdInterpreterConfig, qdScenario):
+    """Create the selection of traces and nodes to load and update the scenario accordingly
+
+    Parameters
+    ----------
+    qdInterpreterConfig : QdInterpreterConfig
+        The configuration of the software (traces window and nodes selected)
+
+    qdScenario : QdScenario class
+        Scenario parameters (the number of traces and timestep are updated to match the traces window)
+
+    Returns
+    -------
+    channelSelection : ChannelSelection class
+        The traces and nodes to load
+    """
+    traceStart, traceStop, traceStep = 0, None, 1
+    if qdInterpreterConfig.traceWindow is not None:
+        traceStart, traceStop, traceStep = qdInterpreterConfig.traceWindow
+        if traceStop is not None:
+            traceStop = min(traceStop, qdScenario.nbTraces)
+        if traceStart >= qdScenario.nbTraces:
+            logger.critical("Traces window starts after the last trace (" + str(qdScenario.nbTraces) + " traces) - Exit")
+            exit()
+    selectedNodes = qdInterpreterConfig.selectedNodes
+    if selectedNodes is not None:
+        if min(selectedNodes) < 0 or max(selectedNodes) >= qdScenario.nbNodes:
+            logger.critical("Nodes selected must be between 0 and " + str(qdScenario.nbNodes - 1) + " - Exit")
+            exit()
+        if len(set(selectedNodes)) < 2:
+            logger.critical("At least two nodes must be selected - Exit")
+            exit()
+    channelSelection = qdRealization.ChannelSelection(traceStart, traceStop, traceStep, selectedNodes)
+    if (traceStart, traceStop, traceStep) != (0, None, 1) and qdInterpreterConfig.sensing:
+        # The sensing files are always loaded for all the traces
+        logger.critical("Sensing cannot be used with a traces window - Exit")
+        exit()
+    qdScenario.nbTraces = channelSelection.getNbTraces(qdScenario.nbTraces)
+    qdScenario.timeStep = qdScenario.timeStep * traceStep
+    qdScenario.channelSelection = channelSelection
+    if not channelSelection.isComplete():
+        print("Traces loaded:", channelSelection.traceStart, "to",
+              channelSelection.getAbsoluteTraceIndex(qdScenario.nbTraces - 1), "step", channelSelection.traceStep)
+        print("Nodes loaded:", "All" if channelSelection.nodes is None else channelSelection.nodes)
+    return channelSelection
+
+
+def reportChannelPrecision(qdFile, qdInterpreterConfig, qdScenario, channelSelection, txParam, codebooks):
+    """Print the SLS best sector agreement and received power error obtained with the channel precision selected
+
+    The double precision channel is used as the reference. Every pair and trace loaded are compared, so the
+    traces window (--traces) can be used to limit the duration of the validation.
+
+    Parameters
+    ----------
+    qdFile : string
+        Path of the Q-D JSON file
+
+    qdInterpreterConfig : QdInterpreterConfig
+        The configuration of the software (channel precision to evaluate)
+
+    qdScenario : QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    channelSelection : ChannelSelection class
+        The traces and nodes loaded
+
+    txParam : TxParam class
+        The transmission parameters
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+    """
+    referenceChannel = qdRealization.parseQdJsonFile(qdFile, qdScenario.nbNodes, channelSelection,
+                                                     qdInterpreterConfig.ingestWorkers, qdInterpreterConfig.reciprocity)
+    precisionReport = qdPropagationLoss.compareChannelPrecision(
+        referenceChannel, referenceChannel.withPrecision(qdInterpreterConfig.channelPrecision), txParam, nbSubBands,
+        qdScenario, codebooks)
+    print("************************************************")
+    print("*      CHANNEL PRECISION REPORT                *")
+    print("************************************************")
+    for attribute in qdRealization.QdProperties.mpcAttributes:
+        print("\t" + attribute + ":", qdInterpreterConfig.channelPrecision[attribute])
+    print("SLS compared:", precisionReport['nbSls'])
+    print("Best sector agreement:", round(100 * precisionReport['bestSectorAgreement'], 3), "%")
+    print("Rx power error (mean/max):", precisionReport['meanRxPowerError'], "/",
+          precisionReport['maxRxPowerError'], "dB")
+    print("Channel memory:", precisionReport['memorySize'], "bytes (",
+          round(100 * precisionReport['memorySize'] / max(1, precisionReport['referenceMemorySize']), 1),
+          "% of double precision)")
+
+
+def getTxParamSignature():
+    """Get the transmission parameters used to generate the data derived from the Q-D channel
+
+    Returns
+    -------
+    txParamSignature : dict
+        The subbands, power, and noise parameters (used to check if the cached data are outdated)
+    """
+    txParamSignature = {'centerFrequency': centerFrequency, 'channelWidth': channelWidth,
+                        'bandBandwidth': bandBandwidth, 'guardBandwidth': guardBandwidth, 'nbSubBands': nbSubBands,
+                        'deviceTxPowerDbm': deviceTxPowerDbm, 'noiseFigure': noiseFigure}
+    if subbandsAuto:
+        # The number of subbands is selected once the Q-D channel is loaded
+        txParamSignature['nbSubBands'] = 'auto'
+        txParamSignature['subbandErrorBound'] = subbandErrorBound
+    return txParamSignature
+
+
+def allocateTxParam(nbSubBandsToUse):
+    """Create the transmission parameters (frequencies, power per subband, noise)
+
+    Parameters
+    ----------
+    nbSubBandsToUse : int
+        Number of subbands (None for subbands of bandBandwidth Hz)
+
+    Returns
+    -------
+    txParam : TxParam class
+        The transmission parameters
+    """
+    txParam = TxParam()
+    txParam.allocateFrequencies(centerFrequency, channelWidth, bandBandwidth, guardBandwidth, nbSubBandsToUse)
+    txParam.allocateTxPowerPerSubband(qdPropagationLoss.DbmtoW(deviceTxPowerDbm), False, txParam.getFrequencies(),
+                                      len(txParam.getCenterFrequencies()))
+    txParam.computeNoise()
+    return txParam
+
+
+def selectNbSubBands(qdChannel, qdScenario, codebooks):
+    """Select the smallest number of subbands whose SLS results meet subbandErrorBound
+
+    The candidates divide the default number of subbands by a power of two. They are compared to the default
+    subbands on about subbandCalibrationSamples (pair, trace) of the Q-D channel.
+
+    Parameters
+    ----------
+    qdChannel : QdProperties class
+        MPCs characteristics
+
+    qdScenario : QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    Returns
+    -------
+    nbSubBandsSelected : int
+        The number of subbands selected
+
+    txParam : TxParam class
+        The transmission parameters using the selected number of subbands
+    """
+    referenceTxParam = allocateTxParam(None)
+    nbReferenceSubBands = len(referenceTxParam.getCenterFrequencies())
+    # Odd number of subbands so that a subband is centered on the center frequency
+    candidates = sorted(set(max(1, int(nbReferenceSubBands / 2 ** k) | 1) for k in range(1, 6)))
+    candidates = [candidate for candidate in candidates if candidate < nbReferenceSubBands]
+    candidateTxParams = [allocateTxParam(candidate) for candidate in candidates]
+    traceStep = max(1, len(qdChannel.pairKeys) * qdChannel.nbTraces // subbandCalibrationSamples)
+    resolutionReports = qdPropagationLoss.compareSubbandResolutions(qdChannel, referenceTxParam, candidateTxParams,
+                                                                    qdScenario, codebooks, traceStep)
+    print("************************************************")
+    print("*      SUBBANDS CALIBRATION                    *")
+    print("************************************************")
+    print("Maximum best sector power error:", subbandErrorBound, "dB - SLS compared:",
+          resolutionReports[0]['nbSls'] if resolutionReports else 0)
+    nbSubBandsSelected, txParam = nbReferenceSubBands, referenceTxParam
+    for candidate, candidateTxParam, resolutionReport in zip(candidates, candidateTxParams, resolutionReports):
+        print("Subbands:", candidate, "- Power error (mean/max):", resolutionReport['meanRxPowerError'], "/",
+              resolutionReport['maxRxPowerError'], "dB - Best sector agreement:",
+              round(100 * resolutionReport['bestSectorAgreement'], 3), "%")
+        if resolutionReport['maxRxPowerError'] <= subbandErrorBound and nbSubBandsSelected == nbReferenceSubBands:
+            nbSubBandsSelected, txParam = candidate, candidateTxParam
+    print("Subbands selected:", nbSubBandsSelected)
+    return nbSubBandsSelected, txParam
+
+
+def getSlsSignature():
+    """Get the SLS parameters used to generate the preprocessed SLS data
+
+    Returns
+    -------
+    slsSignature : dict
+        The SLS mode and its parameters (used to check if the cached data are outdated)
+    """
+    if slsMode == 'pruned':
+        return {'mode': slsMode, 'topK': slsTopK, 'screeningSubbands': slsScreeningSubbands}
+    return {'mode': slsMode}
+
+
+def reportSlsPruning(qdChannel, txParam, qdScenario, codebooks):
+    """Compare the pruned SLS with the exhaustive sweep and print the best sector agreement
+
+    One trace out of slsPruningCheckStep is compared for every pair.
+
+    Parameters
+    ----------
+    qdChannel : QdProperties class
+        MPCs characteristics
+
+    txParam : TxParam class
+        The transmission parameters
+
+    qdScenario : QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    Returns
+    -------
+    pruningReport : dict
+        The number of SLS compared, the best sector agreement and the best sector power loss (mean and max)
+    """
+    pruningReport = qdPropagationLoss.compareSlsPruning(qdChannel, txParam, nbSubBands, qdScenario, codebooks,
+                                                        slsPruningCheckStep)
+    printSlsPruningReport(pruningReport)
+    return pruningReport
+
+
+def printSlsPruningReport(pruningReport):
+    """Print the best sector agreement between the pruned SLS and the exhaustive sweep
+
+    Parameters
+    ----------
+    pruningReport : dict
+        The report obtained with reportSlsPruning
+    """
+    print("************************************************")
+    print("*      PRUNED SLS REPORT                       *")
+    print("************************************************")
+    print("Top K sectors:", slsTopK, "- Screening subbands:", slsScreeningSubbands)
+    print("SLS compared:", pruningReport['nbSls'])
+    print("Best sector agreement:", round(100 * pruningReport['bestSectorAgreement'], 3), "%")
+    print("Best sector power loss (mean/max):", pruningReport['meanRxPowerLoss'], "/",
+          pruningReport['maxRxPowerLoss'], "dB")
+
+
 def printProgressBarWithoutETA(iteration, total, prefix='', suffix='', decimals=1, length=100, fill='█', printEnd="\r"):
     """
     Call in a loop to create terminal progress bar
@@ -278,7 +593,7 @@ def initializeOracle(useVisualizer=False):
         The preprocessed association Data
     txParam: TxParam class
         Parameters associated to the transmissions
-    dataIndex: Dic
+    dataIndex: DataIndex class
         Used to reconstruct the index of the preprocessed data
     qdChannel: qdChannel class
         The parameters of each MPC
@@ -287,6 +602,8 @@ def initializeOracle(useVisualizer=False):
     """
     global logger
     global scenarioPath
+    global slsMethod, slsFastMath, slsMode, slsTopK, slsScreeningSubbands
+    global nbSubBands, subbandsAuto, subbandErrorBound
 
     # Handle the command line-parsing
     parser = argparse.ArgumentParser()
@@ -351,10 +668,99 @@ def initializeOracle(useVisualizer=False):
                         help='Is the antenna pattern represented in dB or linear',
                         default='dB')
 
+    parser.add_argument('--ingestWorkers', nargs='?', action='store', dest='ingestWorkers',
+                        help='Number of processes used to parse the Q-D realization software JSON file',
+                        type=int, default=1)
+
+    parser.add_argument('--cacheValidation', nargs='?', action='store', dest='cacheValidation',
+                        choices=['mtime', 'hash'],
+                        help='How the cached data are validated against their input files (modification time and size, or content hash)',
+                        default='mtime')
+
+    parser.add_argument('--traces', nargs='?', action='store', dest='traceWindow', type=parseTraceWindow,
+                        help='Window of traces to load given as start:end[:step] (all the traces by default)',
+                        default=None)
+
+    parser.add_argument('--nodes', nargs='+', action='store', dest='selectedNodes', type=int,
+                        help='Identifiers of the nodes to load (all the nodes by default)',
+                        default=None)
+
+    parser.add_argument('--channelPrecision', nargs='+', action='store', dest='channelPrecision',
+                        help='Precision used to store the MPCs attributes: double, single, or compact (int16 angles and float32 for the other attributes), optionally followed by attribute=dtype overrides (e.g., single delay=float64 - the delay and the pathLoss cannot be float16)',
+                        default=['double'])
+
+    parser.add_argument('--channelPrecisionReport', dest='channelPrecisionReport', action='store_true')
+    parser.set_defaults(channelPrecisionReport=False)
+
+    # Sum the MPCs with identical rounded AoD and AoA before the SLS (exact as they share the same directivity)
+    parser.add_argument('--mergeAngleBins', dest='mergeAngleBins', action='store_true')
+    parser.add_argument('--no-mergeAngleBins', dest='mergeAngleBins', action='store_false')
+    parser.set_defaults(mergeAngleBins=False)
+
+    parser.add_argument('--slsMethod', nargs='?', action='store', dest='slsMethod',
+                        choices=['auto', 'subband', 'covariance', 'numba'],
+                        help='Evaluation of the power received by the sectors during the SLS (numba uses all the cores)',
+                        default='auto')
+
+    # Allow the numba SLS kernel to reorder the floating-point operations (faster but not bit-exact)
+    parser.add_argument('--fastMath', dest='fastMath', action='store_true')
+    parser.set_defaults(fastMath=False)
+
+    parser.add_argument('--slsMode', nargs='?', action='store', dest='slsMode', choices=['exhaustive', 'pruned'],
+                        help='Evaluate every sector over all the subbands (exhaustive) or only the best sectors of a screening on a few subbands (pruned - the power of the other sectors is not evaluated and is NaN, which the ML ground truth and the interference of the scheduler do not support)',
+                        default='exhaustive')
+
+    parser.add_argument('--slsTopK', nargs='?', action='store', dest='slsTopK', type=int,
+                        help='Number of candidate sectors evaluated over all the subbands in pruned mode',
+                        default=8)
+
+    parser.add_argument('--slsScreeningSubbands', nargs='?', action='store', dest='slsScreeningSubbands', type=int,
+                        help='Number of subbands used to screen the sectors in pruned mode',
+                        default=8)
+
+    # Load only one direction of every pair of nodes and derive the reverse link by swapping the AoD and the AoA
+    parser.add_argument('--reciprocity', dest='reciprocity', action='store_true')
+    parser.set_defaults(reciprocity=False)
 
+    parser.add_argument('--subbands', nargs='?', action='store', dest='subbands',
+                        help='Number of subbands used to compute the received power, or auto to select the smallest number meeting --subbandErrorBound',
+                        default=str(nbSubBands))
+
+    parser.add_argument('--subbandErrorBound', nargs='?', action='store', dest='subbandErrorBound', type=float,
+                        help='Maximum error of the power received with the best sector allowed by --subbands auto (dB)',
+                        default=0.5)
+
+    parser.add_argument('--workers', nargs='?', action='store', dest='workers', type=int,
+                        help='Number of processes used to preprocess the SLS data (the pairs of nodes are spread over the processes)',
+                        default=1)
+
+    # Checkpoint the results of every pair during the SLS preprocessing and resume an interrupted preprocessing
+    # from the results of the pairs already preprocessed (the checkpoint costs one shard per pair written on the disk)
+    parser.add_argument('--resume', dest='resume', action='store_true')
+    parser.set_defaults(resume=False)
+
+    # Export the SLS time series (received power and best sector of every pair) in per-pair CSV files
+    parser.add_argument('--exportSlsCsv', dest='exportSlsCsv', action='store_true')
+    parser.set_defaults(exportSlsCsv=False)
+
+    # Write the preprocessed SLS results in memory-mapped files instead of in memory (preprocessing larger than the RAM)
+    parser.add_argument('--diskBackedResults', dest='diskBackedResults', action='store_true')
+    parser.set_defaults(diskBackedResults=False)
 
     argument = parser.parse_args()
 
+    try:
+        channelPrecision = qdRealization.QdProperties.getPrecisionPolicy(argument.channelPrecision)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if argument.subbands == 'auto':
+        subbandsToUse = 'auto'
+    elif argument.subbands.isdigit() and int(argument.subbands) > 0:
+        subbandsToUse = int(argument.subbands)
+    else:
+        parser.error("--subbands must be a positive number of subbands or auto")
+
     if argument.patternQuality == 0:
         # We are slicing antenna pattern so 0 cannot be used
         argument.patternQuality = 1
@@ -362,7 +768,16 @@ def initializeOracle(useVisualizer=False):
     qdInterpreterConfig = QdInterpreterConfig(argument.scenarioName, argument.slsEnabled,argument.dataMode,argument.displayPlotWidget, argument.regenerateCachedQdRealData,
                                                           argument.forceSlsDataRegeneration,
                                                           argument.forcePlotsRegeneration, argument.sensing,
-                                                          argument.mimo,argument.mimoDataMode, argument.codebookMode, argument.patternQuality,argument.filterVelocity,argument.codebookTabEnabled)
+                                                          argument.mimo,argument.mimoDataMode, argument.codebookMode, argument.patternQuality,argument.filterVelocity,argument.codebookTabEnabled,
+                                                          max(1, argument.ingestWorkers), argument.cacheValidation,
+                                                          argument.traceWindow, argument.selectedNodes, channelPrecision,
+                                                          argument.channelPrecisionReport, argument.mergeAngleBins,
+                                                          argument.slsMethod, argument.fastMath, argument.slsMode,
+                                                          max(1, argument.slsTopK),
+                                                          max(1, argument.slsScreeningSubbands), argument.reciprocity,
+                                                          subbandsToUse, argument.subbandErrorBound,
+                                                          max(1, argument.workers), argument.resume,
+                                                          argument.exportSlsCsv, argument.diskBackedResults)
 
     print("************************************************")
     print("*      ORACLE CONFIGURATION SUMMARY            *")
@@ -374,6 +789,15 @@ def initializeOracle(useVisualizer=False):
     print("MIMO:", qdInterpreterConfig.mimo)
     print("Codebook:", qdInterpreterConfig.codebookMode)
     print("Pattern Quality:", qdInterpreterConfig.patternQuality)
+    print("SLS Method:", qdInterpreterConfig.slsMethod, "(fastmath)" if qdInterpreterConfig.fastMath else "")
+    if qdInterpreterConfig.slsMode == 'pruned':
+        print("SLS Mode: pruned (top", qdInterpreterConfig.slsTopK, "sectors,", qdInterpreterConfig.slsScreeningSubbands,
+              "screening subbands)")
+    if qdInterpreterConfig.reciprocity:
+        print("Channel Reciprocity: reverse links derived from the forward links")
+    print("Subbands:", qdInterpreterConfig.nbSubBands)
+    if qdInterpreterConfig.workers > 1:
+        print("Preprocessing Workers:", qdInterpreterConfig.workers)
 
 
     # print("Regenerate Cached Data:", qdInterpreterConfig.regenerateCachedQdRealData)
@@ -392,12 +816,20 @@ def initializeOracle(useVisualizer=False):
     logger.addHandler(ch)
 
 
+    slsMethod = qdInterpreterConfig.slsMethod
+    slsFastMath = qdInterpreterConfig.fastMath
+    slsMode = qdInterpreterConfig.slsMode
+    slsTopK = qdInterpreterConfig.slsTopK
+    slsScreeningSubbands = qdInterpreterConfig.slsScreeningSubbands
+
+    subbandsAuto = qdInterpreterConfig.nbSubBands == 'auto'
+    subbandErrorBound = qdInterpreterConfig.subbandErrorBound
+    if not subbandsAuto and qdInterpreterConfig.nbSubBands is not None:
+        nbSubBands = qdInterpreterConfig.nbSubBands
+
     # Create transmission parameters (frequencies, power per subband, noise)
-    txParam = TxParam()
-    txParam.allocateFrequencies(centerFrequency, channelWidth, bandBandwidth, guardBandwidth)
-    txParam.allocateTxPowerPerSubband(qdPropagationLoss.DbmtoW(deviceTxPowerDbm), False, txParam.getFrequencies(),
-                                      nbSubBands)
-    txParam.computeNoise()
+    # In auto mode, the default subbands are used until the Q-D channel is loaded to select the number of subbands
+    txParam = allocateTxParam(nbSubBands)
 
     scenarioPath = os.path.join(scenarioFolder, qdInterpreterConfig.scenarioName)
 
@@ -408,14 +840,19 @@ def initializeOracle(useVisualizer=False):
     codebookApName, codebookStaName = loadCodebookConfiguration(os.path.join(scenarioFolder, qdInterpreterConfig.scenarioName))
     codebookPickledName = codebookApName + codebookStaName + qdInterpreterConfig.codebookMode
     cachedCodebooksFile = os.path.join(CodebookFolder,pickleFolder, codebookPickledName + ".p")
-    if os.path.exists(cachedCodebooksFile):
+    # The pickled codebooks depend on the codebook files, on the way they are loaded, and on the Codebooks class format
+    codebookInputFiles = [os.path.join(CodebookFolder, codebookApName), os.path.join(CodebookFolder, codebookStaName)]
+    codebookParameters = {'formatVersion': codebookFormatVersion, 'codebookMode': qdInterpreterConfig.codebookMode,
+                          'beamTracking': qdInterpreterConfig.mimo == "beamTracking"}
+    if cacheManifest.isArtifactValid(cachedCodebooksFile, codebookInputFiles, codebookParameters,
+                                     qdInterpreterConfig.cacheValidation):
         # The codebooks combination has already been pickled - Just load the pickled file
         print("The codebook combination has been already computed previously - Just load it")
         codebooks = pickle.load(
             open(cachedCodebooksFile, "rb"))
     else:
-        # The Codebooks combination was never loaded - Load the codebooks first and then save the pickled codebooks
-        print("The codebook combination has never been computed - Perform the computation")
+        # The Codebooks combination was never loaded (or is outdated) - Load the codebooks first and then save the pickled codebooks
+        print("The codebook combination has never been computed or is outdated - Perform the computation")
         beamTrackingCodebook = False
         # Beamtracking codebooks files have a different format
         if qdInterpreterConfig.mimo == "beamTracking":
@@ -425,6 +862,8 @@ def initializeOracle(useVisualizer=False):
         if not os.path.exists(folderCodebook):
             os.makedirs(folderCodebook)
         pickle.dump(codebooks, open(cachedCodebooksFile, "wb"), protocol=pickle.HIGHEST_PROTOCOL)
+        cacheManifest.writeManifest(cachedCodebooksFile, codebookInputFiles, codebookParameters,
+                                    qdInterpreterConfig.cacheValidation)
 
 
     print("Codebook AP")
@@ -440,14 +879,35 @@ def initializeOracle(useVisualizer=False):
 
     environmentFile = os.path.join(scenarioPath, qdRealizationInputFolder, environmentFile)
     qdScenario = qdRealization.QdScenario(qdNbNodes, nbTraces, timeStep,qdInterpreterConfig)
+    channelSelection = getChannelSelection(qdInterpreterConfig, qdScenario)
     nsInput.readNs3Configuration(scenarioPath, "nodesConfiguration.txt", qdScenario)
     nsFolder = os.path.join(scenarioPath, qdRealizationOutputFolder, qdRealizationNsFolder)
     nsResultsFolder = os.path.join(nsFolder, resultsFolder)
 
+    # Inputs and parameters used to generate the data derived from the Q-D channel (SLS and MIMO results)
+    derivedDataInputFiles = [os.path.join(nsFolder, qdFilesFolder, qdJSON),
+                             os.path.join(scenarioPath, "nodesConfiguration.txt"),
+                             os.path.join(scenarioQdInputFolder, qdConfigurationFile)] + codebookInputFiles
+    derivedDataParameters = {'txParam': getTxParamSignature(), 'codebook': codebookParameters,
+                             'channelSelection': channelSelection.getSignature(),
+                             'channelPrecision': qdInterpreterConfig.channelPrecision,
+                             'reciprocity': qdInterpreterConfig.reciprocity,
+                             'mergeAngleBins': qdInterpreterConfig.mergeAngleBins,
+                             'sls': getSlsSignature()}
+
+    if qdInterpreterConfig.channelPrecisionReport:
+        reportChannelPrecision(os.path.join(nsFolder, qdFilesFolder, qdJSON), qdInterpreterConfig, qdScenario,
+                               channelSelection, txParam, codebooks)
+
     if qdInterpreterConfig.dataMode == 'online' or qdInterpreterConfig.mimoDataMode == "online" or qdInterpreterConfig.mimoDataMode == "preprocessed":
         # If dataMode or mimoDataMode is online (and mimoDataMode preprocessed), we need to load the Q-D channel
-        qdChannel = qdRealization.readJSONQdFile(nsFolder, qdFilesFolder, qdJSON, qdInterpreterConfig, qdScenario.nbNodes)
+        qdChannel = qdRealization.readJSONQdFile(nsFolder, qdFilesFolder, qdJSON, qdInterpreterConfig, qdScenario.nbNodes,
+                                                 channelSelection)
         qdScenario.qdChannel = qdChannel
+        if subbandsAuto:
+            # Select the number of subbands once (the signature of the derived data keeps the auto mode)
+            nbSubBands, txParam = selectNbSubBands(qdChannel, qdScenario, codebooks)
+            subbandsAuto = False
 
 
     if qdInterpreterConfig.slsEnabled:
@@ -456,30 +916,88 @@ def initializeOracle(useVisualizer=False):
         if qdInterpreterConfig.dataMode == 'preprocessed':
             # User wants to use preprocessed mode - The Oracle precomputes all the SLS results if needed
             slsPath = os.path.join(scenarioPath, preprocessedFolder, slsFolder)
-            if os.path.exists(slsPath) and qdInterpreterConfig.forceSlsDataRegeneration == 0:
+            # The plots are generated from the preprocessed SLS data and the nodes positions
+            plotsPath = os.path.join(scenarioPath, graphFolder)
+            plotsInputFiles = [cacheManifest.getManifestPath(slsPath),
+                               os.path.join(scenarioPath, qdRealizationOutputFolder, qdRealizationVisualizerFolder,
+                                            nodePositionJSON)]
+            # The data preprocessed before the SLS time series file existed must be generated again
+            slsDataValid = cacheManifest.isArtifactValid(slsPath, derivedDataInputFiles, derivedDataParameters,
+                                                         qdInterpreterConfig.cacheValidation) and os.path.isfile(
+                getSlsTimeSeriesFile())
+            # In auto mode, the data must record the number of subbands selected when they were preprocessed
+            slsOutputs = cacheManifest.readManifestOutputs(slsPath)
+            slsDataValid = slsDataValid and (not subbandsAuto or 'nbSubBands' in slsOutputs)
+            if slsDataValid and qdInterpreterConfig.forceSlsDataRegeneration == 0:
                 print("The preprocessed SLS data have already been generated - Just import them")
+                if subbandsAuto:
+                    # Use the number of subbands selected when the data were preprocessed
+                    nbSubBands = slsOutputs['nbSubBands']
+                    txParam = allocateTxParam(nbSubBands)
+                    subbandsAuto = False
+                    print("Subbands selected:", nbSubBands)
+                if slsMode == 'pruned' and 'slsPruningReport' in slsOutputs:
+                    # Print again the agreement measured when the data were preprocessed
+                    printSlsPruningReport(slsOutputs['slsPruningReport'])
                 # Read the preprocessed data
                 preprocessedSlsData, preprocessedAssociationData, dataIndex = loadPreprocessedData(qdScenario, codebooks)
 
-                if qdInterpreterConfig.forcePlotsRegeneration == 1:
-                    # User wants to regenerate the plots
+                if qdInterpreterConfig.forcePlotsRegeneration == 1 or not cacheManifest.isArtifactValid(
+                        plotsPath, plotsInputFiles, {}, qdInterpreterConfig.cacheValidation):
+                    # User wants to regenerate the plots or the plots are outdated
                     plotPreprocessedData(qdScenario, preprocessedAssociationData, codebooks)
+                    cacheManifest.writeManifest(plotsPath, plotsInputFiles, {}, qdInterpreterConfig.cacheValidation)
                 qdChannel = None
             else:
                 if not os.path.exists(slsPath):
                     # Data have not been previously preprocessed
                     print("The preprocessed SLS data do not exist - Generate them")
                     os.makedirs(slsPath)
+                elif qdInterpreterConfig.forceSlsDataRegeneration == 0:
+                    # The inputs changed since the data were preprocessed
+                    print("The preprocessed SLS data are outdated - Regenerate them")
                 else:
                     # The user forced the preprocessing of the data
                     print("Regenerate the SLS preprocessed data")
+                cacheManifest.invalidateArtifact(slsPath)
 
                 # We need to load the Q-D files to generate the data
-                qdChannel = qdRealization.readJSONQdFile(nsFolder, qdFilesFolder, qdJSON, qdInterpreterConfig,qdScenario.nbNodes)
+                qdChannel = qdRealization.readJSONQdFile(nsFolder, qdFilesFolder, qdJSON, qdInterpreterConfig,qdScenario.nbNodes,
+                                                         channelSelection)
+                if subbandsAuto:
+                    nbSubBands, txParam = selectNbSubBands(qdChannel, qdScenario, codebooks)
+                    subbandsAuto = False
+                # With --resume, the results of the pairs are checkpointed as they are preprocessed
+                # The checkpoint is reused only if it was generated from the same inputs and parameters
+                checkpointPath = os.path.join(slsPath, checkpointFolder)
+                pairsCheckpointPath = None
+                if qdInterpreterConfig.resume:
+                    if not cacheManifest.isArtifactValid(checkpointPath, derivedDataInputFiles,
+                                                         derivedDataParameters, qdInterpreterConfig.cacheValidation):
+                        print("No checkpoint matching the current inputs - Preprocess all the pairs")
+                        shutil.rmtree(checkpointPath, ignore_errors=True)
+                        os.makedirs(checkpointPath)
+                        cacheManifest.writeManifest(checkpointPath, derivedDataInputFiles, derivedDataParameters,
+                                                    qdInterpreterConfig.cacheValidation)
+                    pairsCheckpointPath = checkpointPath
                 preprocessedSlsData, preprocessedAssociationData, dataIndex = preprocessData(qdScenario, qdChannel,
-                                                                                             txParam, nbSubBands, codebooks)
+                                                                                             txParam, nbSubBands, codebooks,
+                                                                                             qdInterpreterConfig.workers,
+                                                                                             pairsCheckpointPath,
+                                                                                             qdInterpreterConfig.diskBackedResults)
+                slsOutputs = {'nbSubBands': nbSubBands}
+                if slsMode == 'pruned':
+                    # Keep the agreement with the preprocessed data to print it again when they are imported
+                    slsOutputs['slsPruningReport'] = reportSlsPruning(qdChannel, txParam, qdScenario, codebooks)
+                cacheManifest.writeManifest(slsPath, derivedDataInputFiles, derivedDataParameters,
+                                            qdInterpreterConfig.cacheValidation, slsOutputs)
+                # The checkpoint is not needed anymore once the preprocessed data are complete
+                shutil.rmtree(checkpointPath, ignore_errors=True)
                 # We force to generate the plots in this case as the data might have change
                 plotPreprocessedData(qdScenario, preprocessedAssociationData, codebooks)
+                cacheManifest.writeManifest(plotsPath, plotsInputFiles, {}, qdInterpreterConfig.cacheValidation)
+            if qdInterpreterConfig.exportSlsCsv:
+                exportSlsTimeSeriesCsv()
         elif qdInterpreterConfig.dataMode == 'online':
             print("Online Mode")
             # Online mode
@@ -489,6 +1007,9 @@ def initializeOracle(useVisualizer=False):
                 logger.critical(
                     "Online Mode Activated but visualizer not used - Please change the mode used or activate the visualizer ")
                 exit()
+            if slsMode == 'pruned':
+                # The SLS computed on the fly are pruned too
+                reportSlsPruning(qdChannel, txParam, qdScenario, codebooks)
             preprocessedSlsData = None
             preprocessedAssociationData = None
             dataIndex = None
@@ -550,7 +1071,8 @@ def initializeOracle(useVisualizer=False):
                 print("ns-3 SU-MIMO Results: Not Available")
             if qdInterpreterConfig.mimoDataMode == "preprocessed":
                 suMimoPickledFile = os.path.join(nsResultsFolder,"suMimoResults.p")
-                if os.path.exists(suMimoPickledFile):
+                if cacheManifest.isArtifactValid(suMimoPickledFile, derivedDataInputFiles, derivedDataParameters,
+                                                 qdInterpreterConfig.cacheValidation):
                     # Try to load the preprocessed SU-MIMO results
                     print("SU-MIMO preprocessed data already generated - Just load them")
                     qdScenario.oracleSuMimoResults = pickle.load(open(suMimoPickledFile, "rb"))
@@ -564,6 +1086,8 @@ def initializeOracle(useVisualizer=False):
                     qdScenario.oracleSuMimoResults = preprocessCompleteSuMimo(fakeInitiatorId, fakeResponderId, qdChannel,
                     qdScenario, txParam,
                     nbSubBands, codebooks,suMimoPickledFile)
+                    cacheManifest.writeManifest(suMimoPickledFile, derivedDataInputFiles, derivedDataParameters,
+                                                qdInterpreterConfig.cacheValidation)
         elif qdInterpreterConfig.mimo == "muMimo":
             # For now, codebook is only usable with one codebook combination due to how it is currently implemented in ns-3
             # The MU-MIMO could work with any codebook with minimal effort
@@ -590,7 +1114,8 @@ def initializeOracle(useVisualizer=False):
             if qdInterpreterConfig.mimoDataMode == "preprocessed":
                 # Try to load the preprocessed MU-MIMO results
                 muMimoPickledFile = os.path.join(nsResultsFolder, "muMimoResults.p")
-                if os.path.exists(muMimoPickledFile):
+                if cacheManifest.isArtifactValid(muMimoPickledFile, derivedDataInputFiles, derivedDataParameters,
+                                                 qdInterpreterConfig.cacheValidation):
                     print("MU-MIMO preprocessed data already generated - Just load them")
                     qdScenario.oracleMuMimoResults = pickle.load(open(muMimoPickledFile, "rb"))
                 else:
@@ -603,6 +1128,8 @@ def initializeOracle(useVisualizer=False):
                     qdScenario.oracleMuMimoResults = preprocessCompleteMuMimo(fakeInitiatorId, fakeGroupId, qdChannel,
                                                                               qdScenario, txParam,
                                                                               nbSubBands, codebooks,muMimoPickledFile)
+                    cacheManifest.writeManifest(muMimoPickledFile, derivedDataInputFiles, derivedDataParameters,
+                                                qdInterpreterConfig.cacheValidation)
     else:
         # MIMO Not Enabled
         qdScenario.maxSupportedStreams = 0
@@ -622,12 +1149,15 @@ def initializeOracle(useVisualizer=False):
         printProgressBarWithoutETA(fileLoaded, nbJsonFileToLoad,
                                    prefix='', suffix='Complete',
                                    length=50)
-        qdRealization.readJSONMPCFile(scenarioQdVisualizerFolder, mpcJSON)  # TODO See if it needs to be pickled
+        qdRealization.readJSONMPCFile(scenarioQdVisualizerFolder, mpcJSON,
+                                      qdRealization.getCachedQdFolder(nsFolder, qdFilesFolder), channelSelection,
+                                      qdInterpreterConfig.cacheValidation)
         fileLoaded += 1
         printProgressBarWithoutETA(fileLoaded, nbJsonFileToLoad,
                                    prefix='', suffix='Complete',
                                    length=50)
-        qdRealization.readJSONNodesPositionFile(scenarioQdVisualizerFolder, nodePositionJSON, qdScenario)
+        qdRealization.readJSONNodesPositionFile(scenarioQdVisualizerFolder, nodePositionJSON, qdScenario,
+                                                channelSelection)
         fileLoaded += 1
         printProgressBarWithoutETA(fileLoaded, nbJsonFileToLoad,
                                    prefix='', suffix='Complete',
@@ -85,7 +85,8 @@ def getInputValues(qdScenario, inputToUse):
     # Load the STAs and APs coordinates and rotations information
     scenarioQdVisualizerFolder = os.path.join(gb.scenarioPath, gb.qdRealizationOutputFolder,
                                               gb.qdRealizationVisualizerFolder)
-    qdRealization.readJSONNodesPositionFile(scenarioQdVisualizerFolder, gb.nodePositionJSON, qdScenario)
+    qdRealization.readJSONNodesPositionFile(scenarioQdVisualizerFolder, gb.nodePositionJSON, qdScenario,
+                                            qdScenario.channelSelection)
     # Transform the data for the ML framework
     if inputToUse == InputToUse.COORDINATES:
         # Use only Coordinates
@@ -108,6 +109,46 @@ def getInputValues(qdScenario, inputToUse):
     return inputData
 
 
+def getSectorsPowerW(dataIndex, slsRxPower, txIds, rxIds, nbTraces):
+    """Get the power received in W for every sector and trace of several transmissions at once
+
+    Parameters
+    ----------
+    dataIndex : DataIndex class
+        Used for the correct indexing of slsRxPower
+    slsRxPower : Numpy array
+        The preprocessed data from the SLS phase (it contains the Rx Power for every transmission for all sectors tested in the SLS phase)
+    txIds : Numpy array
+        The transmitters of the transmissions
+    rxIds : Numpy array
+        The receivers of the transmissions (same size as txIds)
+    nbTraces : int
+        Number of traces
+
+    Returns
+    -------
+    sectorsPower : Numpy array
+        The power received for every sector (columns) of every transmission and trace (row = traceId + transmission * nbTraces)
+
+    Raises
+    ------
+    ValueError
+        If the power of some sectors was not evaluated (SLS data preprocessed with the pruned SLS mode)
+    """
+    # Build the (IdTx,IdRx,IdPaaTx,IdPaaRx,traceIndex) tuples of every transmission and trace
+    # TODO The 0,0 should be the paaTx,paaRx (not a problem until we use MIMO)
+    txRxs = np.stack(np.broadcast_arrays(np.asarray(txIds)[:, np.newaxis], np.asarray(rxIds)[:, np.newaxis], 0, 0,
+                                         np.arange(nbTraces)), axis=-1).reshape(-1, 5)
+    sectorsPower = slsRxPower[dataIndex.getRows(txRxs)]
+    if np.isnan(sectorsPower).any():
+        # The pruned SLS evaluates only the candidate sectors - The ground truth would mix exact and missing values
+        raise ValueError("The power of every sector is needed for the ground truth but some sectors were not "
+                         "evaluated - Preprocess the SLS data with --slsMode exhaustive")
+    # Our default behavior is to return a power of -infinite when the communication between nodes is impossible
+    # Replace the -infinite values with large negative values to allow the training
+    return qdPropagationLoss.DbmtoW(np.nan_to_num(sectorsPower))
+
+
 def getGroundTruthValues(qdScenario, codebooks, communicationMode, dataIndex, targetApId, targetStaId, slsRxPower):
     """Get the ground truth values (in our case, the power received in dBm for every sector and traces)
 
@@ -117,7 +158,7 @@ def getGroundTruthValues(qdScenario, codebooks, communicationMode, dataIndex, ta
         Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
     communicationMode : CommunicationMode Class Enum
         The communication mode used for the training (AP_TO_STAS, STAS_TO_AP, or STAS_TO_STA)
-    dataIndex : Dic
+    dataIndex : DataIndex class
         Used for the correct indexing of slsRxPower (preprocessed slsRxPower file can be pretty huge and we removed the indexing from the file to save some space so we reconstruct it at runtime)
     targetApId : int
         The AP to consider when AP_TO_STAS or STAS_TO_AP mode is used
@@ -126,80 +167,47 @@ def getGroundTruthValues(qdScenario, codebooks, communicationMode, dataIndex, ta
     slsRxPower : Numpy array
         The preprocessed data from the SLS phase (it contains the Rx Power for every transmission for all sectors tested in the SLS phase)
     """
+    staIds = np.arange(qdScenario.nbAps, qdScenario.nbNodes)
     if communicationMode == CommunicationMode.AP_TO_STAS:
         #####################################################
         #    AP TO STAs                                     #
         #####################################################
         # We want to perform the training using the SLS data of one AP (targetApId) to all the STAs
-        rowIndex = 0
         nbSectorsPerApAntenna = codebooks.getNbSectorPerApAntenna()
         y_all = np.zeros((qdScenario.nbTraces * qdScenario.nbStas, nbSectorsPerApAntenna))
-
-        for staId in range(qdScenario.nbAps, qdScenario.nbNodes):
-            # Iterate over all the STAs in the simulation
-            for traceId in range(qdScenario.nbTraces):
-                # Iterate over all the traces of the simulation
-                # We get the power for every tx sector for a given trace for targetApId to staId transmission and convert it from dBm to W
-                index = dataIndex[(targetApId, staId, 0, 0,
-                                   traceId)]  # Get the index for the slsRxPower TODO The 0,0 should be the paaTx,paaRx (not a problem until we use MIMO)
-                # Our default behavior is to return a power of -infinite when the communication between nodes is impossible
-                # Replace the -infinite values with large negative values to allow the training
-                slsRxPowerWithoutInfinite = np.nan_to_num(slsRxPower[index])
-                y_all[traceId + rowIndex * qdScenario.nbTraces] = qdPropagationLoss.DbmtoW(slsRxPowerWithoutInfinite)
-                # We transform the data to have the sum of all the power per sector of a given trace equal to 1
-                y_all[traceId + rowIndex * qdScenario.nbTraces] = y_all[traceId + rowIndex * qdScenario.nbTraces] / sum(
-                    y_all[traceId + rowIndex * qdScenario.nbTraces])
-            rowIndex += 1
+        # We get the power for every tx sector for every trace for targetApId to all the STAs transmissions
+        y_all[:] = getSectorsPowerW(dataIndex, slsRxPower, np.full_like(staIds, targetApId), staIds,
+                                    qdScenario.nbTraces)
+        # We transform the data to have the sum of all the power per sector of a given trace equal to 1
+        y_all /= y_all.sum(axis=1, keepdims=True)
     elif communicationMode == CommunicationMode.STAS_TO_AP:
         ######################################################
         #     STAs TO AP                                      #
         ######################################################
         # We want to perform the training using the SLS data from all STAs to one AP (apTargetId)
-        rowIndex = 0
         nbSectorsPerStaAntenna = codebooks.getNbSectorPerStaAntenna()
         y_all = np.zeros((qdScenario.nbTraces * qdScenario.nbStas, nbSectorsPerStaAntenna))
-        for staId in range(qdScenario.nbAps, qdScenario.nbNodes):
-            # Iterate over all the STAs in the simulation
-            for traceId in range(qdScenario.nbTraces):
-                # Iterate over all the traces of the simulation
-                # We get the power for every tx sector for a given trace for staId to targetApId transmission and convert it from dBm to W
-                index = dataIndex[(staId, targetApId, 0, 0,
-                                   traceId)]  # Get the index for the slsRxPower TODO The 0,0 should be the paaTx,paaRx (not a problem as we are not in MIMO case)
-
-                # Our default behavior is to return a power of -infinite when the communication between nodes is impossible
-                # Replace the -infinite values with negative large values to allow the training
-                slsRxPowerWithoutInfinite = np.nan_to_num(slsRxPower[index])
-                y_all[traceId + rowIndex * qdScenario.nbTraces] = qdPropagationLoss.DbmtoW(slsRxPowerWithoutInfinite)
-                # We transform the data to have the sum of all the power per sector of a given trace equal to 1
-                y_all[traceId + rowIndex * qdScenario.nbTraces] = y_all[traceId + rowIndex * qdScenario.nbTraces] / sum(
-                    y_all[traceId + rowIndex * qdScenario.nbTraces])
-            rowIndex += 1
+        # We get the power for every tx sector for every trace for all the STAs to targetApId transmissions
+        y_all[:] = getSectorsPowerW(dataIndex, slsRxPower, staIds, np.full_like(staIds, targetApId),
+                                    qdScenario.nbTraces)
+        # We transform the data to have the sum of all the power per sector of a given trace equal to 1
+        y_all /= y_all.sum(axis=1, keepdims=True)
     elif communicationMode == CommunicationMode.STAS_TO_STA:
         ######################################################
         #     STAs TO STA                                    #
         ######################################################
         # We want to perform the training using the SLS data of ALL STAs (minus one, the targetStaId) to one STA (targetStaId)
         # Get all the power received for all STAs to targetStaId transmissions and this for every tx sector of the STAs
-        rowIndex = 0
         nbSectorsPerStaAntenna = codebooks.getNbSectorPerStaAntenna()
         y_all = np.zeros((qdScenario.nbTraces * qdScenario.nbStas, nbSectorsPerStaAntenna))
-        for staId in range(qdScenario.nbAps, qdScenario.nbNodes):
-            for traceId in range(qdScenario.nbTraces):
-                # Go over every traces
-                if targetStaId == staId:
-                    # We don't want to add the targetStaId to targetStaId data
-                    break
-                index = dataIndex[(staId, targetStaId, 0, 0,
-                                   traceId)]  # Get the index for the slsRxPower TODO The 0,0 should be the paaTx,paaRx (not a problem as we are not in MIMO case)
-                # Our default behavior is to return a power of -infinite when the communication between nodes is impossible
-                # Replace the -infinite values with negative large values to allow the training
-                slsRxPowerWithoutInfinite = np.nan_to_num(slsRxPower[index])
-                y_all[traceId + rowIndex * qdScenario.nbTraces] = qdPropagationLoss.DbmtoW(slsRxPowerWithoutInfinite)
-                if sum(y_all[traceId + rowIndex * qdScenario.nbTraces]) != 0:
-                    y_all[traceId + rowIndex * qdScenario.nbTraces] = y_all[
-                                                                          traceId + rowIndex * qdScenario.nbTraces] / sum(
-                        y_all[traceId + rowIndex * qdScenario.nbTraces])
-            rowIndex += 1
+        # We don't want to add the targetStaId to targetStaId data (its rows are left to 0)
+        txStas = staIds != targetStaId
+        y_all.reshape(qdScenario.nbStas, qdScenario.nbTraces, nbSectorsPerStaAntenna)[txStas] = getSectorsPowerW(
+            dataIndex, slsRxPower, staIds[txStas], np.full(np.count_nonzero(txStas), targetStaId),
+            qdScenario.nbTraces).reshape(-1, qdScenario.nbTraces, nbSectorsPerStaAntenna)
+        totalPower = y_all.sum(axis=1)
+        nonZeroRows = totalPower != 0
+        y_all[nonZeroRows] /= totalPower[nonZeroRows, np.newaxis]
     return y_all
 
 
@@ -214,7 +222,7 @@ def topKSls(qdScenario, codebooks, slsRxPower, dataIndex, communicationMode=Comm
         Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
     slsRxPower : Numpy array
         The preprocessed data from the SLS phase (it contains the Rx Power for every transmission for all sectors tested in the SLS phase)
-    dataIndex : Dic
+    dataIndex : DataIndex class
         Used for the correct indexing of slsRxPower (preprocessed slsRxPower file can be pretty huge and we removed the indexing from the file to save some space so we reconstruct it at runtime)
     communicationMode : Enum
         The communication mode used for the training (AP_TO_STAS, STAS_TO_AP, or STAS_TO_STA)
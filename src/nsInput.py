@@ -348,6 +348,9 @@ def getNsSlsResultsTxRxTrace(txNode,rxNode, traceId,qdScenario):
 
 
     """
+    if qdScenario.channelSelection is not None:
+        # The ns-3 results are indexed with the Q-D realization software traces
+        traceId = qdScenario.channelSelection.getAbsoluteTraceIndex(traceId)
     # As we don't have the results for every trace, we must find the last time an SLS was performed
     txToRxDf = qdScenario.nsSlsResults.loc[(qdScenario.nsSlsResults["SRC_ID"] == txNode) & (qdScenario.nsSlsResults["DST_ID"] == rxNode)]
     if txToRxDf.empty:
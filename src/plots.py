@@ -28,13 +28,13 @@ import os
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 from matplotlib import cm
 from matplotlib.colors import ListedColormap
 from matplotlib.font_manager import FontProperties
 
 import globals
 import qdRealization
+from preprocessData import loadSlsTimeSeries
 
 class OraclePlot:
     """A class to facilitate the creation of simple plots.
@@ -108,7 +108,8 @@ def plotSlsMetrics(qdScenario,codebooks):
     codebooks : Codebooks class
         Class containing the directionality of the sectors and quasi-omni pattern for the STAs and APs
     """
-    dataPath = os.path.join(globals.scenarioPath, globals.dataFolder)
+    # The time series of all the pairs are read from the single SLS time series file
+    slsTimeSeries, pairRows = loadSlsTimeSeries()
 
     nbNodesPermutations = globals.nPr(qdScenario.nbNodes,
                                       2)  # Total number of nodes permutations (used for progress bar)
@@ -124,17 +125,13 @@ def plotSlsMetrics(qdScenario,codebooks):
                     for rxAntennaID in range(codebooks.getNbPaaNode(qdScenario.getNodeType(rxId))):
                         # Iterate over all the Rx PAAs
 
+                        pairRow = pairRows[(txId, rxId, txAntennaID, rxAntennaID)]
                         # Plot Rx Power curves for I-Txss
                         rxPowerItxssFile = "RxPower" + "Node" + str(txId) + "Node" + str(rxId) + "PAATx" + str(
                             txAntennaID) + "PAARx" + str(rxAntennaID) + ".csv"
-                        fileName = os.path.join(dataPath, os.path.join(globals.slsFolder, globals.rxPowerItxssFolder),
-                                                rxPowerItxssFile)
-                        data = pd.read_csv(fileName)
-                        # Just get the column of interest
-                        df = pd.DataFrame(data, columns=['traceIndex', 'rxPower'])
                         # Plot received power from the best sector
-                        xValues = df['traceIndex']
-                        yValues = df['rxPower']
+                        xValues = slsTimeSeries['traceIndex']
+                        yValues = slsTimeSeries['rxPower'][pairRow]
                         xLegend = "Trace Index"
                         yLegend = "Received Power (dBm)"
                         titleGraph = "Node:" + str(txId) + " => Node:" + str(rxId) + " PAA Tx:" + str(
@@ -148,13 +145,8 @@ def plotSlsMetrics(qdScenario,codebooks):
                         # Plot Best I-TXSS Sector
                         bestItxssSectorFile = "BestSector" + "Node" + str(txId) + "Node" + str(rxId) + "PAATx" + str(
                             txAntennaID) + "PAARx" + str(rxAntennaID) + ".csv"
-                        fileName = os.path.join(dataPath,
-                                                os.path.join(globals.slsFolder, globals.bestSectorItxssFolder),
-                                                bestItxssSectorFile)
-                        data = pd.read_csv(fileName)
-                        df = pd.DataFrame(data, columns=['traceIndex', 'sector'])
-                        xValues = df['traceIndex']
-                        yValues = df['sector']
+                        xValues = slsTimeSeries['traceIndex']
+                        yValues = slsTimeSeries['bestSector'][pairRow]
                         xLegend = "Trace Index"
                         yLegend = "Best Sector"
                         titleGraph = "Node:" + str(txId) + " => Node:" + str(rxId) + " PAA Tx:" + str(
@@ -180,7 +172,8 @@ def plotMobilityMetrics(qdScenario):
     """
     scenarioQdVisualizerFolder = os.path.join(globals.scenarioPath, globals.qdRealizationOutputFolder,
                                               globals.qdRealizationVisualizerFolder)
-    qdRealization.readJSONNodesPositionFile(scenarioQdVisualizerFolder, globals.nodePositionJSON,qdScenario)
+    qdRealization.readJSONNodesPositionFile(scenarioQdVisualizerFolder, globals.nodePositionJSON,qdScenario,
+                                            qdScenario.channelSelection)
 
     destinationPath = os.path.join(globals.scenarioPath, globals.graphFolder, "Mobility")
     if not os.path.exists(destinationPath):
@@ -21,17 +21,20 @@
 # developed by NIST is not subject to copyright protection within the United                         #
 # States.                                                                                            #
 ######################################################################################################
+import copy
 import datetime
 import os
 import pickle
 import time
 import itertools
+import multiprocessing
+import numba
 import numpy as np
 import pandas as pd
 import qdPropagationLoss
 import globals
 import math
-from qdPropagationLoss import performSls
+from qdPropagationLoss import performSls, performSlsTraces, performSlsTracesReciprocal
 from heapq import heappush, heappushpop
 
 
@@ -57,6 +60,103 @@ class SlsResults:
         self.bestSectorRxPowerList = bestSectorRxPowerList
 
 
+class DataIndex:
+    """
+    Mapping between the (IdTx,IdRx,IdPaaTx,IdPaaRx,traceIndex) tuples and the rows of the preprocessed data
+
+    The rows enumerate the TX nodes, the RX nodes (different from the TX node), the TX PAAs, the RX PAAs, and the
+    traces in this order. The row of a tuple is thus computed from the first row of its (TX, RX) block and from the
+    strides of the PAAs and of the traces instead of being stored for every tuple.
+
+    Attributes
+    ----------
+    nbPaas : Numpy array
+        Number of PAAs of every node
+
+    nbTraces : int
+        Number of traces
+
+    pairOffsets : Numpy array
+        Row of the (IdTx,IdRx,0,0,0) tuple of every (TX, RX) pair of nodes (-1 if TX = RX)
+
+    nbRows : int
+        Total number of rows
+    """
+    def __init__(self, nbPaas, nbTraces):
+        self.nbPaas = np.asarray(nbPaas, dtype=np.int64)
+        self.nbTraces = nbTraces
+        # Number of rows of every (TX, RX) block
+        blockSizes = np.outer(self.nbPaas, self.nbPaas) * nbTraces
+        np.fill_diagonal(blockSizes, 0)
+        self.pairOffsets = (np.cumsum(blockSizes.ravel()) - blockSizes.ravel()).reshape(blockSizes.shape)
+        np.fill_diagonal(self.pairOffsets, -1)
+        self.nbRows = int(blockSizes.sum())
+
+    def __len__(self):
+        return self.nbRows
+
+    def __getitem__(self, txRx):
+        return self.getRow(txRx)
+
+    def getRow(self, txRx):
+        """Get the row of a (IdTx,IdRx,IdPaaTx,IdPaaRx,traceIndex) tuple
+
+        Parameters
+        ----------
+        txRx : Tuple
+            ID of the transmitter, receiver, PAA transmitter, PAA receiver, and the trace Index
+
+        Returns
+        -------
+        row : int
+            The row of the tuple in the preprocessed data
+
+        Raises
+        ------
+        KeyError
+            If the tuple is not part of the preprocessed data
+        """
+        idTx, idRx, idPaaTx, idPaaRx, traceIndex = txRx
+        nbNodes = len(self.nbPaas)
+        if not (0 <= idTx < nbNodes and 0 <= idRx < nbNodes and idTx != idRx
+                and 0 <= idPaaTx < self.nbPaas.item(idTx) and 0 <= idPaaRx < self.nbPaas.item(idRx)
+                and 0 <= traceIndex < self.nbTraces):
+            raise KeyError(txRx)
+        return self.pairOffsets.item(idTx, idRx) + (idPaaTx * self.nbPaas.item(idRx) + idPaaRx) * self.nbTraces + \
+            traceIndex
+
+    def getRows(self, txRxs):
+        """Get the rows of several (IdTx,IdRx,IdPaaTx,IdPaaRx,traceIndex) tuples at once
+
+        Parameters
+        ----------
+        txRxs : Numpy array
+            The tuples (the last axis must be of size 5)
+
+        Returns
+        -------
+        rows : Numpy array
+            The row of every tuple in the preprocessed data (shape of txRxs without its last axis)
+
+        Raises
+        ------
+        KeyError
+            If a tuple is not part of the preprocessed data
+        """
+        txRxs = np.asarray(txRxs, dtype=np.int64)
+        idTx, idRx, idPaaTx, idPaaRx, traceIndex = np.moveaxis(txRxs, -1, 0)
+        nbNodes = len(self.nbPaas)
+        validNodes = (idTx >= 0) & (idTx < nbNodes) & (idRx >= 0) & (idRx < nbNodes) & (idTx != idRx)
+        if not np.all(validNodes):
+            raise KeyError(tuple(txRxs[~validNodes][0].tolist()))
+        nbPaasRx = self.nbPaas[idRx]
+        valid = (idPaaTx >= 0) & (idPaaTx < self.nbPaas[idTx]) & (idPaaRx >= 0) & (idPaaRx < nbPaasRx) & (
+                traceIndex >= 0) & (traceIndex < self.nbTraces)
+        if not np.all(valid):
+            raise KeyError(tuple(txRxs[~valid][0].tolist()))
+        return self.pairOffsets[idTx, idRx] + (idPaaTx * nbPaasRx + idPaaRx) * self.nbTraces + traceIndex
+
+
 def getSuMimoAllValidStreamCombinations(nbPaaTx, nbPaaRx):
     """
     Get the list of all possible individual SU-MIMO stream combinations
@@ -224,7 +324,7 @@ def performSuMimoSisoPhase(txId, rxId, nbPaaTx, nbPaaRx, traceIndex, qdPropertie
             rxPower, snr, psdBestSector, txssSector, rxPowerSectorList = performSls(
                 (txId, rxId, mimoTxAntennaId, mimoRxAntennaId, traceIndex), qdProperties, txParam,
                 nbSubBands,
-                qdScenario, codebooks)
+                qdScenario, codebooks, 'exhaustive')  # The MIMO needs the power of every sector
             rxPowerSectorList = np.asarray(rxPowerSectorList)
             snrList = 10 * np.log10(qdPropagationLoss.DbmtoW(rxPowerSectorList) / txParam.getNoise())
             mimoSisoResults[mimoTxAntennaId, mimoRxAntennaId] = (rxPowerSectorList,
@@ -279,7 +379,7 @@ def performMuMimoSisoPhase(mode,mimoInitiatorId,nbPaaMimoInitiator, mimoResponde
                 # Initiator case - The results are computed from AP to STAs
                 rxPowerITXSS, snrITXSS, psdBestSectorITXSS, txssSectorITXSS, rxPowerSectorListITXSS = performSls(
                     (mimoInitiatorId, rxNode, mimoTxAntennaId, 0, traceIndex), qdProperties, txParam, nbSubBands,
-                    qdScenario, codebooks)  # 0 should be rx antenna id and traceId
+                    qdScenario, codebooks, 'exhaustive')  # 0 should be rx antenna id and traceId (the MIMO needs the power of every sector)
                 rxPowerSectorListITXSS = np.asarray(rxPowerSectorListITXSS)
                 snrListITXSS = 10 * np.log10(qdPropagationLoss.DbmtoW(rxPowerSectorListITXSS) / txParam.getNoise())
 
@@ -288,7 +388,7 @@ def performMuMimoSisoPhase(mode,mimoInitiatorId,nbPaaMimoInitiator, mimoResponde
                 # We are in the initiator case - The results are computed from STAs to AP
                 rxPowerRTXSS, snrRTXSS, psdBestSectorRTXSS, txssSectorRTXSS, rxPowerSectorListRTXSS = performSls(
                             (rxNode, mimoInitiatorId, 0, mimoTxAntennaId, traceIndex), qdProperties, txParam, nbSubBands,
-                            qdScenario, codebooks)  # 0 should be rx antenna id and traceId
+                            qdScenario, codebooks, 'exhaustive')  # 0 should be rx antenna id and traceId (the MIMO needs the power of every sector)
                 rxPowerSectorListRTXSS = np.asarray(rxPowerSectorListRTXSS)
                 snrListITXSS = 10 * np.log10(qdPropagationLoss.DbmtoW(rxPowerSectorListRTXSS) / txParam.getNoise())
                 mimoSisoResults[rxNode, mimoTxAntennaId] = (rxPowerSectorListRTXSS, snrListITXSS)
@@ -631,20 +731,20 @@ def performSuMimoBft(traceIndex, mimoInitiatorId, anglesInitiator, directivityIn
                             # Check if we already computed the propagation loss precomputed value
                             if (txRx) not in precomputedValue:
                                 # The computation has never been done
-                                nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = qdPropagationLoss.precomputeTxValues(
+                                nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = qdPropagationLoss.precomputeTxValues(
                                     txRx, qdProperties, txParam.getCenterFrequencies())
                                 precomputedValue[(
-                                    txRx)] = nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading
+                                    txRx)] = nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading
                             else:
                                 # The computation has been done - Get the precomputed values
-                                nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = \
+                                nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = \
                                     precomputedValue[(txRx)]
 
                             # Compute the received power for the intended transmission
                             intendedRxPower, intendedRxpsd = qdPropagationLoss.computeSteeredRx(
                                 intendedDirectivityTx, intendedDirectivityRx, txParam, nbSubBands,
-                                qdScenario, codebooks, nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle,
-                                elevationRxAngle, smallScaleFading)
+                                qdScenario, codebooks, nbMpcs, txAngleIndex, rxAngleIndex,
+                                smallScaleFading)
                             testStoredPower[(txRx, intendedTxAzimuthAwv, intendedTxElevationAwv, intendedRxAzimuthAwv,
                                              intendedRxElevationAwv)] = intendedRxPower, intendedRxpsd
                         else:
@@ -686,20 +786,20 @@ def performSuMimoBft(traceIndex, mimoInitiatorId, anglesInitiator, directivityIn
                                 if (txRx, interferingTxAzimuthAwv, interferingTxElevationAwv, intendedRxAzimuthAwv,
                                     intendedRxElevationAwv) not in testStoredPower:
                                     if (txRx) not in precomputedValue:
-                                        nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = qdPropagationLoss.precomputeTxValues(
+                                        nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = qdPropagationLoss.precomputeTxValues(
                                             txRx, qdProperties, txParam.getCenterFrequencies())
                                         precomputedValue[(
-                                            txRx)] = nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading
+                                            txRx)] = nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading
                                     else:
-                                        nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = \
+                                        nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = \
                                             precomputedValue[(txRx)]
 
                                     interferingRxPower, interferingRxpsd = qdPropagationLoss.computeSteeredRx(
                                          interferingDirectivityTx,
                                         intendedDirectivityRx, txParam,
                                         nbSubBands,
-                                        qdScenario, codebooks, nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle,
-                                        elevationRxAngle, smallScaleFading)
+                                        qdScenario, codebooks, nbMpcs, txAngleIndex, rxAngleIndex,
+                                        smallScaleFading)
                                     testStoredPower[(
                                         txRx, interferingTxAzimuthAwv, interferingTxElevationAwv, intendedRxAzimuthAwv,
                                         intendedRxElevationAwv)] = interferingRxPower, interferingRxpsd
@@ -857,20 +957,20 @@ def performMuMimoBft(traceIndex,mimoInitiatorId,anglesInitiator, directivityInit
                             # Check if we already computed the propagation loss precomputed value
                             if (txRx) not in precomputedValue:
                                 # The computation has never been done
-                                nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = qdPropagationLoss.precomputeTxValues(
+                                nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = qdPropagationLoss.precomputeTxValues(
                                     txRx, qdProperties, txParam.getCenterFrequencies())
                                 precomputedValue[(
-                                    txRx)] = nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading
+                                    txRx)] = nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading
                             else:
                                 # The computation has been done - Get the precomputed values
-                                nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = \
+                                nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = \
                                     precomputedValue[(txRx)]
 
                             # Compute the received power for the intended transmission
                             intendedRxPower, intendedRxpsd = qdPropagationLoss.computeSteeredRx(
                                 intendedDirectivityTx, intendedDirectivityRx, txParam, nbSubBands,
-                                qdScenario, codebooks, nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle,
-                                elevationRxAngle, smallScaleFading)
+                                qdScenario, codebooks, nbMpcs, txAngleIndex, rxAngleIndex,
+                                smallScaleFading)
                             testStoredPower[(txRx, intendedTxAzimuthAwv, intendedTxElevationAwv, intendedRxAzimuthAwv,
                                              intendedRxElevationAwv)] = intendedRxPower, intendedRxpsd
                         else:
@@ -904,20 +1004,20 @@ def performMuMimoBft(traceIndex,mimoInitiatorId,anglesInitiator, directivityInit
                                 if (txRx, interferingTxAzimuthAwv, interferingTxElevationAwv, intendedRxAzimuthAwv,
                                     intendedRxElevationAwv) not in testStoredPower:
                                     if (txRx) not in precomputedValue:
-                                        nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = qdPropagationLoss.precomputeTxValues(
+                                        nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = qdPropagationLoss.precomputeTxValues(
                                             txRx, qdProperties, txParam.getCenterFrequencies())
                                         precomputedValue[(
-                                            txRx)] = nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading
+                                            txRx)] = nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading
                                     else:
-                                        nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = \
+                                        nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = \
                                             precomputedValue[(txRx)]
 
                                     interferingRxPower, interferingRxpsd = qdPropagationLoss.computeSteeredRx(
                                         interferingDirectivityTx,
                                         intendedDirectivityRx, txParam,
                                         nbSubBands,
-                                        qdScenario, codebooks, nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle,
-                                        elevationRxAngle, smallScaleFading)
+                                        qdScenario, codebooks, nbMpcs, txAngleIndex, rxAngleIndex,
+                                        smallScaleFading)
                                     testStoredPower[(
                                         txRx, interferingTxAzimuthAwv, interferingTxElevationAwv, intendedRxAzimuthAwv,
                                         intendedRxElevationAwv)] = interferingRxPower, interferingRxpsd
@@ -1079,8 +1179,13 @@ def preprocessCompleteSuMimo(mimoInitiatorId, mimoResponderId, qdChannel, qdScen
     for traceIndex in range(qdScenario.nbTraces):
         print("Trace:",traceIndex, " SU-MIMO BF computed - ", qdScenario.nbTraces-traceIndex, "traces remaining")
         # Iterate over all the traces for the pair and compute SU-MIMO results
-        results = computeSuMimoBft(mimoInitiatorId, mimoResponderId,traceIndex,
-             qdScenario, qdChannel, txParam, nbSubBands, codebooks, topK)
+        if qdChannel.isTraceRepeated([mimoInitiatorId, mimoResponderId], traceIndex):
+            # Same MPCs as the previous trace - Reuse its results
+            results = copy.copy(suMimoResults[traceIndex - 1, mimoInitiatorId, mimoResponderId])
+            results.traceId = traceIndex
+        else:
+            results = computeSuMimoBft(mimoInitiatorId, mimoResponderId,traceIndex,
+                 qdScenario, qdChannel, txParam, nbSubBands, codebooks, topK)
         suMimoResults[traceIndex,mimoInitiatorId,mimoResponderId] = results
 
     # Pickle the results
@@ -1196,7 +1301,12 @@ def preprocessCompleteMuMimo(mimoInitiatorId, mimoGroupId, qdChannel, qdScenario
     topK = 200
     for traceIndex in range(qdScenario.nbTraces):
         print("Trace:", traceIndex, " SU-MIMO BF computed - ", qdScenario.nbTraces - traceIndex, "traces remaining")
-        results = computeMuMimoBft(mimoInitiatorId,mimoResponderIds,traceIndex,qdScenario, qdScenario.qdChannel, txParam, 355, codebooks, topK)
+        if qdScenario.qdChannel.isTraceRepeated([mimoInitiatorId] + mimoResponderIds, traceIndex):
+            # Same MPCs as the previous trace - Reuse its results
+            results = copy.copy(muMimoResults[traceIndex - 1, mimoGroupId])
+            results.traceId = traceIndex
+        else:
+            results = computeMuMimoBft(mimoInitiatorId,mimoResponderIds,traceIndex,qdScenario, qdScenario.qdChannel, txParam, nbSubBands, codebooks, topK)
         muMimoResults[traceIndex,mimoGroupId] = results
 
     pickle.dump(muMimoResults, open(muMimoPickledFile, "wb"),
@@ -1205,9 +1315,280 @@ def preprocessCompleteMuMimo(mimoInitiatorId, mimoGroupId, qdChannel, qdScenario
     return muMimoResults
 
 
-def preprocessData(qdScenario, qdProperties, txParam, nbSubBands, codebooks):
+# Settings of the globals module used by the SLS and restored in the preprocessing workers
+# (they are not inherited when the processes of the pool are spawned instead of forked)
+preprocessWorkerGlobals = ['slsMethod', 'slsFastMath', 'slsMode', 'slsTopK', 'slsScreeningSubbands']
+
+# Data used by preprocessPair: (qdScenario, qdProperties, txParam, nbSubBands, codebooks, checkpointPath)
+preprocessWorkerContext = None
+
+# Names of the results of a pair stored in a checkpoint shard (the results of performSlsTraces merged in the
+# preprocessed data, i.e., without the SNR and the PSD)
+checkpointResults = ['rxPower', 'bestSector', 'rxPowerPerSector']
+
+# File containing the preprocessed SLS results (npz archive of the arrays of slsResultsArrays)
+slsResultsFile = "allSlsResultsNumpy.npy"
+# Type of the arrays of the preprocessed SLS results (stored as one .npy file per array when they are disk-backed)
+slsResultsArrays = {'bestSector': np.int16, 'allPower': np.float64, 'bestPower': np.float64}
+
+
+def initPreprocessWorker(context, globalSettings, nbWorkers):
+    """Initialize a process of the preprocessing pool
+
+    Parameters
+    ----------
+    context : Tuple
+        The data shared by all the pairs (see preprocessWorkerContext)
+
+    globalSettings : dict
+        The value of the settings of the globals module (see preprocessWorkerGlobals)
+
+    nbWorkers : int
+        Number of processes of the pool
+    """
+    global preprocessWorkerContext
+    preprocessWorkerContext = context
+    for name, value in globalSettings.items():
+        setattr(globals, name, value)
+    # Share the cores between the workers when the numba SLS kernel is used
+    numba.set_num_threads(max(1, numba.config.NUMBA_NUM_THREADS // nbWorkers))
+
+
+def preprocessPair(pairKey):
+    """Perform the SLS for all the traces of a pair and checkpoint the results of the pair
+
+    With the channel reciprocity, the SLS of the reverse link is performed at the same time as it shares the
+    small-scale fading of the pair.
+    Only the results merged in the preprocessed data are returned, so that the SNR and the PSD of every trace are
+    not sent back from the processes of the pool.
+
+    Parameters
+    ----------
+    pairKey : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+    Returns
+    -------
+    pairsResults : dict
+        The results of the pair (and of its reverse link with the channel reciprocity) (see getMergedResults)
+    """
+    qdScenario, qdProperties, txParam, nbSubBands, codebooks, checkpointPath = preprocessWorkerContext
+    txId, rxId, txAntennaID, rxAntennaID = pairKey
+    if qdProperties.reciprocity:
+        # The reverse link shares the small-scale fading of the forward link
+        reverseKey = (rxId, txId, rxAntennaID, txAntennaID)
+        pairsSlsResults = dict(zip([pairKey, reverseKey],
+                                   performSlsTracesReciprocal(pairKey, 0, qdScenario.nbTraces, qdProperties, txParam,
+                                                              nbSubBands, qdScenario, codebooks)))
+    else:
+        pairsSlsResults = {pairKey: performSlsTraces(pairKey, 0, qdScenario.nbTraces, qdProperties, txParam,
+                                                     nbSubBands, qdScenario, codebooks)}
+    pairsResults = {key: getMergedResults(slsResults) for key, slsResults in pairsSlsResults.items()}
+    if checkpointPath is not None:
+        for key, pairResults in pairsResults.items():
+            savePairCheckpoint(key, pairResults, checkpointPath)
+    return pairsResults
+
+
+def getMergedResults(slsResults):
+    """Get the results of performSlsTraces stored in the preprocessed data
+
+    Parameters
+    ----------
+    slsResults : Tuple
+        The results of performSlsTraces for a pair
+
+    Returns
+    -------
+    pairResults : Tuple
+        The received power, the best sector, and the received power per sector of every trace (see checkpointResults)
+    """
+    rxPower, snr, psdBestSector, bestSector, rxPowerPerSector = slsResults
+    return rxPower, bestSector, rxPowerPerSector
+
+
+def getPairCheckpointFile(pairKey, checkpointPath):
+    """Get the path of the checkpoint shard of a pair
+
+    Parameters
+    ----------
+    pairKey : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+    checkpointPath : string
+        Folder of the checkpoint shards
+    """
+    return os.path.join(checkpointPath, "Node" + str(pairKey[0]) + "Node" + str(pairKey[1]) + "PAATx" + str(
+        pairKey[2]) + "PAARx" + str(pairKey[3]) + ".npz")
+
+
+def savePairCheckpoint(pairKey, pairResults, checkpointPath):
+    """Save the SLS results of a pair in a checkpoint shard
+
+    The shard is written under a temporary name and renamed once complete so that an interrupted write is never
+    considered as a completed pair.
+
+    Parameters
+    ----------
+    pairKey : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+    pairResults : Tuple
+        The results of the pair (see getMergedResults)
+
+    checkpointPath : string
+        Folder of the checkpoint shards
+    """
+    checkpointFile = getPairCheckpointFile(pairKey, checkpointPath)
+    temporaryFile = checkpointFile + ".tmp"
+    with open(temporaryFile, "wb") as f:
+        np.savez(f, **dict(zip(checkpointResults, pairResults)))
+    os.replace(temporaryFile, checkpointFile)
+
+
+def loadPairCheckpoint(pairKey, checkpointPath):
+    """Load the SLS results of a pair saved with savePairCheckpoint
+
+    Returns
+    -------
+    pairResults : Tuple
+        The results of the pair (see getMergedResults)
+    """
+    with np.load(getPairCheckpointFile(pairKey, checkpointPath)) as shard:
+        return tuple(shard[result] for result in checkpointResults)
+
+
+def computePairsResults(pairTasks, context, nbWorkers):
+    """Yield the results of preprocessPair for every pair of a list, in the order of the list
+
+    Parameters
+    ----------
+    pairTasks : List
+        The pairs to preprocess
+
+    context : Tuple
+        The data shared by all the pairs (see preprocessWorkerContext)
+
+    nbWorkers : int
+        Number of processes used to preprocess the pairs (the pairs are processed in the current process if 1)
+    """
+    global preprocessWorkerContext
+    if nbWorkers > 1 and len(pairTasks) > 1:
+        # Forked processes access the channel (memory-mapped from the cache) and the codebooks of the parent
+        # process without copying them
+        if 'fork' in multiprocessing.get_all_start_methods():
+            poolContext = multiprocessing.get_context('fork')
+        else:
+            poolContext = multiprocessing.get_context()
+        globalSettings = {name: getattr(globals, name) for name in preprocessWorkerGlobals}
+        with poolContext.Pool(min(nbWorkers, len(pairTasks)), initPreprocessWorker,
+                              (context, globalSettings, nbWorkers)) as pool:
+            yield from pool.imap(preprocessPair, pairTasks)
+    else:
+        preprocessWorkerContext = context
+        yield from map(preprocessPair, pairTasks)
+        preprocessWorkerContext = None
+
+
+def allocateSlsResults(slsPath, nbRows, nbSectors, diskBacked):
+    """Allocate the arrays of the preprocessed SLS results
+
+    Parameters
+    ----------
+    slsPath : string
+        Folder of the preprocessed SLS results
+
+    nbRows : int
+        Number of (TX, RX, PAA TX, PAA RX, trace) rows (see DataIndex)
+
+    nbSectors : int
+        Maximum number of sectors of the nodes (the power per sector of the nodes with fewer sectors is padded with 0)
+
+    diskBacked : Bool
+        Create the arrays as memory-mapped .npy files in slsPath instead of in memory
+
+    Returns
+    -------
+    slsResults : dict
+        The bestSector, allPower, and bestPower arrays
+    """
+    shapes = {'bestSector': (nbRows,), 'allPower': (nbRows, nbSectors), 'bestPower': (nbRows,)}
+    if diskBacked:
+        return {name: np.lib.format.open_memmap(os.path.join(slsPath, name + ".npy"), mode='w+', dtype=dtype,
+                                                shape=shapes[name])
+                for name, dtype in slsResultsArrays.items()}
+    return {name: np.zeros(shapes[name], dtype=dtype) for name, dtype in slsResultsArrays.items()}
+
+
+def associateStas(qdScenario, codebooks, dataIndex, bestSectorRxPowerList, bestSectorIdList):
+    """Determine to which AP every STA is associated for every trace (the AP from which the power received is the
+    highest)
+
+    The rows of all the (AP, STA, PAA AP, PAA STA) pairs of a STA are gathered at once and the AP is selected for all
+    the traces with array operations. In case of equality, the first pair in the (TX, RX, PAA TX, PAA RX) order is
+    kept.
+
+    Parameters
+    ----------
+    qdScenario : QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    dataIndex : DataIndex class
+        The index of the preprocessed data
+
+    bestSectorRxPowerList : Numpy array
+        The power received with the best sector of every row
+
+    bestSectorIdList : Numpy array
+        The best sector of every row
+
+    Returns
+    -------
+    staAssociationDic : Dic
+        The (power received, AP ID, best sector) of every (STA ID, trace index)
+    """
+    staAssociationDic = {}
+    apIds = [nodeId for nodeId in range(qdScenario.nbNodes) if qdScenario.isNodeAp(nodeId)]
+    if not apIds:
+        return staAssociationDic
+    traceIndices = np.arange(qdScenario.nbTraces)
+    for staId in range(qdScenario.nbNodes):
+        if not qdScenario.isNodeSta(staId):
+            continue
+        nbPaaSta = codebooks.getNbPaaNode(qdScenario.getNodeType(staId))
+        pairs = np.array([(apId, staId, apAntennaId, staAntennaId) for apId in apIds
+                          for apAntennaId in range(codebooks.getNbPaaNode(qdScenario.getNodeType(apId)))
+                          for staAntennaId in range(nbPaaSta)], dtype=np.int64)
+        # Rows of every (pair, trace)
+        txRxs = np.concatenate([np.repeat(pairs[:, np.newaxis], qdScenario.nbTraces, axis=1),
+                                np.broadcast_to(traceIndices[np.newaxis, :, np.newaxis],
+                                                (len(pairs), qdScenario.nbTraces, 1))], axis=-1)
+        rows = dataIndex.getRows(txRxs)
+        # argmax keeps the first pair with the highest power
+        bestPairs = np.argmax(bestSectorRxPowerList[rows], axis=0)
+        bestRows = rows[bestPairs, traceIndices]
+        bestApIds = pairs[bestPairs, 0]
+        staAssociationDic.update(zip([(staId, traceIndex) for traceIndex in range(qdScenario.nbTraces)],
+                                     zip(bestSectorRxPowerList[bestRows].tolist(), bestApIds.tolist(),
+                                         bestSectorIdList[bestRows].tolist())))
+    return staAssociationDic
+
+
+def preprocessData(qdScenario, qdProperties, txParam, nbSubBands, codebooks, nbWorkers=1, checkpointPath=None,
+                   diskBacked=False):
     """Generate the SLS data (Best Sector, best Rx Power, and Rx power per sector) and STA association data
 
+    The pairs are independent and can be spread over a pool of processes. Their results are merged in the order of
+    the pairs so that the data are identical whatever the number of processes.
+    The received power and the best sector of every trace of every pair are saved in a single time series file
+    (see saveSlsTimeSeries).
+    When a checkpoint folder is given, the results of every pair are saved in a checkpoint shard as soon as the pair
+    is completed. The pairs whose shard already exists in the checkpoint folder are not computed again, which allows
+    to resume an interrupted preprocessing.
+
     Parameters
     ----------
     qdScenario: QdScenario class
@@ -1224,13 +1605,22 @@ def preprocessData(qdScenario, qdProperties, txParam, nbSubBands, codebooks):
     codebooks : Codebooks class
         Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
 
+    nbWorkers : int
+        Number of processes used to preprocess the pairs
+
+    checkpointPath : string
+        Folder of the checkpoint shards (None to disable the checkpoints)
+
+    diskBacked : Bool
+        Write the results in memory-mapped .npy files instead of in memory (see allocateSlsResults)
+
     Returns
     -------
     preprocessedSlsData : SlsResults class
         The preprocessed data for the SLS Phase
     staAssociationDic : Dic
         The preprocessed association Data
-    dataIndex: Dic
+    dataIndex: DataIndex class
         Used to reconstruct the index of the preprocessed data
     """
     print("The oracle will now compute all the data for every pair of nodes and PAAs - This process can be long")
@@ -1238,20 +1628,8 @@ def preprocessData(qdScenario, qdProperties, txParam, nbSubBands, codebooks):
                                       2)  # Total number of nodes permutations (used for progress bar)
     startProcess = time.time()
     globals.printProgressBar(0, nbNodesPermutations, 0, prefix='Progress:', suffix='Complete', length=50)
-    staAssociationDic = {}
     numberOfPair = 0
-    dataPath = os.path.join(globals.scenarioPath, globals.dataFolder)
-    if not os.path.exists(dataPath):
-        os.makedirs(dataPath)
-    dataRxPowerPath = os.path.join(dataPath, globals.slsFolder, globals.rxPowerItxssFolder)
-    if not os.path.exists(dataRxPowerPath):
-        os.makedirs(dataRxPowerPath)
-    bestItxssPath = os.path.join(dataPath, globals.slsFolder, globals.bestSectorItxssFolder)
-    if not os.path.exists(bestItxssPath):
-        os.makedirs(bestItxssPath)
-    bestSectorIdList = []
-    powerPerSectorList = []
-    bestSectorRxPowerList = []
+    pairKeys = []
     for txId in range(qdScenario.nbNodes):
         # Iterate all the Tx nodes
         for rxId in range(qdScenario.nbNodes):
@@ -1261,94 +1639,89 @@ def preprocessData(qdScenario, qdProperties, txParam, nbSubBands, codebooks):
                     # Iterate over all the Tx PAAs
                     for rxAntennaID in range(codebooks.getNbPaaNode(qdScenario.getNodeType(rxId))):
                         # Iterate over all the Rx PAAs
-                        rxPowerITXSSList = []
-                        snrITXSSList = []
-                        bestSectorITXSSList = []
-                        numberOfPair += 1
-                        startSLSTime = time.time()
-
-                        print("Compute for:", txId, rxId, txAntennaID, rxAntennaID)
-                        for traceIndex in range(qdScenario.nbTraces):
-                            rxPowerITXSS, snrITXSS, psdBestSectorITXSS, txssSectorITXSS, rxPowerSectorListITXSS = performSls(
-                                (txId, rxId, txAntennaID, rxAntennaID, traceIndex), qdProperties, txParam, nbSubBands,
-                                qdScenario, codebooks)
-                            rxPowerITXSSList.append(rxPowerITXSS)
-                            snrITXSSList.append(snrITXSS)
-                            bestSectorITXSSList.append(txssSectorITXSS)
-                            bestSectorIdList.append(txssSectorITXSS)
-                            powerPerSectorList.append(rxPowerSectorListITXSS)
-                            bestSectorRxPowerList.append(rxPowerITXSS)
-                            # Determine to which AP is a STA associated for a given trace (we are using the received power)
-                            if qdScenario.isNodeAp(txId) and qdScenario.isNodeSta(rxId):
-                                if (rxId, traceIndex) not in staAssociationDic:
-                                    # No computation has been done previously - Just store the values computed for the AP idTx for the STA IdRx
-                                    staAssociationDic[(rxId, traceIndex)] = (rxPowerITXSS, txId, txssSectorITXSS)
-                                else:
-                                    if staAssociationDic[(rxId, traceIndex)][0] < rxPowerITXSS:
-                                        # Update the AP to which a STA will associate if the power received is greater
-                                        staAssociationDic[(rxId, traceIndex)] = (
-                                            rxPowerITXSS, txId, txssSectorITXSS)
-
-                        rxPowerData = {'traceIndex': np.arange(qdScenario.nbTraces),
-                                       'rxPower': rxPowerITXSSList,
-                                       'beginTrace(s)': np.arange(qdScenario.nbTraces) * qdScenario.timeStep,
-                                       'endTrace(s)': np.arange(1, qdScenario.nbTraces + 1) * qdScenario.timeStep
-                                       }
-                        rxPowerDataFrame = pd.DataFrame(rxPowerData, columns=['traceIndex', 'rxPower', 'beginTrace(s)',
-                                                                              'endTrace(s)'])
-                        rxPowerFileName = "RxPower" + "Node" + str(txId) + "Node" + str(rxId) + "PAATx" + str(
-                            txAntennaID) + "PAARx" + str(rxAntennaID) + ".csv"
-                        globals.saveData(rxPowerDataFrame, dataRxPowerPath, rxPowerFileName)
-
-                        bestItxssSectorData = {'traceIndex': np.arange(qdScenario.nbTraces),
-                                               'sector': bestSectorITXSSList,
-                                               'beginTrace(s)': np.arange(qdScenario.nbTraces) * qdScenario.timeStep,
-                                               'endTrace(s)': np.arange(1,
-                                                                        qdScenario.nbTraces + 1) * qdScenario.timeStep
-                                               }
-                        bestItxssSectorDataFrame = pd.DataFrame(bestItxssSectorData,
-                                                                columns=['traceIndex', 'sector', 'beginTrace(s)',
-                                                                         'endTrace(s)'])
-
-                        bestItxssFileName = "BestSector" + "Node" + str(txId) + "Node" + str(rxId) + "PAATx" + str(
-                            txAntennaID) + "PAARx" + str(rxAntennaID) + ".csv"
-                        globals.saveData(bestItxssSectorDataFrame, bestItxssPath, bestItxssFileName)
-                        totalTime = time.time() - startProcess
-
-                        averageProcessTime = totalTime / numberOfPair
-                        remainingTime = round(averageProcessTime * (nbNodesPermutations - numberOfPair))
-
-                        globals.printProgressBar(numberOfPair, nbNodesPermutations,
-                                                 datetime.timedelta(0, remainingTime), prefix='Progress:',
-                                                 suffix='Complete',
-                                                 length=50)
-                        endSLSTime = time.time()
-
-    # Code to downcast the values to save some space when we write them if needed TODO Remove or add the option
-    bestSectorIdList = np.asarray(bestSectorIdList, dtype=np.int16)
-
-    # We want to save numpy array only and the number of sectors can be different between STA and AP (ragged arrays)
-    # Pad the Numpy array to avoid ragged arrays
-    n = len(powerPerSectorList)
-    m = max([len(x) for x in powerPerSectorList])
-
-    A = np.zeros((n, m))
-    for i in range(n):
-        A[i, :len(powerPerSectorList[i])] = powerPerSectorList[i]
-    # Code to downcast the values to save some space when we write them if needed TODO Remove or add the option
-    # powerPerSectorList = np.asarray(A, dtype=np.float16)
-    powerPerSectorList = np.asarray(A)
-    # Code to downcast the values to save some space when we write them if needed TODO Remove or add the option
-    # bestSectorRxPowerList = np.asarray(bestSectorRxPowerList, dtype=np.float16)
-    bestSectorRxPowerList = np.asarray(bestSectorRxPowerList)
-
-    # Store SLS preprocessed data
+                        pairKeys.append((txId, rxId, txAntennaID, rxAntennaID))
+    # The results are written directly in their final arrays at the rows given by the data index
+    dataIndex = constructIndex(qdScenario, codebooks)
     slsPath = os.path.join(globals.scenarioPath, globals.preprocessedFolder, globals.slsFolder)
     if not os.path.exists(slsPath):
         os.makedirs(slsPath)
-    np.savez(open(os.path.join(slsPath, "allSlsResultsNumpy.npy"), "wb"), bestSector=bestSectorIdList,
-             allPower=powerPerSectorList,
-             bestPower=bestSectorRxPowerList)
+    nbSectorsMax = max(codebooks.getNbSectorsPerPaaNode(qdScenario.getNodeType(nodeId))
+                       for nodeId in range(qdScenario.nbNodes))
+    slsResults = allocateSlsResults(slsPath, len(dataIndex), nbSectorsMax, diskBacked)
+    bestSectorIdList = slsResults['bestSector']
+    powerPerSectorList = slsResults['allPower']
+    bestSectorRxPowerList = slsResults['bestPower']
+    if qdProperties.reciprocity:
+        # The reverse links are computed with their forward link
+        pairTasks = [pairKey for pairKey in pairKeys if pairKey[0] < pairKey[1]]
+    else:
+        pairTasks = pairKeys
+    completedPairs = set()
+    if checkpointPath is not None:
+        if not os.path.exists(checkpointPath):
+            os.makedirs(checkpointPath)
+        completedPairs = {pairKey for pairKey in pairKeys
+                          if os.path.isfile(getPairCheckpointFile(pairKey, checkpointPath))}
+        remainingTasks = []
+        for pairKey in pairTasks:
+            taskPairs = {pairKey, (pairKey[1], pairKey[0], pairKey[3], pairKey[2])} if qdProperties.reciprocity \
+                else {pairKey}
+            if not taskPairs <= completedPairs:
+                # The pairs of an incomplete task are all computed again
+                completedPairs -= taskPairs
+                remainingTasks.append(pairKey)
+        pairTasks = remainingTasks
+        if completedPairs:
+            print("Resume the preprocessing:", len(completedPairs), "of", len(pairKeys),
+                  "pairs loaded from the checkpoint")
+    pairsResults = computePairsResults(pairTasks, (qdScenario, qdProperties, txParam, nbSubBands, codebooks,
+                                                   checkpointPath), nbWorkers)
+    # SLS results of the pairs computed but not merged yet (reverse links computed with their forward link)
+    pendingSlsResults = {}
+    for pairKey in pairKeys:
+        txId, rxId, txAntennaID, rxAntennaID = pairKey
+        numberOfPair += 1
+        if pairKey in completedPairs:
+            pendingSlsResults[pairKey] = loadPairCheckpoint(pairKey, checkpointPath)
+        elif pairKey not in pendingSlsResults:
+            pendingSlsResults.update(next(pairsResults))
+        print("Compute for:", txId, rxId, txAntennaID, rxAntennaID)
+        rxPowerITXSSList, bestSectorITXSSList, rxPowerSectorListITXSS = pendingSlsResults.pop(pairKey)
+        pairStart = dataIndex.getRow(pairKey + (0,))
+        pairRows = slice(pairStart, pairStart + qdScenario.nbTraces)
+        bestSectorIdList[pairRows] = bestSectorITXSSList
+        powerPerSectorList[pairRows, :rxPowerSectorListITXSS.shape[1]] = rxPowerSectorListITXSS
+        bestSectorRxPowerList[pairRows] = rxPowerITXSSList
+        totalTime = time.time() - startProcess
+
+        averageProcessTime = totalTime / numberOfPair
+        remainingTime = round(averageProcessTime * (nbNodesPermutations - numberOfPair))
+
+        globals.printProgressBar(numberOfPair, nbNodesPermutations,
+                                 datetime.timedelta(0, remainingTime), prefix='Progress:',
+                                 suffix='Complete',
+                                 length=50)
+
+    # Determine to which AP is a STA associated for every trace (we are using the received power)
+    staAssociationDic = associateStas(qdScenario, codebooks, dataIndex, bestSectorRxPowerList, bestSectorIdList)
+
+    # Store the time series of every pair (one row per pair)
+    saveSlsTimeSeries(pairKeys, bestSectorRxPowerList.reshape(len(pairKeys), qdScenario.nbTraces),
+                      bestSectorIdList.reshape(len(pairKeys), qdScenario.nbTraces), qdScenario)
+
+    # Store SLS preprocessed data (only the results of the last preprocessing are kept)
+    if diskBacked:
+        for array in slsResults.values():
+            array.flush()
+        if os.path.exists(os.path.join(slsPath, slsResultsFile)):
+            os.remove(os.path.join(slsPath, slsResultsFile))
+    else:
+        np.savez(open(os.path.join(slsPath, slsResultsFile), "wb"), bestSector=bestSectorIdList,
+                 allPower=powerPerSectorList,
+                 bestPower=bestSectorRxPowerList)
+        for name in slsResultsArrays:
+            if os.path.exists(os.path.join(slsPath, name + ".npy")):
+                os.remove(os.path.join(slsPath, name + ".npy"))
     # Store association data
     associationPath = os.path.join(globals.scenarioPath, globals.preprocessedFolder, globals.associationFolder)
     if not os.path.exists(associationPath):
@@ -1357,10 +1730,95 @@ def preprocessData(qdScenario, qdProperties, txParam, nbSubBands, codebooks):
                 protocol=pickle.HIGHEST_PROTOCOL)
 
     preprocessedSlsData = SlsResults(bestSectorIdList, powerPerSectorList, bestSectorRxPowerList)
-    dataIndex = constructIndex(qdScenario, codebooks)
     return preprocessedSlsData, staAssociationDic, dataIndex
 
 
+def getSlsTimeSeriesFile():
+    """Get the path of the file containing the SLS time series of every pair
+    """
+    return os.path.join(globals.scenarioPath, globals.dataFolder, globals.slsFolder, globals.slsTimeSeriesFile)
+
+
+def saveSlsTimeSeries(pairKeys, rxPower, bestSector, qdScenario):
+    """Save the received power and the best sector of every trace of every pair in a single file
+
+    Parameters
+    ----------
+    pairKeys : List
+        The (TX, RX, PAA TX, PAA RX) of every pair
+
+    rxPower : Numpy array
+        The power received with the best sector for every pair and every trace (dBm)
+
+    bestSector : Numpy array
+        The best sector for every pair and every trace
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+    """
+    timeSeriesFile = getSlsTimeSeriesFile()
+    if not os.path.exists(os.path.dirname(timeSeriesFile)):
+        os.makedirs(os.path.dirname(timeSeriesFile))
+    np.savez(open(timeSeriesFile, "wb"), pairKeys=np.asarray(pairKeys, dtype=np.int32).reshape(-1, 4),
+             traceIndex=np.arange(qdScenario.nbTraces),
+             beginTrace=np.arange(qdScenario.nbTraces) * qdScenario.timeStep,
+             endTrace=np.arange(1, qdScenario.nbTraces + 1) * qdScenario.timeStep,
+             rxPower=rxPower, bestSector=bestSector)
+
+
+def loadSlsTimeSeries():
+    """Load the SLS time series saved with saveSlsTimeSeries
+
+    Returns
+    -------
+    slsTimeSeries : Dic
+        The arrays of the time series file (pairKeys, traceIndex, beginTrace, endTrace, rxPower, and bestSector)
+    pairRows: Dic
+        The row of every (TX, RX, PAA TX, PAA RX) pair in the rxPower and bestSector arrays
+    """
+    with np.load(getSlsTimeSeriesFile()) as timeSeriesFile:
+        slsTimeSeries = dict(timeSeriesFile)
+    pairRows = {tuple(int(i) for i in pairKey): row for row, pairKey in enumerate(slsTimeSeries['pairKeys'])}
+    return slsTimeSeries, pairRows
+
+
+def exportSlsTimeSeriesCsv():
+    """Export the SLS time series of every pair in CSV files (a received power and a best sector file per pair)
+    """
+    slsTimeSeries, pairRows = loadSlsTimeSeries()
+    dataPath = os.path.join(globals.scenarioPath, globals.dataFolder)
+    dataRxPowerPath = os.path.join(dataPath, globals.slsFolder, globals.rxPowerItxssFolder)
+    if not os.path.exists(dataRxPowerPath):
+        os.makedirs(dataRxPowerPath)
+    bestItxssPath = os.path.join(dataPath, globals.slsFolder, globals.bestSectorItxssFolder)
+    if not os.path.exists(bestItxssPath):
+        os.makedirs(bestItxssPath)
+    print("Export the SLS time series in CSV files:", os.path.join(dataPath, globals.slsFolder))
+    for (txId, rxId, txAntennaID, rxAntennaID), row in pairRows.items():
+        rxPowerData = {'traceIndex': slsTimeSeries['traceIndex'],
+                       'rxPower': slsTimeSeries['rxPower'][row],
+                       'beginTrace(s)': slsTimeSeries['beginTrace'],
+                       'endTrace(s)': slsTimeSeries['endTrace']
+                       }
+        rxPowerDataFrame = pd.DataFrame(rxPowerData, columns=['traceIndex', 'rxPower', 'beginTrace(s)',
+                                                              'endTrace(s)'])
+        rxPowerFileName = "RxPower" + "Node" + str(txId) + "Node" + str(rxId) + "PAATx" + str(
+            txAntennaID) + "PAARx" + str(rxAntennaID) + ".csv"
+        globals.saveData(rxPowerDataFrame, dataRxPowerPath, rxPowerFileName)
+
+        bestItxssSectorData = {'traceIndex': slsTimeSeries['traceIndex'],
+                               'sector': slsTimeSeries['bestSector'][row],
+                               'beginTrace(s)': slsTimeSeries['beginTrace'],
+                               'endTrace(s)': slsTimeSeries['endTrace']
+                               }
+        bestItxssSectorDataFrame = pd.DataFrame(bestItxssSectorData,
+                                                columns=['traceIndex', 'sector', 'beginTrace(s)',
+                                                         'endTrace(s)'])
+        bestItxssFileName = "BestSector" + "Node" + str(txId) + "Node" + str(rxId) + "PAATx" + str(
+            txAntennaID) + "PAARx" + str(rxAntennaID) + ".csv"
+        globals.saveData(bestItxssSectorDataFrame, bestItxssPath, bestItxssFileName)
+
+
 def loadPreprocessedData(qdScenario, codebooks):
     """Load the precomputed SLS data (Best Sector, best Rx Power, and Rx power per sector) and association data
 
@@ -1377,14 +1835,19 @@ def loadPreprocessedData(qdScenario, codebooks):
         The preprocessed data for the SLS Phase
     staAssociationDic : Dic
         The preprocessed association Data
-    dataIndex: Dic
+    dataIndex: DataIndex class
         Used to reconstruct the index of the preprocessed data
     """
     slsPath = os.path.join(globals.scenarioPath, globals.preprocessedFolder, globals.slsFolder)
     associationPath = os.path.join(globals.scenarioPath, globals.preprocessedFolder, globals.associationFolder)
     staAssociationDic = pickle.load(open(os.path.join(associationPath, "associationResults.p"), "rb"))
 
-    allSlsResultsDicNpy = np.load(os.path.join(slsPath, "allSlsResultsNumpy.npy"))
+    if os.path.exists(os.path.join(slsPath, slsResultsFile)):
+        allSlsResultsDicNpy = np.load(os.path.join(slsPath, slsResultsFile))
+    else:
+        # Disk-backed results (see allocateSlsResults) - Memory-map them
+        allSlsResultsDicNpy = {name: np.load(os.path.join(slsPath, name + ".npy"), mmap_mode='r')
+                               for name in slsResultsArrays}
     bestSectorIdList = allSlsResultsDicNpy['bestSector']
     powerPerSectorList = allSlsResultsDicNpy['allPower']
     bestSectorRxPowerList = allSlsResultsDicNpy['bestPower']
@@ -1394,7 +1857,7 @@ def loadPreprocessedData(qdScenario, codebooks):
 
 
 def constructIndex(qdScenario, codebooks):
-    """Construct the dictionary containing the indexing mapping between (IdTx,IdRx,IdPaaTx,IdPaaRx,traceIndex) tuple and preprocessed numpy row
+    """Construct the index mapping the (IdTx,IdRx,IdPaaTx,IdPaaRx,traceIndex) tuples to the preprocessed numpy rows
 
     Parameters
     ----------
@@ -1405,25 +1868,11 @@ def constructIndex(qdScenario, codebooks):
 
     Returns
     -------
-    dataIndex: Dic
+    dataIndex: DataIndex class
         Used to reconstruct the index of the preprocessed data
     """
-    nbIndex = 0
-    dataIndex = {}
-    for txId in range(qdScenario.nbNodes):
-        # Iterate all the Tx nodes
-        for rxId in range(qdScenario.nbNodes):
-            # Iterate all the Rx nodes
-            if txId != rxId:
-                for txAntennaID in range(codebooks.getNbPaaNode(qdScenario.getNodeType(txId))):
-                    # Iterate over all the Tx PAAs
-                    for rxAntennaID in range(codebooks.getNbPaaNode(qdScenario.getNodeType(rxId))):
-                        # Iterate over all the Rx PAAs
-                        for traceIndex in range(qdScenario.nbTraces):
-                            # Iterate over all the Tx PAAs
-                            dataIndex[(txId, rxId, txAntennaID, rxAntennaID, traceIndex)] = nbIndex
-                            nbIndex += 1
-    return dataIndex
+    return DataIndex([codebooks.getNbPaaNode(qdScenario.getNodeType(nodeId)) for nodeId in range(qdScenario.nbNodes)],
+                     qdScenario.nbTraces)
 
 
 def getIndex(tuple):
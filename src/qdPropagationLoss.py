@@ -27,7 +27,7 @@
 import math
 
 import numpy as np
-from numba import jit
+from numba import jit, prange
 import globals
 
 
@@ -157,7 +157,7 @@ class TxParam:
         return self.getFrequencies().getHigherFrequencies()
 
     def allocateFrequencies(self, centerFrequency, channelWidth,
-                            bandBandwidth, guardBandwidth):
+                            bandBandwidth, guardBandwidth, nbSubBands=None):
         """Allocate the subbands frequencies (lower, center and higher)
 
         Parameters
@@ -170,6 +170,9 @@ class TxParam:
             Subband width (in Hz)
         guardBandwidth : float
             Guard band width (in Hz)
+        nbSubBands : int
+            Number of subbands (None to use subbands of bandBandwidth Hz). The occupied bandwidth is the same
+            whatever the number of subbands, i.e., the subbands are wider when fewer subbands are used
         """
         lowerFrequenciesList = []
         centerFrequenciesList = []
@@ -177,6 +180,10 @@ class TxParam:
         centerFrequencyHz = centerFrequency * 1e6
         bandwidth = (channelWidth - 329.53) * 1e6
         numBands = int(bandwidth / bandBandwidth)
+        if nbSubBands is not None:
+            # Split the occupied bandwidth in nbSubBands subbands
+            bandBandwidth = numBands * bandBandwidth / nbSubBands
+            numBands = nbSubBands
         # lay down numBands/2 bands symmetrically around center frequency
         # and place an additional band at center frequency
         # The computation of the center frequencies is done as in ns-3 (i.e, numBands is an int TODO Check if not a problem when dividing by 2)
@@ -312,6 +319,307 @@ def computeRx(nbMpcs, subBandGainAllSubbandSinglePath, txPowerPerSubBandWHz, low
     return 10 * math.log10(totalRxPowerW) + 30, rxPowerPerSubBandWithGaindB, snrdB
 
 
+def computeSectorsRxPowerKernel(txDirectivity, weightedFading, rxPowerPerSubBandUnitGainW):
+    """Compute the total power received by every sector of a batch of transmissions
+
+    The (transmission, sector) couples are distributed over all the cores.
+
+    Parameters
+    ----------
+    txDirectivity : Numpy array
+        Tx directivity of every sector for every MPC (nbTransmissions x nbSectors x nbMpcs)
+
+    weightedFading : Numpy array
+        Small-Scale fading multiplied by the Rx directivity for every subband and every MPC
+        (nbTransmissions x nbSubBands x nbMpcs)
+
+    rxPowerPerSubBandUnitGainW : Numpy array
+        Power received per subband for a unit gain (W)
+
+    Returns
+    -------
+    totalRxPowerW : Numpy array
+        The total power received by every sector (W) (nbTransmissions x nbSectors)
+    """
+    nbTransmissions, nbSectors, nbMpcs = txDirectivity.shape
+    nbSubBands = weightedFading.shape[1]
+    totalRxPowerW = np.empty((nbTransmissions, nbSectors))
+    for transmissionSector in prange(nbTransmissions * nbSectors):
+        transmission = transmissionSector // nbSectors
+        sector = transmissionSector % nbSectors
+        rxPowerW = 0.0
+        for i in range(nbSubBands):
+            subsbandGain = 0j
+            for j in range(nbMpcs):
+                subsbandGain += txDirectivity[transmission, sector, j] * weightedFading[transmission, i, j]
+            rxPowerW += rxPowerPerSubBandUnitGainW[i] * (subsbandGain.real * subsbandGain.real +
+                                                         subsbandGain.imag * subsbandGain.imag)
+        totalRxPowerW[transmission, sector] = rxPowerW
+    return totalRxPowerW
+
+
+# Numba versions of the kernel - fastmath allows the compiler to reorder the floating-point operations
+computeSectorsRxPower = jit(nopython=True, parallel=True)(computeSectorsRxPowerKernel)
+computeSectorsRxPowerFastMath = jit(nopython=True, parallel=True, fastmath=True)(computeSectorsRxPowerKernel)
+
+
+def isCovarianceSlsFaster(nbMpcs, nbSectors, nbSubBands):
+    """Check if the covariance evaluation of the sectors power is cheaper than the per-subband one
+
+    The per-subband evaluation costs nbSectors x nbMpcs x nbSubBands operations while the covariance evaluation
+    costs nbMpcs x nbMpcs x (nbSubBands + nbSectors) operations.
+    """
+    return nbMpcs * (nbSubBands + nbSectors) < nbSectors * nbSubBands
+
+
+def computeRxAllSectors(txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList,
+                        higherFrequenciesList, noise, method='auto', fastMath=False):
+    """Compute the reception for all the sectors at once
+
+    Two evaluations of the power received by every sector are available:
+    - 'subband': the gain of every sector and every subband is obtained with a single matrix product between the Tx
+      directivity of the sectors and the small-scale fading of the MPCs (weighted by the Rx directivity).
+    - 'covariance': the power received by a sector is the quadratic form a R a^H where a is the Tx directivity of the
+      sector for every MPC and R the (nbMpcs x nbMpcs) covariance of the weighted small-scale fading over the
+      subbands. R does not depend on the sector and is built only once.
+    - 'numba': the per-subband evaluation performed by a parallel numba kernel distributing the sectors over all the
+      cores (see computeSectorsRxPowerKernel).
+    'auto' uses the covariance evaluation when it is cheaper, i.e., when there are few MPCs.
+    Leading dimensions can be added to process a batch of transmissions (e.g., several traces) at once.
+
+    Parameters
+    ----------
+    txDirectivity : Numpy array
+        Tx directivity of every sector for every MPC (... x nbSectors x nbMpcs)
+
+    weightedFading : Numpy array
+        Small-Scale fading multiplied by the Rx directivity for every MPC and every subband (... x nbMpcs x nbSubBands)
+
+    txPowerPerSubBandWHz : Numpy array
+        The Transmit power allocated per subband (in W/Hz)
+
+    lowerFrequenciesList : Numpy array
+        Lower frequency for each subband
+
+    higherFrequenciesList : Numpy array
+        Higher frequencies for each subband
+
+    noise : float
+        The noise associated to the transmission
+
+    method : string
+        'auto', 'subband', 'covariance' or 'numba'
+
+    fastMath : Bool
+        Allow the numba kernel to reorder the floating-point operations (faster but not bit-exact)
+
+    Returns
+    -------
+    rxPowerPerSector : Numpy array
+        The total received Power (dB) for the entire bandwidth for every sector (... x nbSectors)
+    bestSector : Numpy array
+        ID of the sector receiving the highest power (the first one in case of equality)
+    psdBestSector : Numpy array
+        The power received per subband (dB) for the best sector (... x nbSubBands)
+    snrBestSector : Numpy array
+        The SNR (dB) for the entire bandwidth for the best sector
+    """
+    nbSectors, nbMpcs = txDirectivity.shape[-2:]
+    nbSubBands = weightedFading.shape[-1]
+    if method == 'auto':
+        method = 'covariance' if isCovarianceSlsFaster(nbMpcs, nbSectors, nbSubBands) else 'subband'
+    # Power received per subband for a unit gain (integrated over the subband)
+    rxPowerPerSubBandUnitGainW = txPowerPerSubBandWHz * (higherFrequenciesList - lowerFrequenciesList)
+    if method == 'numba':
+        kernel = computeSectorsRxPowerFastMath if fastMath else computeSectorsRxPower
+        batchShape = txDirectivity.shape[:-2]
+        totalRxPowerW = kernel(
+            np.ascontiguousarray(txDirectivity.reshape((-1, nbSectors, nbMpcs)), dtype=np.complex128),
+            np.ascontiguousarray(np.swapaxes(weightedFading, -1, -2).reshape((-1, nbSubBands, nbMpcs)),
+                                 dtype=np.complex128),
+            np.ascontiguousarray(rxPowerPerSubBandUnitGainW, dtype=np.float64)).reshape(batchShape + (nbSectors,))
+    elif method == 'covariance':
+        # Covariance of the weighted small-scale fading (... x nbMpcs x nbMpcs)
+        covariance = (weightedFading * rxPowerPerSubBandUnitGainW) @ np.conj(np.swapaxes(weightedFading, -1, -2))
+        totalRxPowerW = np.sum((txDirectivity @ covariance) * np.conj(txDirectivity), axis=-1).real
+        # The quadratic form is non-negative - Remove the rounding errors for the sectors not receiving any power
+        totalRxPowerW = np.maximum(totalRxPowerW, 0)
+    else:
+        # Gain of every sector for every subband (... x nbSectors x nbSubBands)
+        subBandGain = txDirectivity @ weightedFading
+        subBandGainPower = subBandGain.real ** 2
+        subBandGainPower += subBandGain.imag ** 2
+        totalRxPowerW = subBandGainPower @ rxPowerPerSubBandUnitGainW
+    bestSector = np.argmax(totalRxPowerW, axis=-1)
+    bestRxPowerW = np.take_along_axis(totalRxPowerW, bestSector[..., np.newaxis], axis=-1)[..., 0]
+    # The PSD is only needed for the best sector
+    bestSubBandGain = (np.take_along_axis(txDirectivity, bestSector[..., np.newaxis, np.newaxis], axis=-2)
+                       @ weightedFading)[..., 0, :]
+    bestRxPowerPerSubBandW = (bestSubBandGain.real ** 2 + bestSubBandGain.imag ** 2) * rxPowerPerSubBandUnitGainW
+    with np.errstate(divide='ignore'):
+        # A sector may not receive any power
+        rxPowerPerSector = 10 * np.log10(totalRxPowerW) + 30
+        psdBestSector = 10 * np.log10(bestRxPowerPerSubBandW) + 30
+        snrBestSector = 10 * np.log10(bestRxPowerW / noise)
+    return rxPowerPerSector, bestSector, psdBestSector, snrBestSector
+
+
+def computeRxPrunedSectors(txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList,
+                           higherFrequenciesList, noise, topK, nbScreeningSubbands, method='auto', fastMath=False):
+    """Compute the reception by screening the sectors on a few subbands and evaluating only the best candidates
+
+    All the sectors are first ranked with the power received on nbScreeningSubbands evenly spaced subbands. The
+    wideband power and the PSD are then computed only for the topK best ranked sectors (see computeRxAllSectors).
+
+    Parameters
+    ----------
+    txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise :
+        See computeRxAllSectors
+
+    topK : int
+        Number of candidate sectors evaluated over all the subbands
+
+    nbScreeningSubbands : int
+        Number of subbands used to rank the sectors
+
+    method, fastMath :
+        See computeRxAllSectors (used for the candidate sectors)
+
+    Returns
+    -------
+    rxPowerPerSector : Numpy array
+        The total received Power (dB) for every sector - The power of the sectors that are not candidates is not
+        evaluated and is NaN
+    bestSector : Numpy array
+        ID of the best candidate sector
+    psdBestSector : Numpy array
+        The power received per subband (dB) for the best sector
+    snrBestSector : Numpy array
+        The SNR (dB) for the entire bandwidth for the best sector
+    """
+    nbSectors = txDirectivity.shape[-2]
+    nbSubBands = weightedFading.shape[-1]
+    if topK >= nbSectors or nbScreeningSubbands >= nbSubBands:
+        return computeRxAllSectors(txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList,
+                                   higherFrequenciesList, noise, method, fastMath)
+    rxPowerPerSubBandUnitGainW = txPowerPerSubBandWHz * (higherFrequenciesList - lowerFrequenciesList)
+    screeningSubbands = np.unique(np.linspace(0, nbSubBands - 1, max(1, nbScreeningSubbands)).round().astype(int))
+    screeningGain = txDirectivity @ weightedFading[..., screeningSubbands]
+    screeningRxPowerW = (screeningGain.real ** 2 + screeningGain.imag ** 2) @ rxPowerPerSubBandUnitGainW[
+        screeningSubbands] * (rxPowerPerSubBandUnitGainW.sum() / rxPowerPerSubBandUnitGainW[screeningSubbands].sum())
+    # Keep the candidates in increasing sector order so that equalities are resolved as in the exhaustive sweep
+    candidates = np.sort(np.argpartition(-screeningRxPowerW, topK - 1, axis=-1)[..., :topK], axis=-1)
+    candidatesRxPower, candidatesBestSector, psdBestSector, snrBestSector = computeRxAllSectors(
+        np.take_along_axis(txDirectivity, candidates[..., np.newaxis], axis=-2), weightedFading,
+        txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise, method, fastMath)
+    bestSector = np.take_along_axis(candidates, candidatesBestSector[..., np.newaxis], axis=-1)[..., 0]
+    # Only the power of the candidates is exact - The other sectors are marked as not evaluated
+    rxPowerPerSector = np.full(screeningRxPowerW.shape, np.nan)
+    np.put_along_axis(rxPowerPerSector, candidates, candidatesRxPower, axis=-1)
+    return rxPowerPerSector, bestSector, psdBestSector, snrBestSector
+
+
+def computeSlsRx(txDirectivity, weightedFading, txParam, slsMode=None):
+    """Compute the reception of all the sectors with the SLS configuration (globals.slsMode, slsMethod, etc.)
+
+    Parameters
+    ----------
+    txDirectivity, weightedFading :
+        See computeRxAllSectors
+
+    txParam : TxParam class
+        The transmission parameters
+
+    slsMode : string
+        'exhaustive' or 'pruned' (globals.slsMode if None)
+
+    Returns
+    -------
+    See computeRxAllSectors
+    """
+    if slsMode is None:
+        slsMode = globals.slsMode
+    arguments = (txDirectivity, weightedFading, txParam.getTxPowerPerSubBandWHz(), txParam.getLowerFrequencies(),
+                 txParam.getHigherFrequencies(), txParam.getNoise())
+    if slsMode == 'pruned':
+        return computeRxPrunedSectors(*arguments, globals.slsTopK, globals.slsScreeningSubbands, globals.slsMethod,
+                                      globals.slsFastMath)
+    return computeRxAllSectors(*arguments, globals.slsMethod, globals.slsFastMath)
+
+
+def computeDelayPhasors(centerFrequenciesList, mpcDelay):
+    """Compute the phasor exp(-j 2 pi f delay) of every MPC for every subband
+
+    When the subbands are evenly spaced (see TxParam.allocateFrequencies), the phasors of an MPC across the subbands
+    are a geometric progression. They are then obtained by a cumulative product of the phasor of the frequency
+    step, resynchronized on an exact phasor every phasorResyncPeriod subbands to bound the rounding errors.
+
+    Parameters
+    ----------
+    centerFrequenciesList : Numpy array
+        The center frequency of each subband
+
+    mpcDelay : Numpy array
+        The delay of the MPCs
+
+    Returns
+    -------
+    delayPhasors: Numpy array
+        The delay phasor for each subband and each MPC
+    """
+    nbSubBands = len(centerFrequenciesList)
+    resyncPeriod = globals.phasorResyncPeriod
+    frequencyStep = centerFrequenciesList[1] - centerFrequenciesList[0] if nbSubBands > 1 else 0
+    if nbSubBands <= resyncPeriod or len(mpcDelay) == 0 \
+            or not np.allclose(np.diff(centerFrequenciesList), frequencyStep, rtol=1e-9, atol=0):
+        temp_delay = -2 * np.pi * np.outer(centerFrequenciesList, mpcDelay)
+        return np.cos(temp_delay) + 1j * np.sin(temp_delay)
+    # Exact phasors for the first subband of every block of resyncPeriod subbands
+    blockPhase = -2 * np.pi * np.outer(centerFrequenciesList[::resyncPeriod], mpcDelay)
+    blockPhasors = np.cos(blockPhase) + 1j * np.sin(blockPhase)
+    # Progression of the phasors within a block
+    stepPhase = -2 * np.pi * frequencyStep * mpcDelay
+    progression = np.empty((resyncPeriod, len(mpcDelay)), dtype=complex)
+    progression[0] = 1
+    progression[1:] = np.cos(stepPhase) + 1j * np.sin(stepPhase)
+    np.cumprod(progression, axis=0, out=progression)
+    delayPhasors = blockPhasors[:, np.newaxis, :] * progression[np.newaxis, :, :]
+    return delayPhasors.reshape((-1, len(mpcDelay)))[:nbSubBands]
+
+
+def computeSmallScaleFading(centerFrequenciesList, mpcDelay, mpcPathLoss, mpcPhase):
+    """Compute the small-scale fading of MPCs for every subband
+
+    Parameters
+    ----------
+    centerFrequenciesList : Numpy array
+        The center frequency of each subband
+
+    mpcDelay, mpcPathLoss, mpcPhase : Numpy array
+        The delay, path loss (dB) and phase of the MPCs
+
+    Returns
+    -------
+    smallScaleFading: Numpy array
+        Small-Scale fading for each subband and each MPC
+    """
+    doppler = complex(1, 0)
+    # The MPCs attributes might be stored with a reduced precision - The computation is always done in double
+    mpcDelay = np.asarray(mpcDelay, dtype=np.float64)
+    mpcPathLoss = np.asarray(mpcPathLoss, dtype=np.float64)
+    mpcPhase = np.asarray(mpcPhase, dtype=np.float64)
+    # Compute complex delay
+    smallScaleFading = computeDelayPhasors(centerFrequenciesList, mpcDelay)
+    # Path Power Linear
+    pathPowerLinear = pow(10.0, (mpcPathLoss / 10.0))
+    # Complex phase
+    phase_numpy = mpcPhase
+    complexPhase = np.cos(phase_numpy) + 1j * np.sin(phase_numpy)
+    # Small Scale Fading (the terms that do not depend on the subband are applied at once)
+    smallScaleFading *= np.sqrt(pathPowerLinear) * doppler * complexPhase
+    return smallScaleFading
+
+
 def precomputeTxValues(txRx, qdProperties, centerFrequenciesList):
     """Compute the parameters used for a transmission that are independent of the applied beamforming, and thus from the sectors
 
@@ -331,44 +639,54 @@ def precomputeTxValues(txRx, qdProperties, centerFrequenciesList):
 
     nbMpcs: float
         The Number of MPCs for the given trace
-    azimuthTxAngle: Numpy array
-        The azimuth angle for the transmitter for each MPC (degrees)
-    elevationTxAngle: Numpy array
-        The elevation angle for the transmitter for each MPC (degrees)
-    azimuthRxAngle: Numpy array
-        The azimuth angle for the receiver for each MPC (degrees)
-    elevationRxAngle: Numpy array
-        The elevation angle for the receiver for each MPC (degrees)
+    txAngleIndex: Numpy array
+        The index of the angle of departure of each MPC in a raveled directivity (see getFlatDirectivity)
+    rxAngleIndex: Numpy array
+        The index of the angle of arrival of each MPC in a raveled directivity (see getFlatDirectivity)
     smallScaleFading: Numpy array
         Small-Scale fading for each MPC
     """
-    # Get the number of MPCs
-    nbMpcs = qdProperties.DicNbMultipathTxRx[txRx]
-    doppler = complex(1, 0)
+    # Get the number of MPCs and their attributes (a single lookup in the channel offsets table)
+    nbMpcs, mpcDelay, mpcPathLoss, mpcPhase, _, _, _, _ = qdProperties.getMpcs(txRx)
     if (nbMpcs > 0):
-        # Compute complex delay
-        temp_delay = -2 * np.pi * np.outer(centerFrequenciesList, qdProperties.DicDelayTxRx[txRx])
-        delay = np.cos(temp_delay) + 1j * np.sin(temp_delay)
-        # Path Power Linear
-        pathPowerLinear = pow(10.0, (qdProperties.DicPathLossTxRx[txRx] / 10.0))
-        # Complex phase
-        phase_numpy = qdProperties.DicPhaseTxRx[txRx]
-        complexPhase = np.cos(phase_numpy) + 1j * np.sin(phase_numpy)
-        # Small Scale Fading
-        smallScaleFading = delay * np.sqrt(pathPowerLinear) * doppler * complexPhase
+        smallScaleFading = computeSmallScaleFading(centerFrequenciesList, mpcDelay, mpcPathLoss, mpcPhase)
 
         # Get the MPCs angles of departure and arrival
-        # We are rounding them as our steering vector granularity is 1 degree
-        azimuthTxAngle = np.around(qdProperties.DicAodAzimuthTxRx[txRx]).astype(int)
-        elevationTxAngle = np.around(qdProperties.DicAodElevationTxRx[txRx]).astype(int)
-        azimuthRxAngle = np.around(qdProperties.DicAoaAzimuthTxRx[txRx]).astype(int)
-        elevationRxAngle = np.around(qdProperties.DicAoaElevationTxRx[txRx]).astype(int)
-        return nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading
+        # They are rounded at ingest as our steering vector granularity is 1 degree
+        txAngleIndex, rxAngleIndex = qdProperties.getMpcAngleIndices(txRx)
+        if qdProperties.mergeAngleBins:
+            # The MPCs with the same rounded angles have the same Tx and Rx directivity whatever the beamforming
+            # Their small-scale fading can thus be summed (the reception sums the MPCs coherently)
+            angleBinOrder, angleBinStarts = qdProperties.getAngleBins(txRx)
+            smallScaleFading = np.add.reduceat(smallScaleFading[:, angleBinOrder], angleBinStarts, axis=1)
+            txAngleIndex = txAngleIndex[angleBinOrder[angleBinStarts]]
+            rxAngleIndex = rxAngleIndex[angleBinOrder[angleBinStarts]]
+            nbMpcs = len(angleBinStarts)
+        return nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading
     else:
         # No MPC for the given transmission
-        return 0, 0, 0, 0, 0, 0
+        return 0, 0, 0, 0
+
 
-def computeSteeredRx(directivityTxAzimuthElevation,directivityRxAzimuthElevation, txParam, nbSubBands,qdScenario, codebooks,nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading):
+def getFlatDirectivity(directivity):
+    """Ravel the azimuth and elevation axes of a directivity
+
+    The directivity of the MPCs can then be gathered with np.take from their angle indices
+    (see QdProperties.aodAngleIndex)
+
+    Parameters
+    ----------
+    directivity : Numpy array
+        Directivity whose two last axes are the azimuth and the elevation
+
+    Returns
+    -------
+    flatDirectivity : Numpy array
+        The directivity with the azimuth and elevation axes raveled (a view if the directivity is contiguous)
+    """
+    return directivity.reshape(directivity.shape[:-2] + (-1,))
+
+def computeSteeredRx(directivityTxAzimuthElevation,directivityRxAzimuthElevation, txParam, nbSubBands,qdScenario, codebooks,nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading):
     """Compute the RX Power when the PAA is steered in azimuth and elevation instead of using sectors
     """
     if nbMpcs == 0:
@@ -378,8 +696,8 @@ def computeSteeredRx(directivityTxAzimuthElevation,directivityRxAzimuthElevation
             -math.inf)  # TODO Define a constant for -1 i.e, no best sector
 
 
-    txSum_numpy = directivityTxAzimuthElevation[[azimuthTxAngle], [elevationTxAngle]]
-    rxSum_numpy = directivityRxAzimuthElevation[[azimuthRxAngle], [elevationRxAngle]]
+    txSum_numpy = np.take(getFlatDirectivity(directivityTxAzimuthElevation), txAngleIndex)
+    rxSum_numpy = np.take(getFlatDirectivity(directivityRxAzimuthElevation), rxAngleIndex)
 
     subBandGainAllSubbandSinglePath = rxSum_numpy * txSum_numpy * smallScaleFading
 
@@ -388,7 +706,142 @@ def computeSteeredRx(directivityTxAzimuthElevation,directivityRxAzimuthElevation
               txParam.getNoise(), nbSubBands)
     return rxPower, psd
 
-def performSls(txRx, qdProperties, txParam, nbSubBands, qdScenario, codebooks):
+def getEffectiveChannel(txRx, qdProperties, txParam, qdScenario, codebooks):
+    """Get the effective channel of a (pair, trace), i.e., the small-scale fading weighted by the Rx directivity
+
+    The effective channel does not depend on the Tx sector. It is kept with the channel in a bounded LRU cache
+    (qdProperties.effectiveChannels) so that the SLS performed again for the same (pair, trace), e.g., when iterating
+    over the sectors in the visualizer, only computes the Tx side.
+    The traces with the same MPCs as a previous trace (see QdProperties.traceRuns) share the effective channel of the
+    first trace of their run.
+    With the channel reciprocity, both directions of a link share the same small-scale fading: it is cached once for
+    the stored direction and the reverse link only swaps the angles of departure and arrival.
+
+    Parameters
+    ----------
+    txRx : Tuple
+        ID of the transmitter, receiver, PAA transmitter, PAA receiver, and the trace Index
+
+    qdProperties : QdProperties class
+        MPCs characteristics
+
+    txParam : TxParam class
+        The transmission parameters
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    Returns
+    -------
+    nbMpcs: int
+        The Number of MPCs (or angle bins if they are merged)
+    txAngleIndex: Numpy array
+        The index of the angle of departure of the MPCs in a raveled directivity (see getFlatDirectivity)
+    weightedFading: Numpy array
+        Small-Scale fading multiplied by the Rx directivity for every MPC and every subband (read-only)
+    """
+    if qdProperties.effectiveChannelsContext is None or qdProperties.effectiveChannelsContext[0] is not txParam \
+            or qdProperties.effectiveChannelsContext[1] is not codebooks:
+        # The cached effective channels were obtained with other transmission parameters or codebooks
+        qdProperties.effectiveChannels.clear()
+        qdProperties.effectiveChannelsContext = (txParam, codebooks)
+    key = tuple(int(i) for i in txRx[:4]) + (qdProperties.getTraceRun(txRx),)
+    if key in qdProperties.effectiveChannels:
+        qdProperties.effectiveChannels.move_to_end(key)
+        return qdProperties.effectiveChannels[key]
+    if qdProperties.reciprocity:
+        nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = getReciprocalTxValues(
+            key, qdProperties, txParam.getCenterFrequencies())
+    else:
+        nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading = precomputeTxValues(
+            key, qdProperties, txParam.getCenterFrequencies())
+    if nbMpcs == 0:
+        effectiveChannel = (0, None, None)
+    else:
+        _, quasiOmniDirectivityToUse = getSlsDirectivity(txRx[0], qdScenario, codebooks)
+        # Get the Rx Antenna Pattern for all MPCs TODO Should take into account antenna
+        rxDirectivity = np.take(getFlatDirectivity(quasiOmniDirectivityToUse[txRx[3]]), rxAngleIndex)
+        weightedFading = rxDirectivity[:, np.newaxis] * smallScaleFading.T
+        weightedFading.setflags(write=False)
+        effectiveChannel = (nbMpcs, txAngleIndex, weightedFading)
+    qdProperties.effectiveChannels[key] = effectiveChannel
+    if len(qdProperties.effectiveChannels) > globals.effectiveChannelCacheSize:
+        # Evict the least recently used effective channel
+        qdProperties.effectiveChannels.popitem(last=False)
+    return effectiveChannel
+
+
+def getReciprocalTxValues(txRx, qdProperties, centerFrequenciesList):
+    """Get the values of precomputeTxValues from the stored direction of a link when the channel is reciprocal
+
+    The values of the stored direction are kept in the effective channels cache so that both directions of a link
+    compute the small-scale fading only once.
+
+    Parameters
+    ----------
+    txRx : Tuple
+        ID of the transmitter, receiver, PAA transmitter, PAA receiver, and the trace Index
+
+    qdProperties : QdProperties class
+        MPCs characteristics
+
+    centerFrequenciesList : Numpy array
+        The center frequency of each subband
+
+    Returns
+    -------
+    See precomputeTxValues (the angle indices of departure and arrival are swapped for the reverse link)
+    """
+    _, reverseLink = qdProperties.getStoredPair(*txRx[:4])
+    storedTxRx = (txRx[1], txRx[0], txRx[3], txRx[2], txRx[4]) if reverseLink else txRx
+    key = ('txValues',) + storedTxRx
+    if key in qdProperties.effectiveChannels:
+        qdProperties.effectiveChannels.move_to_end(key)
+        txValues = qdProperties.effectiveChannels[key]
+    else:
+        txValues = precomputeTxValues(storedTxRx, qdProperties, centerFrequenciesList)
+        qdProperties.effectiveChannels[key] = txValues
+    if reverseLink:
+        nbMpcs, rxAngleIndex, txAngleIndex, smallScaleFading = txValues
+        return nbMpcs, txAngleIndex, rxAngleIndex, smallScaleFading
+    return txValues
+
+
+def getSlsDirectivity(idTx, qdScenario, codebooks):
+    """Get the directivity of the transmitter sectors and of the receiver quasi-omni pattern used for the SLS
+
+    Parameters
+    ----------
+    idTx : int
+        ID of the transmitter
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    Returns
+    -------
+    sectorDirectivity : Numpy array
+        Directivity of the transmitter sectors
+    quasiOmniDirectivity : Numpy array
+        Quasi-omni directivity of the receiver PAAs
+    """
+    if qdScenario.isNodeAp(idTx):
+        sectorDirectivityToUse = codebooks.getApSectorsDirectivity() # TODO Should take into account PAA Id - Fine as for now as we are using symmetric multi PAA codebook
+        quasiOmniDirectivityToUse = codebooks.getStaQuasiOmniDirectivity()  # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
+    else:
+        sectorDirectivityToUse = codebooks.getStaSectorsDirectivity() # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
+        # quasiOmniDirectivityToUse = codebooks.getStaQuasiOmniDirectivity()  # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
+        quasiOmniDirectivityToUse = codebooks.getApQuasiOmniDirectivity()  # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
+    return sectorDirectivityToUse, quasiOmniDirectivityToUse
+
+
+def performSls(txRx, qdProperties, txParam, nbSubBands, qdScenario, codebooks, slsMode=None):
     """Perform the SLS phase for a given pair of transmitter,receiver, pair of transmitter and receiver PAA, and for a given trace
 
     Parameters
@@ -412,6 +865,10 @@ def performSls(txRx, qdProperties, txParam, nbSubBands, qdScenario, codebooks):
     codebooks : Codebooks class
         Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
 
+    slsMode : string
+        'exhaustive' to evaluate every sector over all the subbands, or 'pruned' to evaluate only the best sectors
+        of a screening on a few subbands (globals.slsMode if None)
+
     Returns
     -------
     maxRxPower: float
@@ -425,52 +882,407 @@ def performSls(txRx, qdProperties, txParam, nbSubBands, qdScenario, codebooks):
     rxPowerPerSector: Numpy array
         Received power for all the tested sectors (dB)
     """
-    maxRxPower = -math.inf
-    bestSector = 0
-    snrBestSector = 0
-    psdBestSector = []
-    rxPowerPerSector = []
-    # Compute only once the TX values that are common to every sector
-    nbMpcs, azimuthTxAngle, elevationTxAngle, azimuthRxAngle, elevationRxAngle, smallScaleFading = precomputeTxValues(
-        txRx, qdProperties, txParam.getCenterFrequencies())
+    # The effective channel (Rx gain and small-scale fading) is common to every sector
+    nbMpcs, txAngleIndex, weightedFading = getEffectiveChannel(txRx, qdProperties, txParam, qdScenario, codebooks)
 
     idTx = txRx[0]
-    idPaaRx = txRx[3]
-    if qdScenario.isNodeAp(idTx):
-        sectorDirectivityToUse = codebooks.getApSectorsDirectivity() # TODO Should take into account PAA Id - Fine as for now as we are using symmetric multi PAA codebook
-        quasiOmniDirectivityToUse = codebooks.getStaQuasiOmniDirectivity()  # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
-    else:
-        sectorDirectivityToUse = codebooks.getStaSectorsDirectivity() # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
-        # quasiOmniDirectivityToUse = codebooks.getStaQuasiOmniDirectivity()  # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
-        quasiOmniDirectivityToUse = codebooks.getApQuasiOmniDirectivity()  # TODO Should take into account PAA - Fine as for now as we are using symmetric multi PAA codebook
+    sectorDirectivityToUse, _ = getSlsDirectivity(idTx, qdScenario, codebooks)
     if nbMpcs == 0:
         # No MPC for the given traceIndex => Return infinite values
         return -math.inf, -math.inf, np.full(nbSubBands, -math.inf), -1, np.full(
             codebooks.getNbSectorsPerPaaNode(qdScenario.getNodeType(idTx)), -math.inf)  # TODO Define a constant for -1 i.e, no best sector
 
-    for sectorID in range(codebooks.getNbSectorsPerPaaNode(qdScenario.getNodeType(idTx))):
-        # getNbSectorsPerPaaNode
-        # Iterate over the sector and get the Tx and RX directivity
-        txSum_numpy = sectorDirectivityToUse[sectorID][
-            [azimuthTxAngle], [elevationTxAngle]]  # Get the Tx Antenna Pattern for all MPCs
-        rxSum_numpy = quasiOmniDirectivityToUse[idPaaRx][[azimuthRxAngle], [
-            elevationRxAngle]]  # Get the Rx Antenna Pattern for all MPCs TODO Should take into account antenna
-        # Compute the gain for all subband/MPCs
-        subBandGainAllSubbandSinglePath = rxSum_numpy * txSum_numpy * smallScaleFading
-        # Compute the reception
-        rxPower, psd, snr = computeRx(nbMpcs, subBandGainAllSubbandSinglePath, txParam.getTxPowerPerSubBandWHz(),
-                                      txParam.getLowerFrequencies(), txParam.getHigherFrequencies(),
-                                      txParam.getNoise(), nbSubBands)
-
-        rxPowerPerSector.append(rxPower)
-        if rxPower > maxRxPower:
-            # Keep the RxPower, the PSD values, and the sector giving the best results (as a TxSS would operate)
-            maxRxPower = rxPower
-            bestSector = sectorID
-            psdBestSector = psd
-            snrBestSector = snr
+    nbSectors = codebooks.getNbSectorsPerPaaNode(qdScenario.getNodeType(idTx))
+    # Gather the Tx directivity of all the sectors for all the MPCs at once (nbSectors x nbMpcs)
+    txDirectivity = np.take(getFlatDirectivity(sectorDirectivityToUse[:nbSectors]), txAngleIndex, axis=1)
+    rxPowerPerSector, bestSector, psdBestSector, snrBestSector = computeSlsRx(txDirectivity, weightedFading, txParam,
+                                                                              slsMode)
+    bestSector = int(bestSector)
+    maxRxPower = rxPowerPerSector[bestSector]
     if maxRxPower == -math.inf:
         # Handle the case where the best power computed is - inf
-
-        bestSector = -1 # TODO Define a constant for this
+        bestSector = -1  # TODO Define a constant for this
+        snrBestSector = 0
+        psdBestSector = []
     return maxRxPower, snrBestSector, psdBestSector, bestSector, rxPowerPerSector
+
+
+def precomputeTracesValues(pairKey, traceStart, traceStop, qdProperties, centerFrequenciesList, traceMask=None):
+    """Compute the parameters independent of the sectors for a range of traces of a pair (see precomputeTxValues)
+
+    Parameters
+    ----------
+    pairKey : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+    traceStart, traceStop : int
+        The range of traces [traceStart, traceStop)
+
+    qdProperties : QdProperties class
+        MPCs characteristics
+
+    centerFrequenciesList : Numpy array
+        The center frequency of each subband
+
+    traceMask : Numpy array
+        The traces of the range to compute (None for all the traces)
+
+    Returns
+    -------
+    nbMpcsPerTrace: Numpy array
+        The Number of MPCs for each trace (of the mask)
+    txAngleIndex, rxAngleIndex: Numpy array
+        The index of the angles of departure and arrival of the MPCs of all the traces concatenated in a raveled
+        directivity (see getFlatDirectivity)
+    smallScaleFading: Numpy array
+        Small-Scale fading for each subband and each MPC
+    """
+    nbMpcsPerTrace, mpcDelay, mpcPathLoss, mpcPhase, _, _, _, _ = qdProperties.getPairMpcs(pairKey, traceStart,
+                                                                                           traceStop)
+    txAngleIndex, rxAngleIndex = qdProperties.getPairAngleIndices(pairKey, traceStart, traceStop)
+    if traceMask is not None:
+        # Keep only the MPCs of the traces of the mask
+        mpcMask = np.repeat(traceMask, nbMpcsPerTrace)
+        mpcDelay, mpcPathLoss, mpcPhase, txAngleIndex, rxAngleIndex = [
+            values[mpcMask] for values in (mpcDelay, mpcPathLoss, mpcPhase, txAngleIndex, rxAngleIndex)]
+        nbMpcsPerTrace = nbMpcsPerTrace[traceMask]
+    smallScaleFading = computeSmallScaleFading(centerFrequenciesList, mpcDelay, mpcPathLoss, mpcPhase)
+    if qdProperties.mergeAngleBins and len(mpcDelay) > 0:
+        # Sum the small-scale fading of the MPCs sharing the same angles (see precomputeTxValues)
+        angleBinOrder, angleBinStarts, nbMpcsPerTrace = qdProperties.getPairAngleBins(pairKey, traceStart, traceStop)
+        if traceMask is not None:
+            # The angle bins never span several traces - Keep the ones of the traces of the mask
+            angleBinFirst = np.zeros(len(mpcMask), dtype=bool)
+            angleBinFirst[angleBinStarts] = True
+            angleBinOrder = (np.cumsum(mpcMask) - 1)[angleBinOrder[mpcMask]]
+            angleBinStarts = np.flatnonzero(angleBinFirst[mpcMask])
+            nbMpcsPerTrace = nbMpcsPerTrace[traceMask]
+        smallScaleFading = np.add.reduceat(smallScaleFading[:, angleBinOrder], angleBinStarts, axis=1)
+        txAngleIndex = txAngleIndex[angleBinOrder[angleBinStarts]]
+        rxAngleIndex = rxAngleIndex[angleBinOrder[angleBinStarts]]
+    return nbMpcsPerTrace, txAngleIndex, rxAngleIndex, smallScaleFading
+
+
+def performSlsTraces(pairKey, traceStart, traceStop, qdProperties, txParam, nbSubBands, qdScenario, codebooks,
+                     slsMode=None, tracesValues=None):
+    """Perform the SLS phase for a range of traces of a given pair of transmitter, receiver, transmitter and receiver PAA
+
+    The traces are processed by batches: the MPCs of the traces of a batch are padded to the same number of MPCs
+    and the gain of every trace, sector and subband is obtained with a single batched matrix product.
+    Only the first trace of every run of identical traces is computed (see QdProperties.traceRuns), the other traces
+    of the run reuse its results.
+    The results are the same as the ones obtained by calling performSls for every trace.
+
+    Parameters
+    ----------
+    pairKey : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+    traceStart, traceStop : int
+        The range of traces [traceStart, traceStop)
+
+    qdProperties : QdProperties class
+        MPCs characteristics
+
+    txParam : TxParam class
+        The transmission parameters
+
+    nbSubBands : int
+        Number of subbands to use
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    slsMode : string
+        See performSls
+
+    tracesValues : Tuple
+        The values returned by precomputeTracesValues for the first trace of every run of the range (computed if None)
+
+    Returns
+    -------
+    maxRxPower: Numpy array
+        The power received for the best sector for each trace (dB)
+    snrBestSector: Numpy array
+        The SNR observed for the best sector for each trace (dB)
+    psdBestSector: Numpy array
+        The PSD of the best sector for each trace (power received per subband in dB)
+    bestSector: Numpy array
+        ID of the best Sector for each trace (-1 if no power is received)
+    rxPowerPerSector: Numpy array
+        Received power for all the tested sectors for each trace (dB)
+    """
+    idTx = pairKey[0]
+    idPaaRx = pairKey[3]
+    sectorDirectivityToUse, quasiOmniDirectivityToUse = getSlsDirectivity(idTx, qdScenario, codebooks)
+    nbSectors = codebooks.getNbSectorsPerPaaNode(qdScenario.getNodeType(idTx))
+    flatSectorDirectivity = getFlatDirectivity(sectorDirectivityToUse[:nbSectors])
+    flatQuasiOmniDirectivity = getFlatDirectivity(quasiOmniDirectivityToUse[idPaaRx])
+    # Only the first trace of every run of identical traces is computed
+    runStarts = getRunStarts(qdProperties, pairKey, traceStart, traceStop)
+    runIds = np.cumsum(runStarts) - 1
+    nbTraces = int(runStarts.sum())
+    maxRxPower = np.full(nbTraces, -math.inf)
+    snrBestSector = np.full(nbTraces, -math.inf)
+    psdBestSector = np.full((nbTraces, nbSubBands), -math.inf)
+    bestSector = np.full(nbTraces, -1, dtype=int)
+    rxPowerPerSector = np.full((nbTraces, nbSectors), -math.inf)
+
+    if tracesValues is None:
+        tracesValues = precomputeTracesValues(pairKey, traceStart, traceStop, qdProperties,
+                                              txParam.getCenterFrequencies(), runStarts)
+    nbMpcsPerTrace, txAngleIndex, rxAngleIndex, smallScaleFading = tracesValues
+    if nbTraces == 0 or nbMpcsPerTrace.max() == 0:
+        return maxRxPower[runIds], snrBestSector[runIds], psdBestSector[runIds], bestSector[runIds], \
+            rxPowerPerSector[runIds]
+    mpcOffsets = np.zeros(nbTraces + 1, dtype=np.int64)
+    mpcOffsets[1:] = np.cumsum(nbMpcsPerTrace)
+    # Number of traces per batch so that the padded batch does not exceed slsBatchSize MPCs
+    batchSize = max(1, globals.slsBatchSize // int(nbMpcsPerTrace.max()))
+    for batchStart in range(0, nbTraces, batchSize):
+        batchStop = min(batchStart + batchSize, nbTraces)
+        nbMpcsBatch = nbMpcsPerTrace[batchStart:batchStop]
+        nbMpcsMax = int(nbMpcsBatch.max())
+        if nbMpcsMax == 0:
+            continue
+        mpcSlice = slice(mpcOffsets[batchStart], mpcOffsets[batchStop])
+        # Position of every MPC of the batch in the padded arrays
+        traceIds = np.repeat(np.arange(batchStop - batchStart), nbMpcsBatch)
+        mpcIds = np.arange(mpcSlice.stop - mpcSlice.start) - np.repeat(
+            mpcOffsets[batchStart:batchStop] - mpcOffsets[batchStart], nbMpcsBatch)
+        # Padded MPCs have a null directivity and a null fading and thus do not contribute to the gain
+        txDirectivity = np.zeros((batchStop - batchStart, nbSectors, nbMpcsMax), dtype=complex)
+        txDirectivity[traceIds, :, mpcIds] = np.take(flatSectorDirectivity, txAngleIndex[mpcSlice], axis=1).T
+        weightedFading = np.zeros((batchStop - batchStart, nbMpcsMax, nbSubBands), dtype=complex)
+        weightedFading[traceIds, mpcIds, :] = np.take(flatQuasiOmniDirectivity, rxAngleIndex[mpcSlice])[
+            :, np.newaxis] * smallScaleFading[:, mpcSlice].T
+        batchRxPowerPerSector, batchBestSector, batchPsd, batchSnr = computeSlsRx(txDirectivity, weightedFading,
+                                                                                  txParam, slsMode)
+        batchMaxRxPower = np.take_along_axis(batchRxPowerPerSector, batchBestSector[:, np.newaxis], axis=1)[:, 0]
+        # Traces without MPC keep infinite values
+        hasMpcs = nbMpcsBatch > 0
+        batchTraces = np.arange(batchStart, batchStop)[hasMpcs]
+        rxPowerPerSector[batchTraces] = batchRxPowerPerSector[hasMpcs]
+        maxRxPower[batchTraces] = batchMaxRxPower[hasMpcs]
+        psdBestSector[batchTraces] = batchPsd[hasMpcs]
+        snrBestSector[batchTraces] = batchSnr[hasMpcs]
+        bestSector[batchTraces] = batchBestSector[hasMpcs]
+    # Handle the case where the best power computed is - inf while MPCs exist (see performSls)
+    noPower = (maxRxPower == -math.inf) & (nbMpcsPerTrace > 0)
+    bestSector[noPower] = -1
+    snrBestSector[noPower] = 0
+    # Every trace gets the results of the first trace of its run
+    return maxRxPower[runIds], snrBestSector[runIds], psdBestSector[runIds], bestSector[runIds], \
+        rxPowerPerSector[runIds]
+
+
+def getRunStarts(qdProperties, pairKey, traceStart, traceStop):
+    """Get the traces of a range starting a run of identical traces (see QdProperties.getPairTraceRuns)
+
+    Returns
+    -------
+    runStarts : Numpy array
+        True for the traces of the range whose MPCs differ from the ones of the previous trace
+    """
+    runTraces = qdProperties.getPairTraceRuns(pairKey, traceStart, traceStop)
+    return runTraces == np.arange(len(runTraces))
+
+
+def performSlsTracesReciprocal(pairKey, traceStart, traceStop, qdProperties, txParam, nbSubBands, qdScenario,
+                               codebooks, slsMode=None):
+    """Perform the SLS phase for a range of traces of a pair and of its reverse link (see performSlsTraces)
+
+    The channel being reciprocal, the small-scale fading of the MPCs is computed once and shared by both links:
+    the reverse link only swaps the angle indices of departure and arrival.
+
+    Parameters
+    ----------
+    pairKey : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver of the forward link
+
+    See performSlsTraces for the other parameters
+
+    Returns
+    -------
+    forwardResults, reverseResults : Tuple
+        The results of performSlsTraces for the forward link and for the reverse link
+    """
+    tracesValues = precomputeTracesValues(pairKey, traceStart, traceStop, qdProperties, txParam.getCenterFrequencies(),
+                                          getRunStarts(qdProperties, pairKey, traceStart, traceStop))
+    nbMpcsPerTrace, txAngleIndex, rxAngleIndex, smallScaleFading = tracesValues
+    reverseKey = (pairKey[1], pairKey[0], pairKey[3], pairKey[2])
+    forwardResults = performSlsTraces(pairKey, traceStart, traceStop, qdProperties, txParam, nbSubBands, qdScenario,
+                                      codebooks, slsMode, tracesValues)
+    reverseResults = performSlsTraces(reverseKey, traceStart, traceStop, qdProperties, txParam, nbSubBands,
+                                      qdScenario, codebooks, slsMode,
+                                      (nbMpcsPerTrace, rxAngleIndex, txAngleIndex, smallScaleFading))
+    return forwardResults, reverseResults
+
+
+def compareSubbandResolutions(qdProperties, referenceTxParam, txParams, qdScenario, codebooks, traceStep):
+    """Compare the SLS results obtained with fewer subbands to the ones obtained with the reference subbands
+
+    The SLS is performed for one trace out of traceStep of every pair.
+
+    Parameters
+    ----------
+    qdProperties : QdProperties class
+        MPCs characteristics
+
+    referenceTxParam : TxParam class
+        The transmission parameters with the reference subbands
+
+    txParams : List of TxParam class
+        The transmission parameters for every number of subbands to evaluate
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    traceStep : int
+        One trace out of traceStep is compared
+
+    Returns
+    -------
+    resolutionReports : List of dict
+        For every TxParam, the number of SLS compared, the best sector agreement (ratio), and the mean and maximum
+        absolute error of the power received with the best sector (dB)
+    """
+    nbSls = 0
+    nbAgreements = np.zeros(len(txParams))
+    rxPowerErrors = [[] for _ in txParams]
+    for pairKey in qdProperties.pairKeys:
+        for traceIndex in range(0, qdProperties.nbTraces, max(1, traceStep)):
+            txRx = (int(pairKey[0]), int(pairKey[1]), int(pairKey[2]), int(pairKey[3]), traceIndex)
+            referenceRxPower, _, _, referenceBestSector, _ = performSls(
+                txRx, qdProperties, referenceTxParam, len(referenceTxParam.getCenterFrequencies()), qdScenario,
+                codebooks)
+            if referenceBestSector == -1:
+                # No MPC for this trace
+                continue
+            nbSls += 1
+            for i, txParam in enumerate(txParams):
+                rxPower, _, _, bestSector, _ = performSls(txRx, qdProperties, txParam,
+                                                          len(txParam.getCenterFrequencies()), qdScenario, codebooks)
+                nbAgreements[i] += bestSector == referenceBestSector
+                rxPowerErrors[i].append(abs(referenceRxPower - rxPower))
+    resolutionReports = []
+    for i in range(len(txParams)):
+        errors = np.asarray(rxPowerErrors[i], dtype=np.float64)
+        resolutionReports.append({'nbSls': nbSls,
+                                  'bestSectorAgreement': nbAgreements[i] / nbSls if nbSls > 0 else 1.0,
+                                  'meanRxPowerError': float(errors.mean()) if nbSls > 0 else 0.0,
+                                  'maxRxPowerError': float(errors.max()) if nbSls > 0 else 0.0})
+    return resolutionReports
+
+
+def compareChannelPrecision(referenceProperties, qdProperties, txParam, nbSubBands, qdScenario, codebooks):
+    """Compare the SLS results obtained with a channel stored with a reduced precision to a reference channel
+
+    The SLS is performed for every pair and every trace of the reference channel.
+
+    Parameters
+    ----------
+    referenceProperties : QdProperties class
+        MPCs characteristics stored in double precision
+
+    qdProperties : QdProperties class
+        MPCs characteristics stored with the precision to evaluate
+
+    txParam : TxParam class
+        The transmission parameters
+
+    nbSubBands : int
+        Number of subbands to use
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    Returns
+    -------
+    precisionReport : dict
+        Number of SLS compared, best sector agreement (ratio), mean and maximum absolute error of the received power
+        for the best sector (dB), and memory used by both channels (bytes)
+    """
+    nbSls = 0
+    nbAgreements = 0
+    rxPowerErrors = []
+    for pairKey in referenceProperties.pairKeys:
+        for traceIndex in range(referenceProperties.nbTraces):
+            txRx = (int(pairKey[0]), int(pairKey[1]), int(pairKey[2]), int(pairKey[3]), traceIndex)
+            referenceRxPower, _, _, referenceBestSector, _ = performSls(txRx, referenceProperties, txParam,
+                                                                       nbSubBands, qdScenario, codebooks)
+            if referenceBestSector == -1:
+                # No MPC for this trace
+                continue
+            rxPower, _, _, bestSector, _ = performSls(txRx, qdProperties, txParam, nbSubBands, qdScenario, codebooks)
+            nbSls += 1
+            nbAgreements += bestSector == referenceBestSector
+            rxPowerErrors.append(abs(rxPower - referenceRxPower))
+    rxPowerErrors = np.asarray(rxPowerErrors, dtype=np.float64)
+    return {'nbSls': nbSls,
+            'bestSectorAgreement': nbAgreements / nbSls if nbSls > 0 else 1.0,
+            'meanRxPowerError': float(rxPowerErrors.mean()) if nbSls > 0 else 0.0,
+            'maxRxPowerError': float(rxPowerErrors.max()) if nbSls > 0 else 0.0,
+            'referenceMemorySize': referenceProperties.getMemorySize(),
+            'memorySize': qdProperties.getMemorySize()}
+
+
+def compareSlsPruning(qdProperties, txParam, nbSubBands, qdScenario, codebooks, traceStep):
+    """Compare the SLS results of the pruned mode to the exhaustive sweep on a sample of the traces
+
+    Parameters
+    ----------
+    qdProperties : QdProperties class
+        MPCs characteristics
+
+    txParam : TxParam class
+        The transmission parameters
+
+    nbSubBands : int
+        Number of subbands to use
+
+    qdScenario: QdScenario class
+        Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    codebooks : Codebooks class
+        Directivity of the AP and STA nodes (sectors and quasi-omni directivity)
+
+    traceStep : int
+        One trace out of traceStep is compared
+
+    Returns
+    -------
+    pruningReport : dict
+        Number of SLS compared, best sector agreement (ratio), mean and maximum loss of received power for the best
+        sector (dB)
+    """
+    nbSls = 0
+    nbAgreements = 0
+    rxPowerLosses = []
+    for pairKey in qdProperties.pairKeys:
+        for traceIndex in range(0, qdProperties.nbTraces, max(1, traceStep)):
+            txRx = (int(pairKey[0]), int(pairKey[1]), int(pairKey[2]), int(pairKey[3]), traceIndex)
+            referenceRxPower, _, _, referenceBestSector, _ = performSls(txRx, qdProperties, txParam, nbSubBands,
+                                                                       qdScenario, codebooks, 'exhaustive')
+            if referenceBestSector == -1:
+                # No MPC for this trace
+                continue
+            rxPower, _, _, bestSector, _ = performSls(txRx, qdProperties, txParam, nbSubBands, qdScenario,
+                                                      codebooks, 'pruned')
+            nbSls += 1
+            nbAgreements += bestSector == referenceBestSector
+            rxPowerLosses.append(referenceRxPower - rxPower)
+    rxPowerLosses = np.asarray(rxPowerLosses, dtype=np.float64)
+    return {'nbSls': nbSls,
+            'bestSectorAgreement': float(nbAgreements / nbSls) if nbSls > 0 else 1.0,
+            'meanRxPowerLoss': float(rxPowerLosses.mean()) if nbSls > 0 else 0.0,
+            'maxRxPowerLoss': float(rxPowerLosses.max()) if nbSls > 0 else 0.0}
@@ -23,14 +23,20 @@
 ######################################################################################################
 
 
+import collections
 import csv
 import datetime
+import hashlib
+import itertools
 import json
+import multiprocessing
 import os
+import re
 import time
-import pickle
 import numpy as np
+from json.decoder import JSONDecodeError
 
+import cacheManifest
 import globals
 sizeTrcsNdsRlfsTgtsJts = []
 class InitialOrientation:
@@ -56,18 +62,826 @@ class InitialOrientation:
         return "x:" + str(self.x) + " y:" + str(self.y) + "z:" + str(self.z)
 
 
+class ChannelSelection:
+    """
+    A class to represent the part of the channel to load (traces window and nodes subset)
+
+    The traces selected are re-indexed from 0, i.e., the trace index i of the loaded channel corresponds to the
+    trace traceStart + i * traceStep of the Q-D realization software output.
+
+    Attributes
+    ----------
+    traceStart : int
+        Index of the first trace selected
+
+    traceStop : int
+        Index following the last trace selected (None to select the traces until the end)
+
+    traceStep : int
+        Step between two traces selected
+
+    nodes : List of int
+        Identifiers of the nodes selected (None to select all the nodes)
+    """
+    def __init__(self, traceStart=0, traceStop=None, traceStep=1, nodes=None):
+        self.traceStart = traceStart
+        self.traceStop = traceStop
+        self.traceStep = traceStep
+        self.nodes = None if nodes is None else sorted(set(nodes))
+
+    def getTraceSlice(self):
+        """Get the slice of the traces selected
+        """
+        return slice(self.traceStart, self.traceStop, self.traceStep)
+
+    def getNbTraces(self, nbTraces):
+        """Get the number of traces selected among the nbTraces traces of the scenario
+        """
+        return len(range(nbTraces)[self.getTraceSlice()])
+
+    def getAbsoluteTraceIndex(self, traceIndex):
+        """Get the Q-D realization software trace index of a trace of the loaded channel
+        """
+        return self.traceStart + traceIndex * self.traceStep
+
+    def containsPair(self, idTx, idRx):
+        """Check if the channel between two nodes is selected
+        """
+        return self.nodes is None or (idTx in self.nodes and idRx in self.nodes)
+
+    def isComplete(self):
+        """Check if all the traces and all the nodes are selected
+        """
+        return self.traceStart == 0 and self.traceStop is None and self.traceStep == 1 and self.nodes is None
+
+    def getSignature(self):
+        """Get the selection as a dictionary (used to check if the cached data are outdated)
+        """
+        return {'traceStart': self.traceStart, 'traceStop': self.traceStop, 'traceStep': self.traceStep,
+                'nodes': self.nodes}
+
+
 class QdProperties():
     """
     A class to store the MPCs properties
+
+    The MPCs properties are stored column-wise: each MPC attribute (delay, path loss, phase, and angles) is kept
+    in one contiguous array shared by all the node pairs and traces. The MPCs of a given
+    (TX, RX, PAA_TX, PAA_RX, trace) are located thanks to an offsets table indexed by (pair, trace).
+    The (pair, trace) with identical MPCs share the same block of MPCs, i.e., each unique block is stored once.
+
+    Attributes
+    ----------
+    nbTraces : int
+        Number of traces of the channel
+
+    pairIds : Numpy array
+        Pair identifier of every (TX, RX, PAA_TX, PAA_RX) tuple (-1 if no MPC exists for the tuple)
+
+    pairKeys : Numpy array
+        The (TX, RX, PAA_TX, PAA_RX) tuple of every pair
+
+    mpcStart : Numpy array
+        Index of the first MPC of every (pair, trace) in the attributes arrays (identical (pair, trace) share the
+        same MPCs)
+
+    nbMpcs : Numpy array
+        Number of MPCs of every (pair, trace)
+
+    delay : Numpy array
+        Delay of every MPC (s)
+
+    pathLoss : Numpy array
+        Path gain of every MPC (dB)
+
+    phase : Numpy array
+        Phase of every MPC (rad)
+
+    aodElevation : Numpy array
+        Angle of departure elevation of every MPC (degrees)
+
+    aodAzimuth : Numpy array
+        Angle of departure azimuth of every MPC (degrees)
+
+    aoaElevation : Numpy array
+        Angle of arrival elevation of every MPC (degrees)
+
+    aoaAzimuth : Numpy array
+        Angle of arrival azimuth of every MPC (degrees)
+
+    aodAngleIndex, aoaAngleIndex : Numpy array
+        Flat index of the rounded angle of departure and arrival of every MPC in a directivity grid
+        (azimuth * elevationCardinality + elevation), i.e., the index of its directivity in a raveled directivity
+
+    angleBinOrder : Numpy array
+        For every (pair, trace), permutation of its MPCs that makes the MPCs falling in the same angle bin contiguous
+        (an angle bin is a set of MPCs with identical rounded AoD and AoA, i.e., with identical directivity)
+
+    angleBinFirst : Numpy array
+        True for the first MPC of every angle bin (in the angleBinOrder order)
+
+    nbAngleBins : Numpy array
+        Number of angle bins of every (pair, trace)
+
+    traceRuns : Numpy array
+        For every (pair, trace), the first trace of the run of consecutive traces with identical MPCs containing it
+        (the trace itself if its MPCs differ from the ones of the previous trace)
+
+    mergeAngleBins : Bool
+        Sum the MPCs of each angle bin before the SLS (see precomputeTxValues)
+
+    effectiveChannels : OrderedDict
+        LRU cache of the effective channels (small-scale fading weighted by the Rx quasi-omni directivity) of the
+        (pair, trace) recently used by the SLS
+
+    effectiveChannelsContext : Tuple
+        The transmission parameters and codebooks used to compute the cached effective channels
+
+    reciprocity : Bool
+        Only one direction of every pair of nodes is stored - The MPCs of the reverse link are obtained by swapping
+        the angles of departure and arrival
     """
-    DicNbMultipathTxRx = {}
-    DicDelayTxRx = {}
-    DicPathLossTxRx = {}
-    DicPhaseTxRx = {}
-    DicAodElevationTxRx = {}
-    DicAodAzimuthTxRx = {}
-    DicAoaElevationTxRx = {}
-    DicAoaAzimuthTxRx = {}
+    mpcAttributes = ['delay', 'pathLoss', 'phase', 'aodElevation', 'aodAzimuth', 'aoaElevation', 'aoaAzimuth']
+    # Arrays describing the layout of the MPCs in the attributes arrays
+    indexArrays = ['pairIds', 'pairKeys', 'mpcStart', 'nbMpcs', 'aodAngleIndex', 'aoaAngleIndex', 'angleBinOrder',
+                   'angleBinFirst', 'nbAngleBins', 'traceRuns']
+    # Version of the on-disk format written by save() - Must be increased each time the format changes
+    cacheFormatVersion = 5
+    cacheIndexFile = "QdIndex.json"
+    # MPC attributes that are angles (in degrees) and that can be stored as rounded integers
+    angleAttributes = ['aodElevation', 'aodAzimuth', 'aoaElevation', 'aoaAzimuth']
+    # MPC attributes that cannot be stored as float16: the delays (1e-8 to 1e-7 s) are below the float16 normal range
+    # and the resolution of the path loss (about 0.06 dB at 100 dB) would change the received power
+    float16ExcludedAttributes = ['delay', 'pathLoss']
+    # Precision used to store each MPC attribute (int16 stands for angles rounded to the degree as done
+    # for the directivity indices)
+    precisionPolicies = {
+        'double': dict.fromkeys(mpcAttributes, 'float64'),
+        'single': dict.fromkeys(mpcAttributes, 'float32'),
+        'compact': dict(dict.fromkeys(mpcAttributes, 'float32'), **dict.fromkeys(angleAttributes, 'int16'))}
+
+    def __init__(self):
+        self.nbTraces = 0
+        self.pairIds = np.full((0, 0, 0, 0), -1, dtype=np.int32)
+        self.pairKeys = np.empty((0, 4), dtype=np.int32)
+        self.mpcStart = np.empty((0, 0), dtype=np.int64)
+        self.nbMpcs = np.empty((0, 0), dtype=np.int32)
+        for attribute in QdProperties.mpcAttributes:
+            setattr(self, attribute, np.empty(0))
+        self.aodAngleIndex = np.empty(0, dtype=np.int32)
+        self.aoaAngleIndex = np.empty(0, dtype=np.int32)
+        self.angleBinOrder = np.empty(0, dtype=np.int32)
+        self.angleBinFirst = np.empty(0, dtype=bool)
+        self.nbAngleBins = np.empty((0, 0), dtype=np.int32)
+        self.traceRuns = np.empty((0, 0), dtype=np.int32)
+        self.mergeAngleBins = False
+        self.reciprocity = False
+        # Effective channels of the (pair, trace) recently used by the SLS (see qdPropagationLoss.getEffectiveChannel)
+        self.effectiveChannels = collections.OrderedDict()
+        self.effectiveChannelsContext = None
+        # Chunks accumulated while the Q-D file is parsed (see addPair and finalize)
+        self.pendingPairs = []
+
+    def addPair(self, pairKey, nbMpcsPerTrace, attributes):
+        """Add the MPCs of all the traces of a (TX, RX, PAA_TX, PAA_RX) pair
+
+        Parameters
+        ----------
+        pairKey : Tuple
+            ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+        nbMpcsPerTrace : Numpy array
+            Number of MPCs for each trace
+
+        attributes : List of Numpy array
+            The MPCs attributes of all the traces concatenated (same order as mpcAttributes)
+        """
+        self.pendingPairs.append((pairKey, nbMpcsPerTrace, attributes))
+
+    def finalize(self):
+        """Build the contiguous attributes arrays and the offsets table from the pairs added
+        """
+        if not self.pendingPairs:
+            return
+        pairKeys = np.asarray([pair[0] for pair in self.pendingPairs], dtype=np.int32)
+        self.nbTraces = max(len(pair[1]) for pair in self.pendingPairs)
+        nbPairs = len(self.pendingPairs)
+        self.pairKeys = pairKeys
+        self.pairIds = np.full(tuple(pairKeys.max(axis=0) + 1), -1, dtype=np.int32)
+        self.pairIds[tuple(pairKeys.T)] = np.arange(nbPairs, dtype=np.int32)
+        self.nbMpcs = np.zeros((nbPairs, self.nbTraces), dtype=np.int32)
+        for pairId, pair in enumerate(self.pendingPairs):
+            self.nbMpcs[pairId, :len(pair[1])] = pair[1]
+        # The MPCs are added pair after pair, trace after trace
+        self.mpcStart = np.zeros((nbPairs, self.nbTraces), dtype=np.int64)
+        self.mpcStart.ravel()[1:] = np.cumsum(self.nbMpcs.ravel(), dtype=np.int64)[:-1]
+        for attributeId, attribute in enumerate(QdProperties.mpcAttributes):
+            setattr(self, attribute, np.concatenate([pair[2][attributeId] for pair in self.pendingPairs]))
+        self.pendingPairs = []
+        fingerprints = self.computeFingerprints()
+        self.deduplicateBlocks(fingerprints)
+        self.computeAngleBins()
+        self.computeTraceRuns(fingerprints)
+
+    @staticmethod
+    def mixHashes(hashes):
+        """Mix the bits of 64-bit hashes (SplitMix64 finalizer)
+
+        Parameters
+        ----------
+        hashes : Numpy array
+            The hashes (uint64)
+
+        Returns
+        -------
+        mixedHashes : Numpy array
+            The mixed hashes
+        """
+        hashes = hashes ^ (hashes >> np.uint64(30))
+        hashes = hashes * np.uint64(0xbf58476d1ce4e5b9)
+        hashes = hashes ^ (hashes >> np.uint64(27))
+        hashes = hashes * np.uint64(0x94d049bb133111eb)
+        return hashes ^ (hashes >> np.uint64(31))
+
+    def computeFingerprints(self):
+        """Identify the MPCs of every (pair, trace)
+
+        The MPCs of the (pair, trace) must be contiguous and in the order of the (pair, trace) (see finalize).
+
+        Returns
+        -------
+        fingerprints : Numpy array
+            The identifier of the MPCs of every (pair, trace) (the same for the (pair, trace) with identical MPCs)
+        """
+        # The bits of the attributes are compared so that the MPCs are identical only if their bytes are identical
+        attributesBits = []
+        for attribute in QdProperties.mpcAttributes:
+            values = getattr(self, attribute)
+            attributesBits.append(values.view(np.dtype('u' + str(values.dtype.itemsize))))
+        fingerprints = QdProperties.fingerprintBlocks(attributesBits, self.nbMpcs.ravel().astype(np.int64),
+                                                      self.mpcStart.ravel())
+        return fingerprints.reshape(self.nbMpcs.shape)
+
+    @staticmethod
+    def fingerprintBlocks(attributesBits, nbMpcs, mpcStart):
+        """Identify the content of contiguous blocks of MPCs
+
+        The blocks are first grouped by a 64-bit hash of their number of MPCs and of the attributes of their MPCs,
+        computed for all the MPCs at once. The MPCs of every block are then compared to the ones of the first block of
+        its group. Only the blocks differing from it (hash collisions) are identified by the BLAKE2b digest of their
+        attributes.
+
+        Parameters
+        ----------
+        attributesBits : list
+            The bits of every attribute of the MPCs (unsigned integer arrays, one value per MPC)
+
+        nbMpcs : Numpy array
+            The number of MPCs of every block (int64)
+
+        mpcStart : Numpy array
+            The index of the first MPC of every block (int64)
+
+        Returns
+        -------
+        fingerprints : Numpy array
+            The identifier of every block (the same for the blocks with identical MPCs)
+        """
+        nonEmpty = np.flatnonzero(nbMpcs)
+        # Hash of every MPC, depending on its position in its block
+        mpcPositions = np.arange(int(nbMpcs.sum()), dtype=np.int64) - np.repeat(mpcStart[nonEmpty],
+                                                                                nbMpcs[nonEmpty])
+        mpcHashes = mpcPositions.view(np.uint64)
+        for bits in attributesBits:
+            mpcHashes = (mpcHashes ^ bits) * np.uint64(0x9e3779b97f4a7c15)
+        mpcHashes = QdProperties.mixHashes(mpcHashes)
+        blockHashes = np.zeros(len(nbMpcs), dtype=np.uint64)
+        if len(nonEmpty):
+            blockHashes[nonEmpty] = np.add.reduceat(mpcHashes, mpcStart[nonEmpty])
+        blockHashes = QdProperties.mixHashes(blockHashes ^ nbMpcs.view(np.uint64))
+        _, firstBlocks, groupIds = np.unique(blockHashes, return_index=True, return_inverse=True)
+        # Compare the MPCs of every block to the ones of the first block of its group
+        candidates = np.flatnonzero(firstBlocks[groupIds] != np.arange(len(nbMpcs)))
+        sameSize = nbMpcs[candidates] == nbMpcs[firstBlocks[groupIds[candidates]]]
+        sizeCollisions = candidates[~sameSize]
+        candidates = candidates[sameSize]
+        candidatesNbMpcs = nbMpcs[candidates]
+        candidatesOffsets = np.arange(int(candidatesNbMpcs.sum()), dtype=np.int64) - np.repeat(
+            np.cumsum(candidatesNbMpcs) - candidatesNbMpcs, candidatesNbMpcs)
+        candidatesMpcs = np.repeat(mpcStart[candidates], candidatesNbMpcs) + candidatesOffsets
+        referenceMpcs = np.repeat(mpcStart[firstBlocks[groupIds[candidates]]], candidatesNbMpcs) + candidatesOffsets
+        mpcDiffers = np.zeros(len(candidatesMpcs), dtype=bool)
+        for bits in attributesBits:
+            mpcDiffers |= bits[candidatesMpcs] != bits[referenceMpcs]
+        collisions = np.concatenate([sizeCollisions, candidates[np.bincount(
+            np.repeat(np.arange(len(candidates)), candidatesNbMpcs), weights=mpcDiffers,
+            minlength=len(candidates)) > 0]])
+        fingerprints = groupIds.astype(np.int64).ravel()
+        if len(collisions):
+            # The hashes are identical but not the MPCs - Identify these blocks by their digest
+            digests = []
+            for blockId in collisions:
+                start = mpcStart[blockId]
+                stop = start + nbMpcs[blockId]
+                digest = hashlib.blake2b(digest_size=16)
+                digest.update(nbMpcs[blockId].tobytes())
+                for values in attributesBits:
+                    digest.update(values[start:stop].tobytes())
+                digests.append(digest.digest())
+            collisionIds = np.unique(np.rec.fromarrays([groupIds[collisions], np.asarray(digests, dtype='S16')]),
+                                     return_inverse=True)[1]
+            fingerprints[collisions] = len(firstBlocks) + collisionIds.ravel()
+        return fingerprints
+
+    def deduplicateBlocks(self, fingerprints):
+        """Store the MPCs of the (pair, trace) with the same fingerprint only once
+
+        The unique blocks of MPCs are kept in the order of their first occurrence, and the offsets table of every
+        (pair, trace) points to its block.
+
+        Parameters
+        ----------
+        fingerprints : Numpy array
+            The identifier of the MPCs of every (pair, trace) (see computeFingerprints)
+        """
+        _, firstIds, blockIds = np.unique(fingerprints.ravel(), return_index=True, return_inverse=True)
+        if len(firstIds) == fingerprints.size:
+            # Every (pair, trace) is unique
+            return
+        storedIds = np.sort(firstIds)
+        nbMpcsStored = self.nbMpcs.ravel()[storedIds].astype(np.int64)
+        blockStarts = np.cumsum(nbMpcsStored) - nbMpcsStored
+        mpcIds = np.repeat(self.mpcStart.ravel()[storedIds] - blockStarts, nbMpcsStored) + np.arange(
+            nbMpcsStored.sum())
+        for attribute in QdProperties.mpcAttributes:
+            setattr(self, attribute, getattr(self, attribute)[mpcIds])
+        # Position of every unique block in the order of the first occurrences
+        blockRanks = np.empty(len(firstIds), dtype=np.int64)
+        blockRanks[np.argsort(firstIds)] = np.arange(len(firstIds))
+        self.mpcStart = blockStarts[blockRanks[blockIds.ravel()]].reshape(self.nbMpcs.shape)
+
+    def computeAngleBins(self):
+        """Compute the directivity indices of the MPCs and group the MPCs of every (pair, trace) by angle bin
+
+        The angles are rounded to the degree as the directivity granularity is 1 degree. Negative angles wrap
+        around the same way as when they are used to index the directivity.
+        """
+        nbMpcsTotal = len(self.delay)
+        # Blocks of MPCs - Each unique block is stored once and the blocks are contiguous
+        nonEmpty = np.flatnonzero(self.nbMpcs.ravel() > 0)
+        blockStarts, blockEntries = np.unique(self.mpcStart.ravel()[nonEmpty], return_index=True)
+        # Block of every MPC
+        mpcGroup = np.repeat(np.arange(len(blockStarts), dtype=np.int64),
+                             self.nbMpcs.ravel()[nonEmpty[blockEntries]])
+        angleIndices = []
+        for azimuth, elevation in [(self.aodAzimuth, self.aodElevation), (self.aoaAzimuth, self.aoaElevation)]:
+            angleIndices.append(
+                np.mod(np.around(azimuth).astype(np.int64), globals.azimuthCardinality) * globals.elevationCardinality
+                + np.mod(np.around(elevation).astype(np.int64), globals.elevationCardinality))
+        self.aodAngleIndex = angleIndices[0].astype(np.int32)
+        self.aoaAngleIndex = angleIndices[1].astype(np.int32)
+        # An angle bin is a (directivity index of the AoD, directivity index of the AoA) pair
+        angleBin = angleIndices[0] * (globals.azimuthCardinality * globals.elevationCardinality) + angleIndices[1]
+        # Sort the MPCs by block and then by angle bin - The order within a bin is preserved
+        order = np.lexsort((angleBin, mpcGroup))
+        sortedGroup = mpcGroup[order]
+        sortedBin = angleBin[order]
+        self.angleBinOrder = (order - blockStarts[sortedGroup]).astype(np.int32)
+        self.angleBinFirst = np.ones(nbMpcsTotal, dtype=bool)
+        self.angleBinFirst[1:] = (sortedGroup[1:] != sortedGroup[:-1]) | (sortedBin[1:] != sortedBin[:-1])
+        nbAngleBinsPerBlock = np.bincount(sortedGroup[self.angleBinFirst], minlength=len(blockStarts))
+        self.nbAngleBins = np.zeros(self.nbMpcs.shape, dtype=np.int32)
+        self.nbAngleBins.ravel()[nonEmpty] = nbAngleBinsPerBlock[
+            np.searchsorted(blockStarts, self.mpcStart.ravel()[nonEmpty])]
+
+    def computeTraceRuns(self, fingerprints):
+        """Detect the consecutive traces of every pair whose MPCs are identical
+
+        A trace whose fingerprint is the one of the previous trace belongs to the same run, and its SLS and MIMO
+        results are the ones of the first trace of the run (e.g., static nodes or links between APs).
+
+        Parameters
+        ----------
+        fingerprints : Numpy array
+            The identifier of the MPCs of every (pair, trace) (see computeFingerprints)
+        """
+        traces = np.broadcast_to(np.arange(self.nbMpcs.shape[1], dtype=np.int32), self.nbMpcs.shape)
+        runStarts = np.ones(self.nbMpcs.shape, dtype=bool)
+        runStarts[:, 1:] = fingerprints[:, 1:] != fingerprints[:, :-1]
+        self.traceRuns = np.maximum.accumulate(np.where(runStarts, traces, 0), axis=1).astype(np.int32)
+
+    def getPairId(self, idTx, idRx, idPaaTx, idPaaRx):
+        """Get the pair identifier of a (TX, RX, PAA_TX, PAA_RX) tuple
+
+        Returns
+        -------
+        pairId : int
+            The pair identifier (-1 if no MPC exists for the tuple)
+        """
+        if idTx >= self.pairIds.shape[0] or idRx >= self.pairIds.shape[1] or idPaaTx >= self.pairIds.shape[2] \
+                or idPaaRx >= self.pairIds.shape[3]:
+            return -1
+        return self.pairIds[idTx, idRx, idPaaTx, idPaaRx]
+
+    def getStoredPair(self, idTx, idRx, idPaaTx, idPaaRx):
+        """Get the stored pair holding the MPCs of a (TX, RX, PAA_TX, PAA_RX) tuple
+
+        Returns
+        -------
+        pairId : int
+            The pair identifier (-1 if no MPC exists for the tuple)
+
+        reverseLink : Bool
+            True if the tuple is the reverse link of the stored pair (reciprocity), i.e., its angles of departure and
+            arrival are swapped
+        """
+        pairId = self.getPairId(idTx, idRx, idPaaTx, idPaaRx)
+        if pairId == -1 and self.reciprocity:
+            pairId = self.getPairId(idRx, idTx, idPaaRx, idPaaTx)
+            return pairId, pairId != -1
+        return pairId, False
+
+    def getNbMpcs(self, txRx):
+        """Get the number of MPCs for a given (TX, RX, PAA_TX, PAA_RX, trace) tuple
+        """
+        pairId = self.getStoredPair(*txRx[:4])[0]
+        if pairId == -1:
+            return 0
+        return int(self.nbMpcs[pairId, txRx[4]])
+
+    def getMpcSlice(self, txRx):
+        """Get the location of the MPCs of a given (TX, RX, PAA_TX, PAA_RX, trace) tuple in the attributes arrays
+        """
+        pairId = self.getStoredPair(*txRx[:4])[0]
+        if pairId == -1:
+            return slice(0, 0)
+        start = self.mpcStart[pairId, txRx[4]]
+        return slice(start, start + self.nbMpcs[pairId, txRx[4]])
+
+    def getAngleBins(self, txRx):
+        """Get the angle bins of the MPCs of a given (TX, RX, PAA_TX, PAA_RX, trace) tuple
+
+        Returns
+        -------
+        angleBinOrder : Numpy array
+            Order of the MPCs making the MPCs of each angle bin contiguous
+
+        angleBinStarts : Numpy array
+            Position of the first MPC of each angle bin in this order
+        """
+        mpcSlice = self.getMpcSlice(txRx)
+        return self.angleBinOrder[mpcSlice], np.flatnonzero(self.angleBinFirst[mpcSlice])
+
+    def getMpcs(self, txRx):
+        """Get all the MPCs attributes for a given (TX, RX, PAA_TX, PAA_RX, trace) tuple
+
+        Parameters
+        ----------
+        txRx : Tuple
+            ID of the transmitter, receiver, PAA transmitter, PAA receiver, and the trace Index
+
+        Returns
+        -------
+        nbMpcs : int
+            Number of MPCs
+        delay, pathLoss, phase, aodElevation, aodAzimuth, aoaElevation, aoaAzimuth : Numpy array
+            Views on the MPCs attributes
+        """
+        mpcSlice = self.getMpcSlice(txRx)
+        if self.getStoredPair(*txRx[:4])[1]:
+            # Reverse link - The angles of departure and arrival are swapped
+            return (mpcSlice.stop - mpcSlice.start, self.delay[mpcSlice], self.pathLoss[mpcSlice],
+                    self.phase[mpcSlice], self.aoaElevation[mpcSlice], self.aoaAzimuth[mpcSlice],
+                    self.aodElevation[mpcSlice], self.aodAzimuth[mpcSlice])
+        return (mpcSlice.stop - mpcSlice.start, self.delay[mpcSlice], self.pathLoss[mpcSlice],
+                self.phase[mpcSlice], self.aodElevation[mpcSlice], self.aodAzimuth[mpcSlice],
+                self.aoaElevation[mpcSlice], self.aoaAzimuth[mpcSlice])
+
+    def getPairMpcSlice(self, pairKey, traceStart, traceStop):
+        """Get the location of the MPCs of a range of traces of a (TX, RX, PAA_TX, PAA_RX) pair in the attributes arrays
+
+        The MPCs of the range [traceStart, traceStop) are contiguous unless some traces share the MPCs of another
+        (pair, trace).
+
+        Returns
+        -------
+        nbMpcsPerTrace : Numpy array
+            Number of MPCs for each trace of the range
+
+        mpcSlice : slice or Numpy array
+            Location of the MPCs of the range (a slice if they are contiguous, their indices otherwise)
+        """
+        pairId = self.getStoredPair(*pairKey)[0]
+        if pairId == -1 or traceStop <= traceStart:
+            return np.zeros(max(traceStop - traceStart, 0), dtype=np.int32), slice(0, 0)
+        nbMpcsPerTrace = np.asarray(self.nbMpcs[pairId, traceStart:traceStop])
+        mpcStart = np.asarray(self.mpcStart[pairId, traceStart:traceStop])
+        # The location of the traces without MPC does not matter
+        blockStarts = mpcStart[nbMpcsPerTrace > 0]
+        blockSizes = nbMpcsPerTrace[nbMpcsPerTrace > 0]
+        if np.array_equal(blockStarts[1:], blockStarts[:-1] + blockSizes[:-1]):
+            start = int(blockStarts[0]) if len(blockStarts) > 0 else 0
+            return nbMpcsPerTrace, slice(start, start + int(nbMpcsPerTrace.sum()))
+        mpcOffsets = np.cumsum(nbMpcsPerTrace) - nbMpcsPerTrace
+        return nbMpcsPerTrace, np.repeat(mpcStart - mpcOffsets, nbMpcsPerTrace) + np.arange(nbMpcsPerTrace.sum())
+
+    def getTraceRun(self, txRx):
+        """Get the first trace of the run of identical traces containing a (TX, RX, PAA_TX, PAA_RX, trace)
+
+        Returns
+        -------
+        traceIndex : int
+            The first trace with the same MPCs (the trace itself if its MPCs changed or if the pair has no MPC)
+        """
+        pairId = self.getStoredPair(*txRx[:4])[0]
+        if pairId == -1 or txRx[4] >= self.traceRuns.shape[1]:
+            return int(txRx[4])
+        return int(self.traceRuns[pairId, txRx[4]])
+
+    def getPairTraceRuns(self, pairKey, traceStart, traceStop):
+        """Get the runs of identical traces for a range of traces of a (TX, RX, PAA_TX, PAA_RX) pair
+
+        Returns
+        -------
+        runTraces : Numpy array
+            For each trace of the range, the position in the range of the first trace with the same MPCs
+        """
+        pairId = self.getStoredPair(*pairKey)[0]
+        if pairId == -1 or traceStop <= traceStart:
+            return np.arange(max(traceStop - traceStart, 0))
+        # A run starting before the range starts with the range
+        return np.maximum(np.asarray(self.traceRuns[pairId, traceStart:traceStop]), traceStart) - traceStart
+
+    def isTraceRepeated(self, nodeIds, traceIndex):
+        """Check if the MPCs between a set of nodes are identical to the ones of the previous trace
+
+        Parameters
+        ----------
+        nodeIds : List of int
+            The nodes IDs
+
+        traceIndex : int
+            The trace index
+
+        Returns
+        -------
+        repeated : Bool
+            True if the MPCs of every pair of PAAs between the nodes are identical to the previous trace
+        """
+        if traceIndex <= 0 or traceIndex >= self.traceRuns.shape[1]:
+            return False
+        pairMask = np.isin(self.pairKeys[:, 0], nodeIds) & np.isin(self.pairKeys[:, 1], nodeIds)
+        return bool(np.all(np.asarray(self.traceRuns[pairMask, traceIndex]) != traceIndex))
+
+    def getPairMpcs(self, pairKey, traceStart, traceStop):
+        """Get all the MPCs attributes for a range of traces of a (TX, RX, PAA_TX, PAA_RX) pair
+
+        Parameters
+        ----------
+        pairKey : Tuple
+            ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+        traceStart, traceStop : int
+            The range of traces [traceStart, traceStop)
+
+        Returns
+        -------
+        nbMpcsPerTrace : Numpy array
+            Number of MPCs for each trace of the range
+        delay, pathLoss, phase, aodElevation, aodAzimuth, aoaElevation, aoaAzimuth : Numpy array
+            Views on the MPCs attributes of all the traces concatenated
+        """
+        nbMpcsPerTrace, mpcSlice = self.getPairMpcSlice(pairKey, traceStart, traceStop)
+        if self.getStoredPair(*pairKey)[1]:
+            # Reverse link - The angles of departure and arrival are swapped
+            return (nbMpcsPerTrace, self.delay[mpcSlice], self.pathLoss[mpcSlice], self.phase[mpcSlice],
+                    self.aoaElevation[mpcSlice], self.aoaAzimuth[mpcSlice], self.aodElevation[mpcSlice],
+                    self.aodAzimuth[mpcSlice])
+        return (nbMpcsPerTrace, self.delay[mpcSlice], self.pathLoss[mpcSlice], self.phase[mpcSlice],
+                self.aodElevation[mpcSlice], self.aodAzimuth[mpcSlice], self.aoaElevation[mpcSlice],
+                self.aoaAzimuth[mpcSlice])
+
+    def getMpcAngleIndices(self, txRx):
+        """Get the directivity indices of the MPCs for a (TX, RX, PAA_TX, PAA_RX, trace)
+
+        Returns
+        -------
+        txAngleIndex, rxAngleIndex : Numpy array
+            Flat index of the angle of departure and of the angle of arrival of every MPC (see aodAngleIndex)
+        """
+        mpcSlice = self.getMpcSlice(txRx)
+        if self.getStoredPair(*txRx[:4])[1]:
+            # Reverse link - The angles of departure and arrival are swapped
+            return self.aoaAngleIndex[mpcSlice], self.aodAngleIndex[mpcSlice]
+        return self.aodAngleIndex[mpcSlice], self.aoaAngleIndex[mpcSlice]
+
+    def getPairAngleIndices(self, pairKey, traceStart, traceStop):
+        """Get the directivity indices of the MPCs for a range of traces of a (TX, RX, PAA_TX, PAA_RX) pair
+
+        Returns
+        -------
+        txAngleIndex, rxAngleIndex : Numpy array
+            Flat index of the angle of departure and of the angle of arrival of every MPC (see aodAngleIndex)
+        """
+        _, mpcSlice = self.getPairMpcSlice(pairKey, traceStart, traceStop)
+        if self.getStoredPair(*pairKey)[1]:
+            # Reverse link - The angles of departure and arrival are swapped
+            return self.aoaAngleIndex[mpcSlice], self.aodAngleIndex[mpcSlice]
+        return self.aodAngleIndex[mpcSlice], self.aoaAngleIndex[mpcSlice]
+
+    def getPairAngleBins(self, pairKey, traceStart, traceStop):
+        """Get the angle bins of the MPCs for a range of traces of a (TX, RX, PAA_TX, PAA_RX) pair
+
+        Returns
+        -------
+        angleBinOrder : Numpy array
+            Order of the MPCs (in the concatenation of the traces) making the MPCs of each angle bin contiguous
+
+        angleBinStarts : Numpy array
+            Position of the first MPC of each angle bin in this order
+
+        nbAngleBinsPerTrace : Numpy array
+            Number of angle bins for each trace of the range
+        """
+        nbMpcsPerTrace, mpcSlice = self.getPairMpcSlice(pairKey, traceStart, traceStop)
+        # The order stored is local to each trace
+        traceOffsets = np.cumsum(nbMpcsPerTrace) - nbMpcsPerTrace
+        angleBinOrder = self.angleBinOrder[mpcSlice] + np.repeat(traceOffsets, nbMpcsPerTrace)
+        angleBinStarts = np.flatnonzero(self.angleBinFirst[mpcSlice])
+        pairId = self.getStoredPair(*pairKey)[0]
+        if pairId == -1 or traceStop <= traceStart:
+            nbAngleBinsPerTrace = np.zeros_like(nbMpcsPerTrace)
+        else:
+            nbAngleBinsPerTrace = np.asarray(self.nbAngleBins[pairId, traceStart:traceStop])
+        return angleBinOrder, angleBinStarts, nbAngleBinsPerTrace
+
+    @staticmethod
+    def getPrecisionPolicy(precision):
+        """Get the precision of each MPC attribute from a precision description
+
+        Parameters
+        ----------
+        precision : List of string
+            A policy name ('double', 'single', or 'compact') optionally followed by attribute=dtype overrides,
+            e.g., ['single', 'delay=float64']
+
+        Returns
+        -------
+        precisionPolicy : dict
+            The dtype name of each MPC attribute
+        """
+        precisionPolicy = dict(QdProperties.precisionPolicies['double'])
+        for field in precision:
+            if field in QdProperties.precisionPolicies:
+                precisionPolicy.update(QdProperties.precisionPolicies[field])
+                continue
+            attribute, _, dtype = field.partition('=')
+            if attribute not in QdProperties.mpcAttributes:
+                raise ValueError("Unknown channel precision or MPC attribute: " + field)
+            if dtype not in ['float64', 'float32', 'float16', 'int16']:
+                raise ValueError("Unsupported precision for " + attribute + ": " + dtype)
+            if dtype == 'int16' and attribute not in QdProperties.angleAttributes:
+                raise ValueError("Only the angles can be stored as int16: " + field)
+            if dtype == 'float16' and attribute in QdProperties.float16ExcludedAttributes:
+                raise ValueError("The " + attribute + " cannot be stored as float16 without losing its precision: "
+                                 + field)
+            precisionPolicy[attribute] = dtype
+        return precisionPolicy
+
+    def withPrecision(self, precisionPolicy):
+        """Get the MPCs properties with each attribute stored with the given precision
+
+        Parameters
+        ----------
+        precisionPolicy : dict
+            The dtype name of each MPC attribute (see getPrecisionPolicy)
+
+        Returns
+        -------
+        qdProperties : QdProperties
+            The MPCs properties (the arrays already stored with the right precision are shared)
+        """
+        reducedProperties = QdProperties()
+        reducedProperties.nbTraces = self.nbTraces
+        reducedProperties.mergeAngleBins = self.mergeAngleBins
+        reducedProperties.reciprocity = self.reciprocity
+        for array in QdProperties.indexArrays:
+            setattr(reducedProperties, array, getattr(self, array))
+        for attribute in QdProperties.mpcAttributes:
+            values = getattr(self, attribute)
+            dtype = np.dtype(precisionPolicy.get(attribute, 'float64'))
+            if values.dtype != dtype:
+                if np.issubdtype(dtype, np.integer) and not np.issubdtype(values.dtype, np.integer):
+                    # Angles are rounded the same way as for the directivity indices
+                    values = np.around(values)
+                values = values.astype(dtype)
+            setattr(reducedProperties, attribute, values)
+        if any(getattr(self, attribute).dtype != getattr(reducedProperties, attribute).dtype
+               for attribute in QdProperties.angleAttributes):
+            # The rounding of the angles stored with a reduced precision might differ
+            reducedProperties.computeAngleBins()
+        return reducedProperties
+
+    def getMemorySize(self):
+        """Get the number of bytes used to store the MPCs properties
+        """
+        return sum(getattr(self, array).nbytes for array in QdProperties.indexArrays + QdProperties.mpcAttributes)
+
+    def select(self, channelSelection):
+        """Extract the MPCs of a traces window and of a subset of nodes
+
+        Parameters
+        ----------
+        channelSelection : ChannelSelection class
+            The traces and nodes to extract
+
+        Returns
+        -------
+        qdProperties : QdProperties
+            The MPCs properties of the selection (loaded in memory)
+        """
+        selectedProperties = QdProperties()
+        traces = np.arange(self.nbTraces)[channelSelection.getTraceSlice()]
+        for pairId, pairKey in enumerate(self.pairKeys):
+            if not channelSelection.containsPair(pairKey[0], pairKey[1]):
+                continue
+            nbMpcsPerTrace = np.asarray(self.nbMpcs[pairId, traces])
+            # Index of every MPC of the selected traces in the attributes arrays
+            mpcOffsets = np.cumsum(nbMpcsPerTrace) - nbMpcsPerTrace
+            mpcIds = np.repeat(self.mpcStart[pairId, traces] - mpcOffsets, nbMpcsPerTrace) + np.arange(
+                nbMpcsPerTrace.sum())
+            selectedProperties.addPair(tuple(int(pairId) for pairId in pairKey), nbMpcsPerTrace,
+                                       [np.asarray(getattr(self, attribute)[mpcIds])
+                                        for attribute in QdProperties.mpcAttributes])
+        selectedProperties.finalize()
+        selectedProperties.mergeAngleBins = self.mergeAngleBins
+        selectedProperties.reciprocity = self.reciprocity
+        return selectedProperties
+
+    def save(self, folder):
+        """Save the MPCs properties as flat .npy arrays plus an index file
+
+        The index file is written last so that an interrupted save is never considered as a valid cache.
+
+        Parameters
+        ----------
+        folder : string
+            Folder where to save the arrays
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        indexFile = os.path.join(folder, QdProperties.cacheIndexFile)
+        if os.path.exists(indexFile):
+            os.remove(indexFile)
+        arrays = {}
+        for array in QdProperties.indexArrays + QdProperties.mpcAttributes:
+            arrayFile = array + ".npy"
+            np.save(os.path.join(folder, arrayFile), getattr(self, array))
+            arrays[array] = arrayFile
+        index = {'version': QdProperties.cacheFormatVersion, 'nbTraces': int(self.nbTraces),
+                 'reciprocity': bool(self.reciprocity), 'arrays': arrays}
+        with open(indexFile, "w") as f:
+            json.dump(index, f)
+
+    @staticmethod
+    def load(folder, mmapMode='r'):
+        """Load the MPCs properties saved with save()
+
+        The arrays are memory-mapped: only the pages accessed are read from the disk and the page cache
+        is shared between the processes using the same cache.
+
+        Parameters
+        ----------
+        folder : string
+            Folder containing the arrays
+
+        mmapMode : string
+            Memory-map mode passed to np.load (None to load the arrays in memory)
+
+        Returns
+        -------
+        qdProperties : QdProperties
+            The MPCs properties (None if the cache does not exist or has not the expected format version)
+        """
+        indexFile = os.path.join(folder, QdProperties.cacheIndexFile)
+        if not os.path.exists(indexFile):
+            return None
+        try:
+            with open(indexFile) as f:
+                index = json.load(f)
+        except ValueError:
+            return None
+        if index.get('version') != QdProperties.cacheFormatVersion:
+            return None
+        qdProperties = QdProperties()
+        qdProperties.nbTraces = index['nbTraces']
+        qdProperties.reciprocity = index.get('reciprocity', False)
+        for array in QdProperties.indexArrays + QdProperties.mpcAttributes:
+            arrayFile = os.path.join(folder, index['arrays'].get(array, ""))
+            if not os.path.isfile(arrayFile):
+                return None
+            setattr(qdProperties, array, np.load(arrayFile, mmap_mode=mmapMode))
+        return qdProperties
 
 
 class QdScenario:
@@ -105,6 +919,7 @@ class QdScenario:
         self.preprocessedAssociationData = None
         self.dataIndex = None
         self.qdProperties = None
+        self.channelSelection = None
 
     def getTxSectorAnalogBT(self, traceIndex):
         """
@@ -551,7 +1366,7 @@ def readQdConfiguration(qdRealizationInputFolder, qdConfigurationFile):
         exit()
 
 
-def readJSONNodesPositionFile(visualizerFolder, nodesPositionsJSON,qdScenario):
+def readJSONNodesPositionFile(visualizerFolder, nodesPositionsJSON,qdScenario, channelSelection=None):
     """Read the JSON file containing the Nodes Positions and rotations parameters
 
     Parameters
@@ -564,6 +1379,10 @@ def readJSONNodesPositionFile(visualizerFolder, nodesPositionsJSON,qdScenario):
 
     qdScenario: QdScenario class
         Scenario parameters (number of nodes, APs, STAs, trace numbers, etc.)
+
+    channelSelection : ChannelSelection class
+        The traces to load (None to load all the traces)
+        The positions of all the nodes are always loaded as they are needed to display the scenario
     """
 
     fileName = os.path.join(visualizerFolder, nodesPositionsJSON)
@@ -573,11 +1392,12 @@ def readJSONNodesPositionFile(visualizerFolder, nodesPositionsJSON,qdScenario):
         data = [json.loads(line) for line in open(fileName, 'r')]
         nodesPositions = []
         nodesRotations = []  # Represent the node rotation
+        traceSlice = slice(None) if channelSelection is None else channelSelection.getTraceSlice()
 
         for position in data:
             # Read all Position and Rotation information
-            nodesPositions.append(np.asarray(position['Position']))
-            nodesRotations.append(np.asarray(position['Rotation']))
+            nodesPositions.append(np.asarray(position['Position'][traceSlice]))
+            nodesRotations.append(np.asarray(position['Rotation'][traceSlice]))
 
         # Arrange the position the way they are expected in Mayavi
         # i.e, instead of having a [nbNodes,nbTraces,coordinates] array
@@ -1006,8 +1826,52 @@ def readDoppler(visualizerFolder,dopplerAxisFile,dopplerRangeFile):
     sensingResults = SensingResults(True, slowTime, fastTime, velocity, dopplerRange)
 
 
-def readJSONMPCFile(visualizerFolder, mcpJSON):
-    """Read the JSON file containing the MPCs coordinates
+# Layout of the MPCs file index: one row per (TX, PAA_TX, RX, PAA_RX, Rorder) key with the location of its line
+MPC_INDEX_COLUMNS = ['TX', 'PAA_TX', 'RX', 'PAA_RX', 'Rorder', 'offset', 'length']
+mpcIndexFormatVersion = 1
+# The key fields are always written first by the Q-D realization software - Parse them without decoding the MPCs
+MPC_KEY_PATTERN = re.compile(rb'\{\s*"TX"\s*:\s*(\d+)\s*,\s*"PAA_TX"\s*:\s*(\d+)\s*,\s*"RX"\s*:\s*(\d+)\s*,'
+                             rb'\s*"PAA_RX"\s*:\s*(\d+)\s*,\s*"Rorder"\s*:\s*(\d+)')
+# Size of the beginning of a line used to parse the key fields
+mpcKeyHeaderSize = 256
+
+
+def indexJSONMPCFile(fileName):
+    """Build the index of the lines of the JSON MPCs file
+
+    Parameters
+    ----------
+    fileName : string
+        Path of the JSON MPCs file
+
+    Returns
+    -------
+    mpcIndex : Numpy array
+        The (TX, PAA_TX, RX, PAA_RX, Rorder, offset, length) of every line (see MPC_INDEX_COLUMNS)
+    """
+    mpcIndex = []
+    offset = 0
+    with open(fileName, "rb") as f:
+        for line in f:
+            if line.strip():
+                keyFields = MPC_KEY_PATTERN.match(line, 0, mpcKeyHeaderSize)
+                if keyFields is not None:
+                    key = [int(field) for field in keyFields.groups()]
+                else:
+                    # The fields are not in the expected order - Decode the whole line
+                    data = json.loads(line)
+                    key = [int(data[field]) for field in MPC_INDEX_COLUMNS[:5]]
+                mpcIndex.append(key + [offset, len(line)])
+            offset += len(line)
+    return np.asarray(mpcIndex, dtype=np.int64).reshape(-1, len(MPC_INDEX_COLUMNS))
+
+
+def readJSONMPCFile(visualizerFolder, mcpJSON, cacheFolder, channelSelection=None, cacheValidation='mtime'):
+    """Index the JSON file containing the MPCs coordinates
+
+    The MPCs coordinates are not decoded here. The location of each (TX, PAA_TX, RX, PAA_RX, Rorder) line is
+    indexed once (the index is cached in the cache folder of the Q-D channel) and the coordinates are decoded on
+    demand by getMpcCoordinates.
 
     Parameters
     ----------
@@ -1016,26 +1880,339 @@ def readJSONMPCFile(visualizerFolder, mcpJSON):
 
     mcpJSON : string
         Name of the file to read
+
+    cacheFolder : string
+        Folder where the index is cached (see getCachedQdFolder)
+
+    channelSelection : ChannelSelection class
+        The traces and nodes to load (None to load all the MPCs)
+
+    cacheValidation : string
+        How the cached index is validated against the MPCs file ('mtime' or 'hash')
     """
     fileName = os.path.join(visualizerFolder, mcpJSON)
     globals.logger.info("Read JSON MPCs Files:" + fileName)
-    global MPC_DIC
-    MPC_DIC = {}
-    with open(fileName) as f:
-        for line in f:
-            from json.decoder import JSONDecodeError
-            try:
-                data = json.loads(line)
-                MPC_DIC[
-                    (data['TX'], data['PAA_TX'], data['RX'], data['PAA_RX'], data['Rorder']
-                     )] = np.asarray(data['MPC'],dtype=np.float)
-            except JSONDecodeError as e:
-                globals.logger.critical("Error: " + e + " Impossible to decode MPCs file - Exit")
-                exit()
+    global MPC_FILE, MPC_INDEX, MPC_TRACE_SLICE, MPC_CACHE
+    if not os.path.exists(cacheFolder):
+        os.makedirs(cacheFolder)
+    indexFile = os.path.join(cacheFolder, "MpcIndex.npy")
+    indexParameters = {'formatVersion': mpcIndexFormatVersion}
+    if cacheManifest.isArtifactValid(indexFile, [fileName], indexParameters, cacheValidation):
+        mpcIndex = np.load(indexFile)
+    else:
+        try:
+            mpcIndex = indexJSONMPCFile(fileName)
+        except JSONDecodeError as e:
+            globals.logger.critical("Error: " + str(e) + " Impossible to decode MPCs file - Exit")
+            exit()
+        np.save(indexFile, mpcIndex)
+        cacheManifest.writeManifest(indexFile, [fileName], indexParameters, cacheValidation)
+    MPC_FILE = fileName
+    MPC_INDEX = {}
+    for key in mpcIndex:
+        if channelSelection is not None and not channelSelection.containsPair(key[0], key[2]):
+            continue
+        MPC_INDEX[tuple(int(field) for field in key[:5])] = (int(key[5]), int(key[6]))
+    MPC_TRACE_SLICE = slice(None) if channelSelection is None else channelSelection.getTraceSlice()
+    MPC_CACHE = collections.OrderedDict()
+
+
+def loadMpcGeometry(key):
+    """Get the MPCs coordinates of all the traces for a given (TX, PAA_TX, RX, PAA_RX, Rorder) key
+
+    The coordinates are decoded from the MPCs file on the first access and kept in a bounded LRU cache.
+    The traces with identical coordinates (e.g., static nodes) share the same block of coordinates.
+
+    Parameters
+    ----------
+    key : Tuple
+        Identifier of the transmitter, transmitter PAA, receiver, receiver PAA, and reflection order
+
+    Returns
+    -------
+    mpcBlocks : Numpy array
+        The unique MPCs coordinates blocks
+
+    traceBlocks : Numpy array
+        The block of each trace selected
+    """
+    if key in MPC_CACHE:
+        MPC_CACHE.move_to_end(key)
+        return MPC_CACHE[key]
+    offset, length = MPC_INDEX[key]
+    with open(MPC_FILE, "rb") as f:
+        f.seek(offset)
+        data = json.loads(f.read(length))
+    mpcGeometry = deduplicateTraceBlocks(np.asarray(data['MPC'][MPC_TRACE_SLICE], dtype=np.float64))
+    MPC_CACHE[key] = mpcGeometry
+    if len(MPC_CACHE) > globals.mpcCacheSize:
+        # Evict the least recently used geometry
+        MPC_CACHE.popitem(last=False)
+    return mpcGeometry
+
+
+def deduplicateTraceBlocks(traceValues):
+    """Store the values of the traces with identical content only once
+
+    The traces are identified with the fingerprints used for the MPCs of the Q-D channel (see
+    QdProperties.fingerprintBlocks), every trace being a block.
+
+    Parameters
+    ----------
+    traceValues : Numpy array
+        The values of every trace (first axis)
+
+    Returns
+    -------
+    blocks : Numpy array
+        The unique values, in the order of their first occurrence
+
+    traceBlocks : Numpy array
+        The block of each trace
+    """
+    nbTraces = len(traceValues)
+    nbValues = int(np.prod(traceValues.shape[1:]))
+    valuesBits = np.ascontiguousarray(traceValues).reshape(nbTraces * nbValues).view(
+        np.dtype('u' + str(traceValues.dtype.itemsize)))
+    fingerprints = QdProperties.fingerprintBlocks([valuesBits], np.full(nbTraces, nbValues, dtype=np.int64),
+                                                  np.arange(nbTraces, dtype=np.int64) * nbValues)
+    _, firstTraces, traceBlocks = np.unique(fingerprints, return_index=True, return_inverse=True)
+    # Number the blocks in the order of their first occurrence
+    blockOrder = np.argsort(firstTraces, kind='stable')
+    blockRanks = np.empty(len(blockOrder), dtype=np.int32)
+    blockRanks[blockOrder] = np.arange(len(blockOrder), dtype=np.int32)
+    return traceValues[firstTraces[blockOrder]], blockRanks[traceBlocks.ravel()]
+
+
+# Name of the JSON fields of the Q-D file for each MPC attribute (same order as QdProperties.mpcAttributes)
+QD_JSON_FIELDS = ['Delay', 'Gain', 'Phase', 'AODEL', 'AODAZ', 'AOAEL', 'AOAAZ']
+# Pattern of the beginning of a line of the Q-D file (used to skip a line without decoding it)
+QD_KEY_PATTERN = re.compile(r'\{\s*"TX"\s*:\s*(\d+)\s*,\s*"RX"\s*:\s*(\d+)')
+
+
+def parseQdJsonLine(line, channelSelection=None, reciprocity=False):
+    """Parse one line of the Q-D JSON file, i.e., the MPCs of all the traces of a (TX, RX, PAA_TX, PAA_RX) pair
+
+    Parameters
+    ----------
+    line : string or bytes
+        The JSON object of the pair
+
+    channelSelection : ChannelSelection class
+        The traces and nodes to keep (None to keep everything)
+
+    reciprocity : Bool
+        Keep only the pairs whose transmitter ID is lower than the receiver ID (the reverse links are obtained
+        by reciprocity)
+
+    Returns
+    -------
+    idTxidRxIdPaaTxPaaRx : Tuple
+        ID of the transmitter, receiver, PAA transmitter and PAA receiver
+
+    nbMpcsPerTrace : Numpy array
+        Number of MPCs for each trace
+
+    attributes : List of Numpy array
+        The MPCs attributes of all the traces concatenated (same order as QdProperties.mpcAttributes)
+
+    None is returned if the pair is not selected.
+    """
+    if reciprocity:
+        header = line[:mpcKeyHeaderSize]
+        key = QD_KEY_PATTERN.match(header.decode('ascii', 'ignore') if isinstance(header, bytes) else header)
+        if key is not None and int(key.group(1)) > int(key.group(2)):
+            # Reverse link - Skip it without decoding the line
+            return None
+    data = json.loads(line)
+    idTxidRxIdPaaTxPaaRx = (int(data['TX']), int(data['RX']), int(data['PAA_TX']), int(data['PAA_RX']))
+    if reciprocity and idTxidRxIdPaaTxPaaRx[0] > idTxidRxIdPaaTxPaaRx[1]:
+        return None
+    traceSlice = slice(None)
+    if channelSelection is not None:
+        if not channelSelection.containsPair(idTxidRxIdPaaTxPaaRx[0], idTxidRxIdPaaTxPaaRx[1]):
+            return None
+        traceSlice = channelSelection.getTraceSlice()
+    delays = data['Delay'][traceSlice]
+    # The number of MPCs is needed and not contained in the JSON File
+    # Use the delay shape to get the number of MPCs per trace
+    nbMpcsPerTrace = np.fromiter(map(len, delays), dtype=np.int32, count=len(delays))
+    nbMpcsPair = int(nbMpcsPerTrace.sum())
+    # Flatten every attribute for all the traces of the pair
+    attributes = [np.fromiter(itertools.chain.from_iterable(data[field][traceSlice]), dtype=np.float64,
+                              count=nbMpcsPair) for field in QD_JSON_FIELDS]
+    return idTxidRxIdPaaTxPaaRx, nbMpcsPerTrace, attributes
+
+
+def parseQdJsonRange(fileName, start, end, channelSelection=None, reciprocity=False):
+    """Parse the lines of the Q-D JSON file located in the bytes range [start, end[
+
+    The range must be aligned on the lines boundaries (see splitQdJsonFile).
 
+    Parameters
+    ----------
+    fileName : string
+        Path of the Q-D JSON file
+
+    start : int
+        Offset of the first byte of the range
+
+    end : int
+        Offset of the byte following the range
+
+    channelSelection : ChannelSelection class
+        The traces and nodes to keep (None to keep everything)
+
+    reciprocity : Bool
+        Keep only one direction of every pair of nodes (see parseQdJsonLine)
+
+    Returns
+    -------
+    pairs : List
+        The (idTxidRxIdPaaTxPaaRx, nbMpcsPerTrace, attributes) of every selected line of the range (see parseQdJsonLine)
+    """
+    pairs = []
+    with open(fileName, "rb") as f:
+        f.seek(start)
+        for line in f.read(end - start).splitlines():
+            if line.strip():
+                pair = parseQdJsonLine(line, channelSelection, reciprocity)
+                if pair is not None:
+                    pairs.append(pair)
+    return pairs
+
+
+def parseQdJsonRangeStar(arguments):
+    """Unpack the (fileName, start, end, channelSelection, reciprocity) arguments of parseQdJsonRange (used by the processes pool)
+    """
+    return parseQdJsonRange(*arguments)
+
+
+def splitQdJsonFile(fileName, nbRanges):
+    """Split the Q-D JSON file in bytes ranges aligned on the lines boundaries
+
+    Parameters
+    ----------
+    fileName : string
+        Path of the Q-D JSON file
+
+    nbRanges : int
+        Desired number of ranges (fewer ranges are returned if the file has fewer lines)
+
+    Returns
+    -------
+    ranges : List
+        The (start, end) offsets of every range, in the file order
+    """
+    fileSize = os.path.getsize(fileName)
+    boundaries = [0]
+    with open(fileName, "rb") as f:
+        for rangeId in range(1, nbRanges):
+            offset = max(fileSize * rangeId // nbRanges, boundaries[-1])
+            if offset >= fileSize:
+                break
+            f.seek(offset)
+            # Move the boundary to the beginning of the next line
+            f.readline()
+            offset = f.tell()
+            if offset > boundaries[-1] and offset < fileSize:
+                boundaries.append(offset)
+    boundaries.append(fileSize)
+    return list(zip(boundaries[:-1], boundaries[1:]))
 
 
-def readJSONQdFile(nsFolder, qdFilesFolder, qdJSON,qdInterpreterConfig,qdNbNodes):
+def parseQdJsonFile(fileName, qdNbNodes, channelSelection=None, ingestWorkers=1, reciprocity=False):
+    """Parse the JSON file containing the Q-D realization (MPCs properties) without using the cache
+
+    Parameters
+    ----------
+    fileName : string
+        Path of the Q-D JSON file
+
+    qdNbNodes: int
+        Total number of nodes in the scenario
+
+    channelSelection : ChannelSelection class
+        The traces and nodes to load (None to load the complete channel)
+
+    ingestWorkers : int
+        Number of processes used to parse the file
+
+    reciprocity : Bool
+        Load only one direction of every pair of nodes (the reverse links are obtained by reciprocity)
+
+    Returns
+    -------
+    qdProperties : QdProperties
+        The MPCs properties (stored in double precision)
+    """
+    if channelSelection is not None and channelSelection.nodes is not None:
+        # Only the pairs of selected nodes are read
+        qdNbNodes = len(channelSelection.nodes)
+    nbNodesPermutations = globals.nPr(qdNbNodes, 2)
+    if reciprocity:
+        nbNodesPermutations = nbNodesPermutations // 2
+    permutationCount = 0
+    try:
+        # Please note that The JSON file generated by the Q-D realization software are
+        # not de-facto valid JSON files. They are files made of valid JSON objects (one per line)
+        totalTime = 0
+        currentPair = (0, 0)
+        qdproperties = QdProperties()
+
+        print("Parse JSON Q-D files - Can be time-consuming")
+        if ingestWorkers > 1:
+            # Every line is an independent pair: parse bytes ranges of the file in a pool of processes
+            # The ranges are merged in the file order so that the result is identical to the serial parsing
+            ranges = splitQdJsonFile(fileName, 4 * ingestWorkers)
+            globals.printProgressBar(0, len(ranges), 0, prefix='Progress:', suffix='Complete', length=50)
+            startProcess = time.time()
+            with multiprocessing.Pool(min(ingestWorkers, len(ranges))) as pool:
+                for rangeId, pairs in enumerate(pool.imap(parseQdJsonRangeStar,
+                                                          [(fileName,) + fileRange + (channelSelection, reciprocity)
+                                                           for fileRange in ranges])):
+                    for pair in pairs:
+                        qdproperties.addPair(*pair)
+                    averageProcessTime = (time.time() - startProcess) / (rangeId + 1)
+                    remainingTime = round(averageProcessTime * (len(ranges) - rangeId - 1))
+                    globals.printProgressBar(rangeId + 1, len(ranges), datetime.timedelta(0, remainingTime),
+                                             prefix='Progress:', suffix='Complete', length=50)
+        else:
+            globals.printProgressBar(0, nbNodesPermutations, 0, prefix='Progress:', suffix='Complete', length=50)
+            with open(fileName) as f:
+                for line in f:
+                    startProcess = time.time()
+                    if not line.strip():
+                        continue
+                    pair = parseQdJsonLine(line, channelSelection, reciprocity)
+                    if pair is None:
+                        continue
+                    idTxidRxIdPaaTxPaaRx, nbMpcsPerTrace, attributes = pair
+                    qdproperties.addPair(idTxidRxIdPaaTxPaaRx, nbMpcsPerTrace, attributes)
+
+                    if idTxidRxIdPaaTxPaaRx[:2] != currentPair:
+                        # For the progress bar, we just update the progress once we go to a new tx,rx (not taking into account the PAAs)
+                        permutationCount += 1
+                        totalTime += time.time() - startProcess
+                        averageProcessTime = totalTime / permutationCount
+                        remainingTime = round(averageProcessTime * (nbNodesPermutations - permutationCount))
+                        globals.printProgressBar(permutationCount, nbNodesPermutations,
+                                                 datetime.timedelta(0, remainingTime),
+                                                 prefix='Progress:', suffix='Complete',
+                                                 length=50)
+                        currentPair = idTxidRxIdPaaTxPaaRx[:2]
+        qdproperties.finalize()
+        qdproperties.reciprocity = reciprocity
+        return qdproperties
+    except JSONDecodeError as e:
+        globals.logger.critical("Error: " + str(e) + " Impossible to decode Q-D channel JSON file - Exit")
+        exit()
+    except FileNotFoundError:
+        globals.logger.critical("JSON MPC File: " + fileName + " does not exist - Exit")
+        exit()
+
+
+def readJSONQdFile(nsFolder, qdFilesFolder, qdJSON,qdInterpreterConfig,qdNbNodes, channelSelection=None):
     """Read the JSON file containing the Q-D realization (MPCs properties) for the channel realized
 
     Parameters
@@ -1049,180 +2226,72 @@ def readJSONQdFile(nsFolder, qdFilesFolder, qdJSON,qdInterpreterConfig,qdNbNodes
     qdJSONFile : string
         Name of the Q-D file to read
 
+    qdInterpreterConfig : QdInterpreterConfig
+        The configuration of the software (ingestWorkers is the number of processes used to parse the file and
+        channelPrecision the precision used to store the MPCs attributes)
+
     qdNbNodes: int
         Total number of nodes in the scenario
+
+    channelSelection : ChannelSelection class
+        The traces and nodes to load (None to load the complete channel)
+        A partial selection is never cached but is extracted from the cache if it exists
     """
-    nbNodesPermutations = globals.nPr(qdNbNodes, 2)
-    permutationCount = 0
+    partialSelection = channelSelection is not None and not channelSelection.isComplete()
     globals.logger.info("Read APs and STAs MPCs characteristics from the JSON Q-D file")
     fileName = os.path.join(nsFolder, qdFilesFolder, qdJSON)
-    serialize = False
-    serializedFolder = os.path.join(nsFolder, qdFilesFolder, "CachedQd")
-    if not os.path.exists(serializedFolder) or qdInterpreterConfig.regenerateCachedQdRealData:
-        # The folder to cache the data does not exist - We need to serialize and to parse the Q-D file
+    serializedFolder = getCachedQdFolder(nsFolder, qdFilesFolder)
+    cacheParameters = {'formatVersion': QdProperties.cacheFormatVersion,
+                       'precision': qdInterpreterConfig.channelPrecision,
+                       'reciprocity': qdInterpreterConfig.reciprocity}
+    if not qdInterpreterConfig.regenerateCachedQdRealData and cacheManifest.isArtifactValid(
+            serializedFolder, [fileName], cacheParameters, qdInterpreterConfig.cacheValidation):
+        # Memory-map the cached data if it was generated from the current Q-D file
+        qdproperties = QdProperties.load(serializedFolder)
+        if qdproperties is not None:
+            qdproperties.mergeAngleBins = qdInterpreterConfig.mergeAngleBins
+            if partialSelection:
+                return qdproperties.select(channelSelection)
+            return qdproperties
+    if partialSelection:
+        # Parse only the selection - The cache always contains the complete channel
+        print("Load the selected traces and nodes of the Q-D realization software Q-D MPCs output data")
+    else:
+        # The cached data does not exist, is outdated, or its regeneration is forced - We need to parse the Q-D file
         print("Cache the Q-D realization software Q-D MPCs output data")
-        serialize = True
+        channelSelection = None
+        if os.path.exists(serializedFolder):
+            cacheManifest.invalidateArtifact(serializedFolder)
 
-    if serialize == False:
-        # The serialized data already exists - Use them
-        qdproperties = QdProperties()
-        qdproperties.DicNbMultipathTxRx = pickle.load(
-            open(os.path.join(serializedFolder, "DicNbMultipathTxRx.p"), "rb"))
-        qdproperties.DicDelayTxRx = pickle.load(open(os.path.join(serializedFolder, "DicDelayTxRx.p"), "rb"))
-        qdproperties.DicPathLossTxRx = pickle.load(open(os.path.join(serializedFolder, "DicPathLossTxRx.p"), "rb"))
-        qdproperties.DicPhaseTxRx = pickle.load(open(os.path.join(serializedFolder, "DicPhaseTxRx.p"), "rb"))
-        qdproperties.DicAodElevationTxRx = pickle.load(
-            open(os.path.join(serializedFolder, "DicAodElevationTxRx.p"), "rb"))
-        qdproperties.DicAodAzimuthTxRx = pickle.load(open(os.path.join(serializedFolder, "DicAodAzimuthTxRx.p"), "rb"))
-        qdproperties.DicAoaElevationTxRx = pickle.load(
-            open(os.path.join(serializedFolder, "DicAoaElevationTxRx.p"), "rb"))
-        qdproperties.DicAoaAzimuthTxRx = pickle.load(open(os.path.join(serializedFolder, "DicAoaAzimuthTxRx.p"), "rb"))
-        return qdproperties
+    qdproperties = parseQdJsonFile(fileName, qdNbNodes, channelSelection, qdInterpreterConfig.ingestWorkers,
+                                   qdInterpreterConfig.reciprocity)
+    qdproperties = qdproperties.withPrecision(qdInterpreterConfig.channelPrecision)
+    qdproperties.mergeAngleBins = qdInterpreterConfig.mergeAngleBins
+    if not partialSelection:
+        # Serialize the data
+        qdproperties.save(serializedFolder)
+        cacheManifest.writeManifest(serializedFolder, [fileName], cacheParameters,
+                                    qdInterpreterConfig.cacheValidation)
+    return qdproperties
 
-    # The serialized data does not exist - We need to parse the Q-D files
-    try:
-        # Please note that The JSON file generated by the Q-D realization software are
-        # not de-facto valid JSON files. They are files made of valid JSON objects (one per line)
-        lineNumber = 0
-        totalTime = 0
-        currentPair = (0, 0)
-        DicNbMultipathTxRx = {}
-        DicDelayTxRx = {}
-        DicPathLossTxRx = {}
-        DicPhaseTxRx = {}
-        DicAodElevationTxRx = {}
-        DicAodAzimuthTxRx = {}
-        DicAoaElevationTxRx = {}
-        DicAoaAzimuthTxRx = {}
 
-        print("Parse JSON Q-D files - Can be time-consuming")
-        globals.printProgressBar(0, nbNodesPermutations, 0, prefix='Progress:', suffix='Complete', length=50)
-        with open(fileName) as f:
-            for line in f:
-                startProcess = time.time()
-                lineNumber = lineNumber + 1
-                from json.decoder import JSONDecodeError
-                try:
-                    data = json.loads(line)
-                except JSONDecodeError as e:
-                    globals.logger.critical("Error: " + e + " Impossible to decode Q-D channel JSON file - Exit")
-                    exit()
+def getCachedQdFolder(nsFolder, qdFilesFolder):
+    """Get the folder where the Q-D channel and the visualizer MPCs index are cached
 
-                idTxidRxIdPaaTxPaaRx = (
-                    int(data['TX']), int(data['RX']), int(data['PAA_TX']), int(data['PAA_RX']))
-
-                traceIndex = 0
-                for singleTraceDelay in data['Delay']:
-                    DicDelayTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(singleTraceDelay)
-                    # The number of MPCs is needed and not contained in the JSON File
-                    # Use the delay shape to get the number of MPCs per timestep
-                    DicNbMultipathTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = \
-                        np.asarray(singleTraceDelay).shape[0]
-
-                    traceIndex = traceIndex + 1
-
-                # Process Gain
-                traceIndex = 0
-                for singleTraceGain in data['Gain']:
-                    if traceIndex % 1 == 0:
-                        DicPathLossTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(singleTraceGain)
-                    traceIndex = traceIndex + 1
-
-                # Process Phase
-                traceIndex = 0
-                for singleTracePhase in data['Phase']:
-                    if traceIndex % 1 == 0:
-                        DicPhaseTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(singleTracePhase)
-                    traceIndex = traceIndex + 1
-
-                # Process Angle of Departure Elevation
-                traceIndex = 0
-                for singleTraceAODEL in data['AODEL']:
-                    if traceIndex % 1 == 0:
-                        # DicAodElevationTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                        #     singleTraceAODEL,dtype=np.float16)
-                        DicAodElevationTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                            singleTraceAODEL)
-                    traceIndex = traceIndex + 1
-
-                # Process Angle of Departure Azimuth
-                traceIndex = 0
-                for singleTraceAODAZ in data['AODAZ']:
-                    if traceIndex % 1 == 0:
-                        # DicAodAzimuthTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                        #     singleTraceAODAZ,dtype=np.float16)
-                        DicAodAzimuthTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                            singleTraceAODAZ)
-                    traceIndex = traceIndex + 1
-
-                # Process Angle of Arrival Elevation
-                traceIndex = 0
-                for singleTraceAOAEL in data['AOAEL']:
-                    if traceIndex % 1 == 0:
-                        # DicAoaElevationTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                        #     singleTraceAOAEL,dtype=np.float16)
-                        DicAoaElevationTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                            singleTraceAOAEL)
-                    traceIndex = traceIndex + 1
-
-                # Process Angle of Arrival Azimuth
-                traceIndex = 0
-                for singleTraceAOAAZ in data['AOAAZ']:
-                    if traceIndex % 1 == 0:
-                        # DicAoaAzimuthTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                        #     singleTraceAOAAZ,dtype=np.float16)
-                        DicAoaAzimuthTxRx[idTxidRxIdPaaTxPaaRx + (traceIndex,)] = np.asarray(
-                            singleTraceAOAAZ)
-                    traceIndex = traceIndex + 1
-
-                if (int(data['TX']), int(data['RX'])) != currentPair:
-                    # For the progress bar, we just update the progress once we go to a new tx,rx (not taking into account the PAAs)
-                    permutationCount += 1
-                    totalTime += time.time() - startProcess
-                    averageProcessTime = totalTime / permutationCount
-                    remainingTime = round(averageProcessTime * (nbNodesPermutations - permutationCount))
-                    globals.printProgressBar(permutationCount, nbNodesPermutations,
-                                             datetime.timedelta(0, remainingTime),
-                                             prefix='Progress:', suffix='Complete',
-                                             length=50)
-                    currentPair = (int(data['TX']), int(data['RX']))
-            if serialize == True:
-                # Serialize the data
-                if not os.path.exists(serializedFolder):
-                    os.makedirs(serializedFolder)
-
-                # DicNbMultipathTxRx.asType(np.uint16)
-                pickle.dump(DicNbMultipathTxRx, open(os.path.join(serializedFolder, "DicNbMultipathTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicDelayTxRx, open(os.path.join(serializedFolder, "DicDelayTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicPathLossTxRx, open(os.path.join(serializedFolder, "DicPathLossTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicPhaseTxRx, open(os.path.join(serializedFolder, "DicPhaseTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicAodElevationTxRx, open(os.path.join(serializedFolder, "DicAodElevationTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicAodAzimuthTxRx, open(os.path.join(serializedFolder, "DicAodAzimuthTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicAoaElevationTxRx, open(os.path.join(serializedFolder, "DicAoaElevationTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-                pickle.dump(DicAoaAzimuthTxRx, open(os.path.join(serializedFolder, "DicAoaAzimuthTxRx.p"), "wb"),
-                            protocol=pickle.HIGHEST_PROTOCOL)
-
-
-                qdproperties = QdProperties()
-                qdproperties.DicNbMultipathTxRx = DicNbMultipathTxRx
-                qdproperties.DicDelayTxRx = DicDelayTxRx
-                qdproperties.DicPathLossTxRx = DicPathLossTxRx
-                qdproperties.DicPhaseTxRx = DicPhaseTxRx
-                qdproperties.DicAodElevationTxRx = DicAodElevationTxRx
-                qdproperties.DicAodAzimuthTxRx = DicAodAzimuthTxRx
-                qdproperties.DicAoaElevationTxRx = DicAoaElevationTxRx
-                qdproperties.DicAoaAzimuthTxRx = DicAoaAzimuthTxRx
-                return qdproperties
-    except FileNotFoundError:
-        globals.logger.critical("JSON MPC File: " + fileName + " does not exist - Exit")
-        exit()
+    Parameters
+    ----------
+    nsFolder : string
+        Name of the folder containing the ns-3 Q-D files
+
+    qdFilesFolder : string
+        Name of the folder containing the Q-D files
+
+    Returns
+    -------
+    cacheFolder : string
+        The cache folder
+    """
+    return os.path.join(nsFolder, qdFilesFolder, "CachedQd")
 
 
 def readJSONPAAPositionFile(visualizerFolder, paaPositionJSON,qdScenario):
@@ -1326,15 +2395,12 @@ def getMpcCoordinates(transmitter, paaTx, receiver, paaRx, reflectionOrder, trac
 
     # The ellipsis operator is used as line of sight MPC have a shape of (nbCoordinates triples / only one LoS)
     # and for 1st order reflection and higher, it has a shape (numberOfMPCs,nbCoordinatesTriplets)
-    xMpcCoordinate = MPC_DIC[
-                         (int(transmitter), paaTx, int(receiver), paaRx, int(reflectionOrder))][...,
-                     0::3][traceIndex]
-    yMpcCoordinate = MPC_DIC[
-                         (int(transmitter), paaTx, int(receiver), paaRx, int(reflectionOrder))][...,
-                     1::3][traceIndex]
-    zMpcCoordinate = MPC_DIC[
-                         (int(transmitter), paaTx, int(receiver), paaRx, int(reflectionOrder))][...,
-                     2::3][traceIndex]
+    mpcBlocks, traceBlocks = loadMpcGeometry((int(transmitter), int(paaTx), int(receiver), int(paaRx),
+                                              int(reflectionOrder)))
+    mpcGeometry = mpcBlocks[traceBlocks[traceIndex]]
+    xMpcCoordinate = mpcGeometry[..., 0::3]
+    yMpcCoordinate = mpcGeometry[..., 1::3]
+    zMpcCoordinate = mpcGeometry[..., 2::3]
     return np.asarray(xMpcCoordinate), np.asarray(yMpcCoordinate), np.asarray(zMpcCoordinate)
 
 def readEnvironmentCoordinates(visualizerFolder, roomCoordinatesFile):
@@ -3056,7 +3056,7 @@ class Visualization(HasTraits):
                 # SU-MIMO results computed online
                     suMimoResultsToUse = computeSuMimoBft(
                         mimoInitiatorId, mimoResponderId, int(self.traceIndex),
-                        qdScenario, qdScenario.qdChannel, txParam, 355, codebooks)
+                        qdScenario, qdScenario.qdChannel, txParam, globals.nbSubBands, codebooks)
             elif qdScenario.qdInterpreterConfig.mimoDataMode == 'preprocessed':
                 suMimoResultsToUse = qdScenario.oracleSuMimoResults[mimoKey]
         elif self.guiMimoData == "ns-3":
@@ -3296,7 +3296,7 @@ class Visualization(HasTraits):
                 mimoInitiatorId = 0
                 mimoResponderIds = [1, 2]
                 muMimoResultsToUse = computeMuMimoBft(mimoInitiatorId,mimoResponderIds,self.traceIndex,
-                     qdScenario, qdScenario.qdChannel, txParam, 355, codebooks)
+                     qdScenario, qdScenario.qdChannel, txParam, globals.nbSubBands, codebooks)
             elif qdScenario.qdInterpreterConfig.mimoDataMode == 'preprocessed':
                 muMimoResultsToUse = qdScenario.oracleMuMimoResults[mimoKey]
         elif self.guiMimoData == "ns-3":
@@ -4750,7 +4750,7 @@ class Visualization(HasTraits):
                 bestPowerTxRx[(txNode, rxNode, paaTx, paaRx)] = bestRxPowerTxRx
             elif qdScenario.qdInterpreterConfig.dataMode == "preprocessed":
                 # Preprocessed Mode - Read the preprocessed results
-                index = qdScenario.dataIndex[(txNode, rxNode, paaTx, paaRx, traceIndex)]
+                index = qdScenario.dataIndex.getRow((txNode, rxNode, paaTx, paaRx, traceIndex))
                 bestSectorTxRx[(txNode, rxNode, paaTx, paaRx)] = qdScenario.preprocessedSlsData.bestSectorIdList[
                     index]
                 bestPowerTxRx[(txNode, rxNode, paaTx, paaRx)] = \
@@ -4792,7 +4792,7 @@ class Visualization(HasTraits):
                                     bestPowerTxRx[(idTx, idRx, idPaaTx, idPaaRx)] = bestRxPowerTxRx
                                 else:
                                     # Use the preprocessed data
-                                    index = qdScenario.dataIndex[(idTx, idRx, idPaaTx, idPaaRx, traceIndex)]
+                                    index = qdScenario.dataIndex.getRow((idTx, idRx, idPaaTx, idPaaRx, traceIndex))
                                     # Keep the best sector for every TX/RX/PAATX/PAARX combination
                                     bestSectorTxRx[(idTx, idRx, idPaaTx, idPaaRx)] = \
                                         qdScenario.preprocessedSlsData.bestSectorIdList[
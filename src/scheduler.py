@@ -238,7 +238,7 @@ def transmitData(qdScenario,schedulingDic, nbStasConnectedToAps, associationMode
         The preprocessed data for the SLS Phase
     txParam: TxParam class
         Parameters associated to the transmissions
-    dataIndex: Dic
+    dataIndex: DataIndex class
         Used to reconstruct the index of the preprocessed data
     """
     NO_TRANSMISSION = qdScenario.nbNodes  # TODO Two time in the code - To remove
@@ -323,7 +323,7 @@ def transmitData(qdScenario,schedulingDic, nbStasConnectedToAps, associationMode
             if currentTransmissionReceiver != NO_TRANSMISSION:
                 # Get the current downlink transmission received power
                 rxPowerTransmission = preprocessedSlsData.bestSectorRxPowerList[
-                    dataIndex[(apId, currentTransmissionReceiver, 0, 0, currentTransmissionTrace)]]
+                    dataIndex.getRow((apId, currentTransmissionReceiver, 0, 0, currentTransmissionTrace))]
             if rxPowerTransmission == -math.inf:
                 #################################################
                 #     CASE1: Transmission but no power received #
@@ -417,14 +417,14 @@ def transmitData(qdScenario,schedulingDic, nbStasConnectedToAps, associationMode
                         interferReceiver = currentInterfererReceivers[
                             (apIdInChunk, currentInterfererEndTransmissions[apIdInChunk][0])]
                         interfererSectorUsed = preprocessedSlsData.bestSectorIdList[
-                            dataIndex[
+                            dataIndex.getRow(
                                 (apIdInChunk, interferReceiver, 0, 0,
-                                 currentTransmissionTrace)]] # TODO should have PAA tx and PAA rx instead of 0,0
+                                 currentTransmissionTrace))] # TODO should have PAA tx and PAA rx instead of 0,0
                         if interfererSectorUsed != -1:
                             # A downlink transmission occured
-                            index = dataIndex[
+                            index = dataIndex.getRow(
                                 (apIdInChunk, currentTransmissionReceiver, 0, 0,
-                                 currentTransmissionTrace)] # TODO should have PAA tx and PAA rx instead of 0,0
+                                 currentTransmissionTrace)) # TODO should have PAA tx and PAA rx instead of 0,0
                             # Compute the received power from the interfering transmission
                             rwPowerFromInterferer = preprocessedSlsData.powerPerSectorList[
                                 index, interfererSectorUsed]
@@ -560,10 +560,16 @@ def computeDataTransmission(qdScenario,associationMode, staIds, folderPrefix, pr
   
     txParam: TxParam class
         Parameters associated to the transmissions
-    dataIndex: Dic
+    dataIndex: DataIndex class
         Used to reconstruct the index of the preprocessed data
     """
     print("Scheduler association mode:", associationMode)
+    if associationMode != StaAssociationMode.SAME_AP and globals.slsMode == 'pruned':
+        # The interference is computed with the power of the sector used by the interferer at the receiver, which is
+        # not evaluated by the pruned SLS (only the best candidate sectors of every pair are)
+        globals.logger.critical("The interference needs the power of every sector but the SLS data were preprocessed "
+                                "with the pruned SLS mode - Use --slsMode exhaustive - Exit")
+        exit()
     apConnectedStas = createStasAssociation(qdScenario,associationMode, staIds, preprocessedAssociationData)
     schedulingDic, nbStasConnectedToAps = createDownlinkScheduling(qdScenario,apConnectedStas,
                                                                    folderPrefix)  # Define the transmission (Works only for downlink, i.e, AP to STA)
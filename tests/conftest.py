@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The modules of the Q-D interpreter are flat modules of the src folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+# globals must be imported first as the other modules import it
+import globals  # noqa: E402,F401
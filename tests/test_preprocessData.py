@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import globals
+import preprocessData
+import qdRealization
+
+
+class PaaCodebooks:
+    """Codebooks giving only the number of PAAs of the APs and of the STAs
+    """
+
+    def __init__(self, nbPaaAp, nbPaaSta):
+        self.nbPaas = {globals.NodeType.AP: nbPaaAp, globals.NodeType.STA: nbPaaSta}
+
+    def getNbPaaNode(self, nodeType):
+        return self.nbPaas[nodeType]
+
+
+def generateScenario(nbAps=3, nbStas=4, nbTraces=50, nbPaaAp=2, nbPaaSta=2, seed=0):
+    """Generate a scenario with the best sector and its power for every row of the preprocessed data
+
+    The powers are rounded so that several pairs receive the same power for some traces.
+    """
+    nbNodes = nbAps + nbStas
+    qdScenario = qdRealization.QdScenario(nbNodes, nbTraces, 1, None)
+    qdScenario.setNodesType([globals.Node(nodeId, globals.NodeType.AP if nodeId < nbAps else globals.NodeType.STA)
+                             for nodeId in range(nbNodes)])
+    codebooks = PaaCodebooks(nbPaaAp, nbPaaSta)
+    dataIndex = preprocessData.constructIndex(qdScenario, codebooks)
+    rng = np.random.default_rng(seed)
+    bestSectorRxPowerList = np.round(rng.uniform(-80, -70, len(dataIndex)))
+    bestSectorIdList = rng.integers(0, 64, len(dataIndex)).astype(np.int16)
+    return qdScenario, codebooks, dataIndex, bestSectorRxPowerList, bestSectorIdList
+
+
+def associateStasPerTrace(qdScenario, codebooks, dataIndex, bestSectorRxPowerList, bestSectorIdList):
+    """Associate the STAs trace after trace, in the order the pairs are merged
+    """
+    staAssociationDic = {}
+    for txId in range(qdScenario.nbNodes):
+        for rxId in range(qdScenario.nbNodes):
+            if txId == rxId or not (qdScenario.isNodeAp(txId) and qdScenario.isNodeSta(rxId)):
+                continue
+            for txAntennaId in range(codebooks.getNbPaaNode(qdScenario.getNodeType(txId))):
+                for rxAntennaId in range(codebooks.getNbPaaNode(qdScenario.getNodeType(rxId))):
+                    for traceIndex in range(qdScenario.nbTraces):
+                        row = dataIndex.getRow((txId, rxId, txAntennaId, rxAntennaId, traceIndex))
+                        rxPower = float(bestSectorRxPowerList[row])
+                        if (rxId, traceIndex) not in staAssociationDic or \
+                                staAssociationDic[(rxId, traceIndex)][0] < rxPower:
+                            staAssociationDic[(rxId, traceIndex)] = (rxPower, txId, int(bestSectorIdList[row]))
+    return staAssociationDic
+
+
+@pytest.mark.parametrize("nbAps, nbPaaAp, nbPaaSta", [(1, 1, 1), (3, 2, 2), (2, 4, 1)])
+def test_associateStasMatchesPerTraceAssociation(nbAps, nbPaaAp, nbPaaSta):
+    scenario = generateScenario(nbAps=nbAps, nbPaaAp=nbPaaAp, nbPaaSta=nbPaaSta)
+    staAssociationDic = preprocessData.associateStas(*scenario)
+    referenceDic = associateStasPerTrace(*scenario)
+    assert staAssociationDic == referenceDic
+    assert list(staAssociationDic) == list(referenceDic)
+
+
+def test_associateStasWithoutAp():
+    scenario = generateScenario(nbAps=0)
+    assert preprocessData.associateStas(*scenario) == {}
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import qdRealization
+
+
+def generateTraceValues(nbTraces=300, nbUniqueTraces=20, seed=0):
+    """Generate traces with MPC geometry-like values, many of them repeated
+    """
+    rng = np.random.default_rng(seed)
+    uniqueValues = rng.normal(size=(nbUniqueTraces, 3, 7, 3))
+    return uniqueValues[rng.integers(0, nbUniqueTraces, nbTraces)]
+
+
+def checkTraceBlocks(traceValues, blocks, traceBlocks):
+    """Check that the blocks are unique, in the order of their first occurrence and give back the traces
+    """
+    assert traceBlocks.dtype == np.int32
+    np.testing.assert_array_equal(blocks[traceBlocks], traceValues)
+    firstOccurrences = np.unique(traceBlocks, return_index=True)[1]
+    np.testing.assert_array_equal(np.sort(firstOccurrences), firstOccurrences)
+    assert len(np.unique(blocks.reshape(len(blocks), -1), axis=0)) == len(blocks)
+
+
+def test_deduplicateTraceBlocks():
+    traceValues = generateTraceValues()
+    blocks, traceBlocks = qdRealization.deduplicateTraceBlocks(traceValues)
+    checkTraceBlocks(traceValues, blocks, traceBlocks)
+
+
+def test_deduplicateTraceBlocksHashCollisions(monkeypatch):
+    # Keep a single bit of the hashes so that different traces share the same hash
+    monkeypatch.setattr(qdRealization.QdProperties, 'mixHashes', staticmethod(lambda hashes: hashes & np.uint64(1)))
+    traceValues = generateTraceValues()
+    blocks, traceBlocks = qdRealization.deduplicateTraceBlocks(traceValues)
+    checkTraceBlocks(traceValues, blocks, traceBlocks)
+
+
+@pytest.mark.parametrize("shape", [(0, 3, 7, 3), (5, 0)])
+def test_deduplicateTraceBlocksEmpty(shape):
+    traceValues = np.zeros(shape)
+    blocks, traceBlocks = qdRealization.deduplicateTraceBlocks(traceValues)
+    assert len(traceBlocks) == shape[0]
+    assert len(blocks) == min(shape[0], 1)
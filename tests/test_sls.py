@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import qdPropagationLoss
+
+# Maximum error allowed on the power received by a sector compared to computeRx (dB)
+RX_POWER_TOLERANCE_DB = 1e-6
+
+
+def generateTransmissions(nbTransmissions=4, nbSectors=64, nbMpcs=50, nbSubBands=355, seed=0):
+    """Generate random directivities and small-scale fading and the transmission parameters of 802.11ad subbands
+    """
+    rng = np.random.default_rng(seed)
+    txDirectivity = rng.normal(size=(nbTransmissions, nbSectors, nbMpcs)) + 1j * rng.normal(
+        size=(nbTransmissions, nbSectors, nbMpcs))
+    weightedFading = (rng.normal(size=(nbTransmissions, nbMpcs, nbSubBands)) + 1j * rng.normal(
+        size=(nbTransmissions, nbMpcs, nbSubBands))) * 1e-4
+    txPowerPerSubBandWHz = np.full(nbSubBands, 1e-12)
+    lowerFrequenciesList = np.arange(nbSubBands) * 5156250.0
+    higherFrequenciesList = lowerFrequenciesList + 5156250.0
+    noise = 1e-11
+    return txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise
+
+
+def computeReferenceRxPower(txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList,
+                            higherFrequenciesList, noise):
+    """Compute the power received by every sector of every transmission with computeRx
+    """
+    nbTransmissions, nbSectors, nbMpcs = txDirectivity.shape
+    nbSubBands = weightedFading.shape[-1]
+    referenceRxPower = np.empty((nbTransmissions, nbSectors))
+    for transmission in range(nbTransmissions):
+        for sector in range(nbSectors):
+            referenceRxPower[transmission, sector] = qdPropagationLoss.computeRx(
+                nbMpcs, txDirectivity[transmission, sector] * weightedFading[transmission].T, txPowerPerSubBandWHz,
+                lowerFrequenciesList, higherFrequenciesList, noise, nbSubBands)[0]
+    return referenceRxPower
+
+
+@pytest.fixture(scope="module")
+def transmissions():
+    transmissions = generateTransmissions()
+    return transmissions, computeReferenceRxPower(*transmissions)
+
+
+@pytest.mark.parametrize("method, fastMath", [('numba', False), ('numba', True), ('subband', False),
+                                              ('covariance', False)])
+def test_computeRxAllSectorsMatchesComputeRx(transmissions, method, fastMath):
+    (txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList,
+     noise), referenceRxPower = transmissions
+    rxPowerPerSector, bestSector, psdBestSector, snrBestSector = qdPropagationLoss.computeRxAllSectors(
+        txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise,
+        method, fastMath)
+    np.testing.assert_allclose(rxPowerPerSector, referenceRxPower, rtol=0, atol=RX_POWER_TOLERANCE_DB)
+    np.testing.assert_array_equal(bestSector, np.argmax(referenceRxPower, axis=-1))
+
+
+@pytest.mark.parametrize("method, fastMath", [('numba', False), ('numba', True), ('subband', False),
+                                              ('covariance', False)])
+def test_computeRxAllSectorsBestSectorValues(transmissions, method, fastMath):
+    (txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList,
+     noise), referenceRxPower = transmissions
+    _, bestSector, psdBestSector, snrBestSector = qdPropagationLoss.computeRxAllSectors(
+        txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise,
+        method, fastMath)
+    for transmission, sector in enumerate(bestSector):
+        _, referencePsd, referenceSnr = qdPropagationLoss.computeRx(
+            txDirectivity.shape[-1], txDirectivity[transmission, sector] * weightedFading[transmission].T,
+            txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise, weightedFading.shape[-1])
+        np.testing.assert_allclose(psdBestSector[transmission], referencePsd, rtol=0, atol=RX_POWER_TOLERANCE_DB)
+        assert abs(snrBestSector[transmission] - referenceSnr) <= RX_POWER_TOLERANCE_DB
+
+
+def test_computeRxPrunedSectorsMarksSectorsNotEvaluated(transmissions):
+    (txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList,
+     noise), _ = transmissions
+    topK = 8
+    rxPowerPerSector, bestSector, _, _ = qdPropagationLoss.computeRxPrunedSectors(
+        txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise, topK,
+        8)
+    exhaustiveRxPowerPerSector = qdPropagationLoss.computeRxAllSectors(
+        txDirectivity, weightedFading, txPowerPerSubBandWHz, lowerFrequenciesList, higherFrequenciesList, noise)[0]
+    evaluated = ~np.isnan(rxPowerPerSector)
+    # Only the candidates are evaluated, and their power is the exact one
+    np.testing.assert_array_equal(evaluated.sum(axis=-1), topK)
+    np.testing.assert_allclose(rxPowerPerSector[evaluated], exhaustiveRxPowerPerSector[evaluated], rtol=0,
+                               atol=RX_POWER_TOLERANCE_DB)
+    np.testing.assert_array_equal(bestSector, np.nanargmax(rxPowerPerSector, axis=-1))